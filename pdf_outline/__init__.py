@@ -1,14 +1,55 @@
 """
 pdf_outline public interface
+
+Names are resolved on first access (PEP 562), so `import pdf_outline` – or
+any of its submodules – does not load PyMuPDF or onnxruntime up front.
 """
-from .render import render_pdf
-from .extract_lines import extract_lines
-from .donut_infer import DonutEncoder
-from .cluster import assign_levels
+import sys
+from importlib import import_module
+from types import ModuleType
+
+_EXPORTS = {
+    "PdfDocument":     ".document",
+    "render_pdf":      ".render",
+    "extract_lines":   ".extract_lines",
+    "extract_table":   ".extract_lines",
+    "DonutEncoder":    ".donut_infer",
+    "encoder_variants": ".donut_infer",
+    "assign_levels":   ".cluster",
+    "OutlinePipeline": ".pipeline",
+}
 
 __all__ = [
+    "PdfDocument",
     "render_pdf",
     "extract_lines",
+    "extract_table",
     "DonutEncoder",
+    "encoder_variants",
     "assign_levels",
+    "OutlinePipeline",
 ]
+
+
+class _Package(ModuleType):
+    def __setattr__(self, name, value):
+        # importing the submodule `extract_lines` binds it on the package –
+        # the exported function of the same name must win, as it did eagerly
+        if isinstance(value, ModuleType) and _EXPORTS.get(name) == "." + name:
+            return
+        super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _Package
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value                      # later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,356 @@
+# pdf_outline/batch.py
+"""
+BatchDriver  –  crash‑isolated, multi‑process driver for a folder of PDFs.
+
+    python -m pdf_outline.batch input/ output/ --workers 4 --timeout 60
+
+* every worker is a separate process with its own `OutlinePipeline`
+  (ONNX session, `cores // workers` intra‑op threads); the worker count is
+  sized from the cores and the memory budget (cgroup limit or free RAM)
+* documents are ordered largest‑first by page count (read by a throw‑away
+  process, so a PDF that crashes MuPDF on open cannot take the driver down)
+  and handed to whichever worker is idle – a huge PDF starts early instead
+  of finishing last, small ones fill the gaps
+* a worker that crashes, exceeds its per‑document deadline
+  (`timeout + page_timeout × pages`) or its RSS limit is killed and
+  replaced; that document is reported failed, the rest of the batch goes on
+* outputs are written atomically (temp file + rename), so an existing JSON
+  is always complete and `resume=True` skips it on restart
+
+The embedding cache is single‑writer and is not used here; per‑document
+incremental manifests (`incremental=DIR`) are fine.
+"""
+
+from __future__ import annotations
+import argparse, os, sys, time
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from multiprocessing.connection import wait
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+
+from .metrics import MetricsLog
+from .pipeline import DocResult, dir_jobs
+from .session import SessionProfile, add_session_args, profile_from_args
+
+WORKER_MB = 1200           # resident size of one pipeline with the int8 encoder, roughly
+
+
+# ---------- sizing ----------------------------------------------------------
+def memory_budget_mb() -> float:
+    """Memory this process may use: the cgroup limit if set, else available RAM."""
+    for fp in ("/sys/fs/cgroup/memory.max",                      # cgroup v2
+               "/sys/fs/cgroup/memory/memory.limit_in_bytes"):   # cgroup v1
+        try:
+            raw = Path(fp).read_text().strip()
+        except OSError:
+            continue
+        if raw.isdigit() and int(raw) < 1 << 60:
+            return int(raw) / (1 << 20)
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") / (1 << 20)
+    except (ValueError, OSError, AttributeError):
+        return float(WORKER_MB)
+
+
+def plan_workers(workers: int | None = None, mem_budget_mb: float | None = None,
+                 worker_mb: float = WORKER_MB, jobs: int | None = None) -> Tuple[int, int]:
+    """(worker processes, intra‑op threads each) for this host."""
+    cores = os.cpu_count() or 1
+    budget = mem_budget_mb or 0.8 * memory_budget_mb()
+    n = workers or max(1, min(max(1, cores // 2), int(budget // worker_mb)))
+    if jobs is not None:
+        n = max(1, min(n, jobs))
+    return n, max(1, cores // n)
+
+
+def _rss_mb(pid: int) -> float:
+    """Current resident set size of `pid` (Linux /proc; 0 where unavailable)."""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1 << 20)
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+def _count_pages(pdf: Path) -> int:
+    import fitz
+    with fitz.open(pdf) as doc:
+        return doc.page_count
+
+
+def page_counts(pdfs: Sequence[Path]) -> List[int]:
+    """Page count per PDF from a cheap open in a helper process; -1 if unknown."""
+    counts = [-1] * len(pdfs)
+    try:
+        with ProcessPoolExecutor(1, mp_context=mp.get_context("spawn")) as ex:
+            futs = [ex.submit(_count_pages, p) for p in pdfs]
+            for i, f in enumerate(futs):
+                try:
+                    counts[i] = f.result()
+                except BrokenProcessPool:
+                    raise
+                except Exception:
+                    pass                                # unreadable: the worker will say why
+    except BrokenProcessPool:
+        pass                                            # a PDF crashed MuPDF: sizes for the rest
+    return counts
+
+
+# ---------- worker ----------------------------------------------------------
+def _worker_main(conn, pipeline_kwargs: Dict[str, Any]) -> None:
+    from .pipeline import OutlinePipeline
+    try:
+        pipe = OutlinePipeline(**pipeline_kwargs)
+    except Exception as e:
+        conn.send(("fatal", f"{type(e).__name__}: {e}"))
+        return
+    conn.send(("ready", os.getpid()))
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:                                # driver gone
+            job = None
+        if job is None:
+            pipe.close()
+            break
+        r = pipe._run_safe(*job)
+        conn.send(("done", {"pdf": r.pdf, "out": r.out, "seconds": r.seconds,
+                            "pages": r.pages, "error": r.error,
+                            "stats": {k: v for k, v in r.stats.items()}}))
+
+
+@dataclass
+class _Worker:
+    proc: Any
+    conn: Any
+    ready: bool = False
+    job: Tuple[Path, Path] | None = None
+    pages: int = 0
+    deadline: float = 0.0
+    t_start: float = 0.0
+    done: int = 0
+
+
+# ---------- driver ----------------------------------------------------------
+class BatchDriver:
+    def __init__(self,
+                 pipeline_kwargs: Dict[str, Any],
+                 workers: int | None = None,
+                 mem_budget_mb: float | None = None,
+                 worker_mb: float = WORKER_MB,
+                 timeout: float = 120.0,
+                 page_timeout: float = 2.0,
+                 max_rss_mb: float | None = None,
+                 recycle_after: int = 500,
+                 resume: bool = True,
+                 poll: float = 0.25):
+        if pipeline_kwargs.get("cache") is not None:
+            raise ValueError("the embedding cache is single‑writer – not usable with BatchDriver")
+        self.pipeline_kwargs = dict(pipeline_kwargs)
+        self.workers       = workers
+        self.mem_budget_mb = mem_budget_mb
+        self.worker_mb     = worker_mb
+        self.timeout       = timeout               # s per document …
+        self.page_timeout  = page_timeout          # … plus s per page
+        self.max_rss_mb    = max_rss_mb            # None → budget / workers
+        self.recycle_after = recycle_after         # fresh process after N docs (leaks)
+        self.resume        = resume                # skip existing outputs
+        self.poll          = poll
+        self.stats: Dict[str, Any] = {}
+        self._ctx = mp.get_context("spawn")
+
+    # ------------------------------------------------------------------ workers
+    def _spawn(self, threads: int) -> _Worker:
+        kw = dict(self.pipeline_kwargs)
+        prof = kw.get("session_profile") or SessionProfile()
+        kw["session_profile"] = prof.replace(intra_op_threads=prof.intra_op_threads or threads,
+                                             allow_spinning=False)
+        parent, child = self._ctx.Pipe()
+        # not daemonic: a worker may start its own render pool
+        # (render_backend="process"); `_stop` / `run` reap every worker
+        proc = self._ctx.Process(target=_worker_main, args=(child, kw))
+        proc.start()
+        child.close()
+        self.stats["spawned"] += 1
+        return _Worker(proc, parent)
+
+    @staticmethod
+    def _stop(w: _Worker, kill: bool = False) -> None:
+        if kill:
+            w.proc.kill()
+        else:
+            try:
+                w.conn.send(None)
+            except (OSError, BrokenPipeError):
+                w.proc.kill()
+        w.proc.join(timeout=10)
+        if w.proc.is_alive():
+            w.proc.kill()
+            w.proc.join()
+        w.conn.close()
+
+    # ------------------------------------------------------------------ run
+    def pending(self, jobs: Sequence[Tuple[Path, Path]]) -> List[Tuple[Path, Path]]:
+        """Jobs still to do: with `resume`, finished outputs are skipped."""
+        todo = []
+        for pdf, out in jobs:
+            Path(out).parent.mkdir(parents=True, exist_ok=True)
+            for stale in Path(out).parent.glob(f".{Path(out).name}.*.tmp"):
+                stale.unlink(missing_ok=True)            # half‑written by a killed worker
+            if not (self.resume and Path(out).exists()):
+                todo.append((Path(pdf), Path(out)))
+        self.stats["skipped"] = len(jobs) - len(todo)
+        return todo
+
+    def run(self, jobs: Sequence[Tuple[Path, Path]]) -> Iterator[DocResult]:
+        """Process (pdf, out_json) pairs; yields a `DocResult` per document as it finishes."""
+        self.stats = {"spawned": 0, "crashed": 0, "timed_out": 0, "over_memory": 0}
+        todo = self.pending(jobs)
+        if not todo:
+            return
+        counts = page_counts([pdf for pdf, _ in todo])
+        order = sorted(range(len(todo)),                  # largest first; unknown → by size
+                       key=lambda i: (counts[i], todo[i][0].stat().st_size), reverse=True)
+        queue = [(todo[i], max(counts[i], 0)) for i in order]
+        queue.reverse()                                   # pop() from the end = largest
+
+        n, threads = plan_workers(self.workers, self.mem_budget_mb, self.worker_mb, len(todo))
+        rss_limit = self.max_rss_mb or (self.mem_budget_mb or 0.8 * memory_budget_mb()) / n
+        self.stats.update(workers=n, threads=threads, rss_limit_mb=round(rss_limit))
+        pool = [self._spawn(threads) for _ in range(n)]
+
+        def fail(w: _Worker, why: str) -> DocResult:
+            (pdf, out), secs = w.job, time.perf_counter() - w.t_start
+            return DocResult(pdf, out, None, secs, pages=w.pages, error=why)
+
+        try:
+            while queue or any(w.job for w in pool):
+                # hand out work to idle, loaded workers
+                for w in pool:
+                    if w.ready and w.job is None and queue:
+                        (job, pages) = queue.pop()
+                        w.job, w.pages, w.t_start = job, pages, time.perf_counter()
+                        w.deadline = w.t_start + self.timeout + self.page_timeout * pages
+                        w.conn.send(job)
+
+                wait([w.conn for w in pool] + [w.proc.sentinel for w in pool], self.poll)
+                now = time.perf_counter()
+                for i, w in enumerate(pool):
+                    replace, result = False, None
+                    if w.conn.poll():
+                        try:
+                            kind, payload = w.conn.recv()
+                        except (EOFError, OSError):
+                            kind, payload = "died", None
+                        if kind == "fatal":
+                            raise RuntimeError(f"worker could not load the pipeline: {payload}")
+                        if kind == "ready":
+                            w.ready = True
+                        elif kind == "done":
+                            result = DocResult(payload["pdf"], payload["out"], None,
+                                               payload["seconds"], pages=payload["pages"],
+                                               error=payload["error"], stats=payload["stats"])
+                            w.job, w.done = None, w.done + 1
+                            replace = w.done >= self.recycle_after
+                        else:
+                            replace = True
+                    if not w.proc.is_alive() and not replace:
+                        replace = True
+                    if replace and not w.ready:
+                        raise RuntimeError(f"worker died while loading the pipeline "
+                                           f"(exit code {w.proc.exitcode})")
+                    if replace and w.job is not None:       # lost mid‑document
+                        self.stats["crashed"] += 1
+                        code = w.proc.exitcode
+                        result = fail(w, f"worker died (exit code {code})")
+                    elif w.job is not None and now > w.deadline:
+                        self.stats["timed_out"] += 1
+                        result = fail(w, f"timed out after {now - w.t_start:.0f}s")
+                        replace = True
+                    elif w.job is not None and _rss_mb(w.proc.pid) > rss_limit:
+                        self.stats["over_memory"] += 1
+                        result = fail(w, f"over the {rss_limit:.0f} MiB memory limit")
+                        replace = True
+
+                    if replace:
+                        self._stop(w, kill=w.job is not None or not w.proc.is_alive())
+                        pool[i] = self._spawn(threads)
+                    if result is not None:
+                        yield result
+        finally:
+            for w in pool:
+                self._stop(w, kill=w.job is not None)
+
+
+# ---------- CLI -------------------------------------------------------------
+def _parse() -> argparse.Namespace:
+    from .classify import parse_canvas
+    p = argparse.ArgumentParser(description="Outline every PDF in a folder with isolated workers.")
+    p.add_argument("input", type=Path, help="folder of PDFs")
+    p.add_argument("output", type=Path, help="folder for <name>.json outputs")
+    p.add_argument("--model", type=Path, default=Path("models/donut_base_int8/int8"))
+    p.add_argument("--head", type=Path, default=Path("models/donut_head.pkl"))
+    p.add_argument("--dpi", type=int, default=120, help="render DPI (120 recommended)")
+    p.add_argument("--batch-size", type=int, default=8, help="pages per ONNX run")
+    p.add_argument("--canvas", type=parse_canvas, metavar="HxW")
+    p.add_argument("--variant", metavar="NAME", help="encoder variant, e.g. int8_static")
+    p.add_argument("--fast", action="store_true", help="text‑only mode (see extract_outline)")
+    p.add_argument("--triage", action="store_true", help="skip pages with no heading cue")
+    p.add_argument("--incremental", type=Path, metavar="DIR", help="per‑page manifests")
+    p.add_argument("--prune-lines", action="store_true", help="drop lines below body size")
+    p.add_argument("--stream-window", type=int, default=0, metavar="N",
+                   help="also stream settled entries to <name>.ndjson, N pages at a time")
+    p.add_argument("--workers", type=int, help="worker processes (default: from cores + memory)")
+    p.add_argument("--mem-budget-mb", type=float, help="default: cgroup limit / free RAM × 0.8")
+    p.add_argument("--worker-mb", type=float, default=WORKER_MB,
+                   help="expected resident size of one worker, for sizing")
+    p.add_argument("--max-rss-mb", type=float, help="kill a worker above this (default budget/workers)")
+    p.add_argument("--timeout", type=float, default=120, help="seconds per document …")
+    p.add_argument("--page-timeout", type=float, default=2.0, help="… plus seconds per page")
+    p.add_argument("--force", action="store_true", help="redo documents whose JSON exists")
+    p.add_argument("--metrics", type=Path, metavar="JSONL", help="per‑document stage timings")
+    add_session_args(p)
+    return p.parse_args()
+
+
+def main() -> None:
+    args = _parse()
+    args.output.mkdir(parents=True, exist_ok=True)
+    driver = BatchDriver(
+        dict(model_dir=args.model, head_path=args.head, dpi=args.dpi,
+             batch_size=args.batch_size, canvas=args.canvas, variant=args.variant,
+             fast=args.fast,
+             triage=args.triage, incremental=args.incremental, prune_lines=args.prune_lines,
+             stream_window=args.stream_window,
+             session_profile=profile_from_args(args)),
+        workers=args.workers, mem_budget_mb=args.mem_budget_mb, worker_mb=args.worker_mb,
+        timeout=args.timeout, page_timeout=args.page_timeout, max_rss_mb=args.max_rss_mb,
+        resume=not args.force)
+
+    t0 = time.perf_counter()
+    log = MetricsLog(args.metrics)
+    n_ok = n_err = 0
+    for r in driver.run(dir_jobs(args.input, args.output)):
+        log.add(r.metrics)
+        if r.ok:
+            n_ok += 1
+            print(f"✓ {r.pdf.name}  ({r.pages} pages, {r.seconds:.2f}s)")
+        else:
+            n_err += 1
+            print(f"✗ {r.pdf.name}: {r.error}", file=sys.stderr)
+    log.close()
+    s = driver.stats
+    print(f"Done: {n_ok} ok, {n_err} failed, {s.get('skipped', 0)} already done "
+          f"in {time.perf_counter() - t0:.1f}s"
+          + (f"  ({s['workers']} workers × {s['threads']} threads, {s['spawned']} spawned, "
+             f"{s['crashed']} crashed, {s['timed_out']} timed out, "
+             f"{s['over_memory']} over memory)" if "workers" in s else ""))
+    if n_err:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+# pdf_outline/cache.py
+"""
+EmbeddingCache  –  on‑disk, content‑addressed store of page CLS vectors.
+
+* key   = sha1(PDF content hash, page index, render setting, model file hash)
+* store = one float32 `np.memmap` of shape (capacity, dim) + an append‑only
+  binary index log of put / touch / delete records (key → slot); capacity
+  is derived from `max_bytes`
+* eviction: least‑recently‑used slots are recycled once the store is full
+  (an OrderedDict in use order – replaying the log rebuilds it)
+
+Crash consistency: the index never names a slot whose vector is being
+rewritten.  Evicted keys are deleted in the log (and synced) before their
+slots are reused, and new keys are logged only after their vectors are
+flushed – a crash loses recent entries, it never maps a key to another
+page's vector.  The log is compacted when it grows well past the index.
+
+Single writer: share a cache directory between processes only read‑only.
+"""
+
+from __future__ import annotations
+import hashlib, os, struct
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+_VEC_FILE   = "vectors.f32"
+_INDEX_FILE = "index.log"
+
+_HEADER = struct.Struct("<4sIII")                 # magic, version, dim, capacity
+_RECORD = struct.Struct("<B20si")                 # op, sha1 key, slot
+_MAGIC, _VERSION = b"PECI", 1
+_PUT, _DEL = 1, 2                                 # a put of a known key = touch
+
+
+def file_sha256(path: str | Path, chunk: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class EmbeddingCache:
+    def __init__(self, root: str | Path, max_bytes: int = 512 << 20, dim: int = 1024):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.dim      = dim
+        self.capacity = max(1, max_bytes // (dim * 4))
+        self.hits = self.misses = 0
+
+        # key → slot, least recently used first
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._pending: List[bytes] = []           # records waiting for `flush`
+        self._log_records = 0
+
+        idx_fp, vec_fp = self.root / _INDEX_FILE, self.root / _VEC_FILE
+        mode = "r+" if vec_fp.exists() and self._load(idx_fp) else "w+"
+        self._vecs = np.memmap(vec_fp, dtype=np.float32, mode=mode,
+                               shape=(self.capacity, dim))
+        if mode == "w+":                          # new cache or layout changed
+            self._index.clear()
+            self._rewrite_log()
+        elif self._log_records > 2 * len(self._index) + 1024:
+            self._rewrite_log()
+        self._log = open(idx_fp, "ab")
+        used = set(self._index.values())
+        self._free = [s for s in range(self.capacity - 1, -1, -1) if s not in used]
+
+    def _load(self, idx_fp: Path) -> bool:
+        """Replay the index log; False if there is none or its layout differs."""
+        try:
+            data = idx_fp.read_bytes()
+        except FileNotFoundError:
+            return False
+        if len(data) < _HEADER.size:
+            return False
+        magic, version, dim, capacity = _HEADER.unpack_from(data)
+        if (magic, version, dim, capacity) != (_MAGIC, _VERSION, self.dim, self.capacity):
+            return False
+        n = (len(data) - _HEADER.size) // _RECORD.size   # a torn last record is dropped
+        index = self._index
+        for op, key, slot in _RECORD.iter_unpack(
+                data[_HEADER.size:_HEADER.size + n * _RECORD.size]):
+            k = key.hex()
+            if op == _DEL:
+                index.pop(k, None)
+            elif 0 <= slot < self.capacity:
+                index[k] = slot
+                index.move_to_end(k)
+        self._log_records = n
+        if _HEADER.size + n * _RECORD.size != len(data):
+            with open(idx_fp, "r+b") as f:
+                f.truncate(_HEADER.size + n * _RECORD.size)
+        return True
+
+    def _rewrite_log(self) -> None:
+        """Compact the log to one put per entry, in use order (atomic)."""
+        fp = self.root / _INDEX_FILE
+        tmp = fp.with_name(fp.name + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, _VERSION, self.dim, self.capacity))
+            f.write(b"".join(_RECORD.pack(_PUT, bytes.fromhex(k), s)
+                             for k, s in self._index.items()))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, fp)
+        self._log_records = len(self._index)
+
+    # ------------------------------------------------------------------ keys
+    @staticmethod
+    def key(pdf_hash: str, page: int, render: str, model_hash: str) -> str:
+        return hashlib.sha1(f"{pdf_hash}:{page}:{render}:{model_hash}".encode()).hexdigest()
+
+    # ------------------------------------------------------------------ access
+    def get_many(self, keys: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """(vectors (N, dim), hit mask (N,)); rows of misses are zero."""
+        out = np.zeros((len(keys), self.dim), dtype=np.float32)
+        hit = np.zeros(len(keys), dtype=bool)
+        for i, k in enumerate(keys):
+            slot = self._index.get(k)
+            if slot is None:
+                continue
+            self._index.move_to_end(k)
+            self._pending.append(_RECORD.pack(_PUT, bytes.fromhex(k), slot))
+            out[i] = self._vecs[slot]
+            hit[i] = True
+        self.hits   += int(hit.sum())
+        self.misses += len(keys) - int(hit.sum())
+        return out, hit
+
+    def put_many(self, keys: Sequence[str], vecs: np.ndarray) -> None:
+        new = [k for k in dict.fromkeys(keys) if k not in self._index]
+        need = min(len(new), self.capacity) - len(self._free)
+        if need > 0:
+            self._evict(need)
+        for k, v in zip(keys, vecs):
+            slot = self._index.get(k)
+            if slot is None:
+                if not self._free:              # more keys than capacity
+                    self._evict(1)
+                slot = self._index[k] = self._free.pop()
+            self._index.move_to_end(k)
+            self._vecs[slot] = v
+            self._pending.append(_RECORD.pack(_PUT, bytes.fromhex(k), slot))
+
+    def _evict(self, n: int) -> None:
+        """Free the `n` least recently used slots – durably, before reuse."""
+        dels = []
+        for _ in range(min(n, len(self._index))):
+            k, slot = self._index.popitem(last=False)
+            self._free.append(slot)
+            dels.append(_RECORD.pack(_DEL, bytes.fromhex(k), slot))
+        # puts of the evicted keys still pending would resurrect them
+        drop = {d[1:21] for d in dels}
+        self._pending = [r for r in self._pending if r[1:21] not in drop]
+        self._log.write(b"".join(dels))
+        self._log.flush()
+        os.fsync(self._log.fileno())
+        self._log_records += len(dels)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses,
+                "entries": len(self._index), "capacity": self.capacity}
+
+    # ------------------------------------------------------------------ persistence
+    def flush(self) -> None:
+        if not self._pending:
+            return
+        self._vecs.flush()                      # vectors first, then the keys naming them
+        self._log.write(b"".join(self._pending))
+        self._log.flush()
+        self._log_records += len(self._pending)
+        self._pending.clear()
+        if self._log_records > 2 * len(self._index) + 1024:
+            self._log.close()
+            self._rewrite_log()
+            self._log = open(self.root / _INDEX_FILE, "ab")
+
+    def close(self) -> None:
+        self.flush()
+        self._log.close()
+        del self._vecs
@@ -1,30 +1,215 @@
 # pdf_outline/classify.py
+import os
+import struct
+import warnings
+from dataclasses import dataclass
 import numpy as np
 from pathlib import Path
 import pickle
 
 LABELS = ["body", "heading"]           # binary first
 HIDDEN_DIM = 1024                      # Donut-base output size
+DEFAULT_CANVAS = (1280, 960)           # encoder input (H, W) the stock head is trained on
 
-def train_head(embeds: np.ndarray, weak_labels: np.ndarray) -> np.ndarray:
+# ---------- head file -------------------------------------------------------
+# 128‑byte little‑endian header, then float32 W (dim, C) and b (C,) – the
+# array part is memory‑mapped, so opening a head costs one page fault.
+HEAD_MAGIC   = b"PDOHEAD\0"
+HEAD_VERSION = 1
+_HEADER = struct.Struct("<8sHHII64sHH")   # magic, version, reserved, dim, C, encoder hash, canvas
+_HEADER_SIZE = 128
+
+def parse_canvas(spec: str) -> tuple:
+    """'640x480' -> (640, 480)  (height × width, as fed to the encoder)."""
+    try:
+        h, w = (int(v) for v in spec.lower().replace("×", "x").split("x"))
+    except ValueError:
+        raise ValueError(f"canvas must look like 640x480, got {spec!r}") from None
+    if h < 32 or w < 32:
+        raise ValueError(f"canvas {spec!r} is too small")
+    return h, w
+
+def head_path_for(path: Path, canvas: tuple | None = None,
+                  variant: str | None = None) -> Path:
     """
-    Simple logistic regression: W (HIDDEN_DIM,) + b  -> prob heading
-    Closed‑form via least‑squares on logit space.
+    Head file matching an encoder canvas and variant: a head only fits the
+    embeddings of the resolution and graph it was trained on, so reduced
+    canvases and quantised variants get their own file (donut_head.head or
+    .pkl -> donut_head_640x480.head, donut_head_int8_static.head – always
+    the versioned format).  The default canvas and variant keep `path`.
     """
-    # logit ~ linear; add bias term
-    X = np.hstack([embeds, np.ones((embeds.shape[0], 1))])
-    y = weak_labels.reshape(-1, 1)
-    # ridge λ=1e-3 to avoid singular
-    W = np.linalg.inv(X.T @ X + 1e-3 * np.eye(X.shape[1])) @ X.T @ y
-    return W.flatten()
+    path = Path(path)
+    tag = ""
+    if variant not in (None, "default"):
+        tag += f"_{variant}"
+    if canvas is not None and tuple(canvas) != DEFAULT_CANVAS:
+        tag += "_%dx%d" % tuple(canvas)
+    if not tag or path.stem.endswith(tag):
+        return path
+    return path.with_name(path.stem + tag + ".head")
+
+
+@dataclass(frozen=True)
+class Head:
+    """Linear head: logits = X @ w + b; one class → sigmoid, several → softmax."""
+    w: np.ndarray                      # (dim, C) float32
+    b: np.ndarray                      # (C,)     float32
+    model_hash: str = ""               # encoder the head was trained on ("" = unknown)
+    canvas: tuple = DEFAULT_CANVAS
 
-def save_head(weights: np.ndarray, path: Path):
-    with open(path, "wb") as f: pickle.dump(weights, f)
+    @property
+    def dim(self) -> int:
+        return self.w.shape[0]
 
-def load_head(path: Path) -> np.ndarray:
-    with open(path, "rb") as f: return pickle.load(f)
+    @property
+    def n_classes(self) -> int:
+        return self.w.shape[1]
+
+    @classmethod
+    def from_weights(cls, weights: np.ndarray, model_hash: str = "",
+                     canvas: tuple | None = None) -> "Head":
+        """From `train_head` output: (dim + 1,) or (dim + 1, C), bias last."""
+        W = np.asarray(weights, dtype=np.float32)
+        W = W.reshape(-1, 1) if W.ndim == 1 else W
+        return cls(np.ascontiguousarray(W[:-1]), W[-1].copy(), model_hash,
+                   tuple(canvas or DEFAULT_CANVAS))
+
+
+class RidgeAccumulator:
+    """
+    Streaming ridge regression: X @ W + b ≈ y from chunks of any size.
+
+    Only the sufficient statistics XᵀX (d+1, d+1) and Xᵀy (d+1, C) are kept –
+    memory is O(d²) however many pages go in – and `solve` uses a linear
+    solver instead of an explicit inverse.
+    """
+    def __init__(self, dim: int = HIDDEN_DIM, n_classes: int = 1):
+        self.xtx = np.zeros((dim + 1, dim + 1))
+        self.xty = np.zeros((dim + 1, n_classes))
+        self.n = 0
+
+    def update(self, embeds: np.ndarray, labels: np.ndarray) -> None:
+        X = np.asarray(embeds, dtype=np.float64)
+        y = np.asarray(labels, dtype=np.float64).reshape(len(X), -1)
+        s = X.sum(axis=0)
+        d = X.shape[1]
+        self.xtx[:d, :d] += X.T @ X                # bias column handled blockwise,
+        self.xtx[:d, d] += s                       # no hstack with ones
+        self.xtx[d, :d] += s
+        self.xtx[d, d] += len(X)
+        self.xty[:d] += X.T @ y
+        self.xty[d] += y.sum(axis=0)
+        self.n += len(X)
+
+    def solve(self, ridge: float = 1e-3) -> np.ndarray:
+        """(d+1,) weights (bias last), or (d+1, C) for several outputs."""
+        A = self.xtx + ridge * np.eye(len(self.xtx))
+        W = np.linalg.solve(A, self.xty)
+        return W[:, 0] if W.shape[1] == 1 else W
+
+
+def train_logistic(chunks, dim: int = HIDDEN_DIM, epochs: int = 5, lr: float = 0.1,
+                   l2: float = 1e-4, init: np.ndarray | None = None) -> np.ndarray:
+    """
+    Minibatch logistic regression: `chunks()` yields (embeds, 0/1 labels)
+    batches afresh each epoch (e.g. slices of an embedding memmap).
+    Returns (d+1,) weights, bias last – same layout as `train_head`.
+    """
+    w = np.zeros(dim) if init is None else np.asarray(init[:-1], dtype=np.float64).copy()
+    b = 0.0 if init is None else float(init[-1])
+    for _ in range(epochs):
+        for X, y in chunks():
+            p = 1 / (1 + np.exp(-(X @ w + b)))
+            g = p - y
+            w -= lr * (X.T @ g / len(X) + l2 * w)
+            b -= lr * g.mean()
+    return np.append(w, b)
+
+
+def train_head(embeds: np.ndarray, weak_labels: np.ndarray, ridge: float = 1e-3,
+               chunk: int = 4096) -> np.ndarray:
+    """
+    Least squares on the labels (ridge λ to avoid a singular system):
+    W (HIDDEN_DIM,) + b -> prob heading.  In‑memory wrapper around
+    `RidgeAccumulator`; stream chunks into one for large datasets.
+    """
+    acc = RidgeAccumulator(embeds.shape[1], 1 if weak_labels.ndim == 1 else weak_labels.shape[1])
+    for i in range(0, len(embeds), chunk):
+        acc.update(embeds[i:i + chunk], weak_labels[i:i + chunk])
+    return acc.solve(ridge)
+
+def save_head(head, path: Path, model_hash: str = "", canvas: tuple | None = None):
+    """
+    Write a `Head` (or `train_head` weights, stamped with `model_hash`).
+    Atomic: pipelines memory‑mapping the old file never see a torn one.
+    """
+    if not isinstance(head, Head):
+        head = Head.from_weights(head, model_hash, canvas)
+    h, w = head.canvas
+    header = _HEADER.pack(HEAD_MAGIC, HEAD_VERSION, 0, head.dim, head.n_classes,
+                          head.model_hash.encode("ascii"), h, w)
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(header.ljust(_HEADER_SIZE, b"\0"))
+        f.write(np.ascontiguousarray(head.w, dtype="<f4").tobytes())
+        f.write(np.ascontiguousarray(head.b, dtype="<f4").tobytes())
+    os.replace(tmp, path)
+
+def resolve_head(path: Path) -> Path:
+    """
+    The file to load for `path`: for a pre‑v1 pickle (donut_head.pkl) the
+    stamped head converted from it (donut_head.head) if there is one; for a
+    missing `.head` the pickle next to it if only that exists.
+    """
+    path = Path(path)
+    stamped, legacy = path.with_suffix(".head"), path.with_suffix(".pkl")
+    if path == legacy and stamped.exists():
+        return stamped
+    return legacy if not path.exists() and legacy.exists() else path
+
+def load_head(path: Path, model_hash: str | None = None, dim: int | None = None,
+              canvas: tuple | None = None) -> Head:
+    """
+    Memory‑map a head file.  Given the encoder's `model_hash`, `dim` or
+    `canvas`, a head trained for something else raises ValueError.  Old
+    pickled weight vectors still load (unvalidated) with a warning.
+    """
+    path = resolve_head(path)
+    with open(path, "rb") as f:
+        raw = f.read(_HEADER_SIZE)
+    if not raw.startswith(HEAD_MAGIC):
+        warnings.warn(f"{path} is a pickled head without encoder stamp – convert it with "
+                      f"scripts/convert_head.py", stacklevel=2)
+        with open(path, "rb") as f:
+            return Head.from_weights(pickle.load(f))
+    if len(raw) < _HEADER_SIZE:
+        raise ValueError(f"{path}: truncated head header")
+    _, version, _, n, c, mh, h, w = _HEADER.unpack_from(raw)
+    if version != HEAD_VERSION:
+        raise ValueError(f"{path}: head format v{version}, this build reads v{HEAD_VERSION}")
+    head_hash = mh.rstrip(b"\0").decode("ascii")
+    if path.stat().st_size != _HEADER_SIZE + 4 * (n + 1) * c:
+        raise ValueError(f"{path}: size does not match {n}×{c} weights")
+    if dim is not None and n != dim:
+        raise ValueError(f"{path}: head expects {n}‑d embeddings, encoder gives {dim}")
+    if model_hash and head_hash and head_hash != model_hash:
+        raise ValueError(f"{path}: trained on encoder {head_hash[:12]}…, "
+                         f"loaded encoder is {model_hash[:12]}… – retrain or convert")
+    if canvas is not None and (h, w) != tuple(canvas):
+        raise ValueError(f"{path}: trained on canvas {h}x{w}, encoder uses %dx%d" % tuple(canvas))
+    arr = np.asarray(np.memmap(path, dtype="<f4", mode="r", offset=_HEADER_SIZE,
+                               shape=((n + 1) * c,)))
+    return Head(arr[:n * c].reshape(n, c), arr[n * c:], head_hash, (h, w))
 
-def predict(embeds: np.ndarray, weights: np.ndarray) -> np.ndarray:
-    X = np.hstack([embeds, np.ones((embeds.shape[0], 1))])
-    logits = X @ weights
-    return 1 / (1 + np.exp(-logits))   # sigmoid
+def predict(embeds: np.ndarray, head) -> np.ndarray:
+    """(N,) heading probability for a one‑class head, else (N, C) class probabilities."""
+    if not isinstance(head, Head):                 # bare `train_head` weights
+        head = Head.from_weights(head)
+    z = embeds @ head.w
+    z += head.b
+    if head.n_classes == 1:
+        return 1 / (1 + np.exp(-z[:, 0]))          # sigmoid
+    z -= z.max(axis=1, keepdims=True)
+    np.exp(z, out=z)
+    return z / z.sum(axis=1, keepdims=True)        # softmax
@@ -1,71 +1,194 @@
 #!/usr/bin/env python3
-"""extract_outline  –  offline PDF outline extractor CLI"""
+"""
+extract_outline  –  offline PDF outline extractor CLI
+
+Only argparse and the session flags are imported at start‑up; the
+pipeline (NumPy, PyMuPDF, onnxruntime) loads once the arguments are
+parsed, so `--help` and argument errors return immediately.
+"""
 
 from __future__ import annotations
-import argparse, json, time
+import argparse, time
 from pathlib import Path
-import numpy as np
+from typing import TYPE_CHECKING
+
+from pdf_outline.session import add_session_args, profile_from_args
+
+if TYPE_CHECKING:
+    from pdf_outline.pipeline import DocResult
+
+BACKENDS = ("thread", "process")       # = render.BACKENDS, without importing render
 
-from pdf_outline import render_pdf, extract_lines, assign_levels
-from pdf_outline.donut_infer import DonutEncoder
-from pdf_outline.classify import load_head, predict
+
+def _canvas(spec: str) -> tuple:
+    from pdf_outline.classify import parse_canvas
+    try:
+        return parse_canvas(spec)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from None
 
 
 # --------------------------------------------------------------------- CLI
 def _parse() -> argparse.Namespace:
     p = argparse.ArgumentParser(description="Extract Title + H1‑H3 outline from PDF.")
-    p.add_argument("pdf", type=Path, help="input PDF file")
-    p.add_argument("-o", "--out", type=Path, help="output JSON (default <PDF>_outline.json)")
+    p.add_argument("pdf", type=Path, nargs="+",
+                   help="input PDF file(s) or folder(s) of PDFs")
+    p.add_argument("-o", "--out", type=Path,
+                   help="output JSON (default <PDF>_outline.json); "
+                        "an output *folder* when several PDFs are given")
     p.add_argument("--dpi", type=int, default=120, help="render DPI (120 recommended)")
     p.add_argument("--model", type=Path, default=Path("models/donut_base_int8/int8"),
                    help="folder with encoder_model.onnx")
     p.add_argument("--head", type=Path, default=Path("models/donut_head.pkl"),
-                   help="logistic‑head weights file")
+                   help="head file (a converted .head beside a .pkl is used)")
+    p.add_argument("--batch-size", type=int, default=8,
+                   help="pages per ONNX run; peak memory grows with this, not with page count")
+    p.add_argument("--workers", type=int, default=2, help="page rasterisation workers")
+    p.add_argument("--render-backend", choices=BACKENDS, default="thread",
+                   help="'process' scales rasterisation across cores (best for long PDFs)")
+    p.add_argument("--extract-workers", type=int, default=1,
+                   help="parse page text in parallel (same backend as --render-backend)")
+    p.add_argument("--prune-lines", action="store_true",
+                   help="drop lines smaller than their page's body text before "
+                        "classification (they can never be headings)")
+    p.add_argument("--direct", action="store_true",
+                   help="rasterise straight at encoder resolution (ignores --dpi, "
+                        "skips the PIL resize)")
+    p.add_argument("--canvas", type=_canvas, metavar="HxW",
+                   help="reduced encoder input, e.g. 640x480 (~4× less encoder work); "
+                        "uses the head trained for it (<head>_640x480.head)")
+    p.add_argument("--variant", metavar="NAME",
+                   help="encoder variant in --model, e.g. int8_static "
+                        "(encoder_model_int8_static.onnx); uses <head>_<NAME>.head")
+    p.add_argument("--jobs", type=int, default=1,
+                   help="documents in flight; >1 packs pages of several PDFs into "
+                        "shared encoder batches")
+    p.add_argument("--max-latency-ms", type=float, default=50,
+                   help="flush a partial cross‑document batch after this long")
+    p.add_argument("--fast", action="store_true",
+                   help="text‑only mode: heading likelihood from font metadata, no "
+                        "rendering/Donut (falls back automatically for scanned, form‑like "
+                        "or layered‑text PDFs; see layout_probs for measured F1)")
+    p.add_argument("--triage", action="store_true",
+                   help="skip encoding pages with no line larger than body text, bold "
+                        "or numbered (their heading probability is 0)")
+    p.add_argument("--cache", type=Path, metavar="DIR",
+                   help="on‑disk page embedding cache; unchanged pages skip the encoder")
+    p.add_argument("--cache-mb", type=int, default=512, help="embedding cache size limit")
+    p.add_argument("--incremental", type=Path, metavar="DIR",
+                   help="keep per‑page fingerprints + lines + probs here; a revised PDF "
+                        "(same file name) only re‑processes its changed pages")
+    p.add_argument("--stream-window", type=int, default=0, metavar="N",
+                   help="process N pages at a time and append settled outline entries to "
+                        "<out>.ndjson as they are found; the JSON is written at the end")
+    p.add_argument("--metrics", type=Path, metavar="JSONL",
+                   help="append per‑document stage timings here (+ <name>.summary.json)")
+    p.add_argument("--profile", action="store_true",
+                   help="print wall/CPU time per stage, pages/s, batch sizes, peak RSS")
+    add_session_args(p)
     return p.parse_args()
 
 
-# ------------------------------------------------------------------ driver
-def run(pdf_path: Path, out_path: Path,
-        dpi: int, model_dir: Path, head_path: Path) -> None:
-
-    t0 = time.time()
-
-    # 1. raster + text boxes
-    pages  = render_pdf(pdf_path, dpi=dpi, max_workers=2)
-    lines  = extract_lines(pdf_path)
-
-    # 2. CLS embeddings (batched)
-    encoder = DonutEncoder(model_dir)
-    cls_vecs = encoder.encode_pages(pages, batch_size=8)          # (N,1024)
-
-    # 3. heading probability per page then broadcast to lines
-    W = load_head(head_path)
-    page_probs = predict(cls_vecs, W)                             # (N,)
-    probs = np.concatenate([np.full(sum(l["page"] == p for l in lines), page_probs[p])
-                            for p in range(len(pages))])
+def _print_result(r: DocResult) -> None:
+    if r.ok:
+        mode = "  [fast]" if r.stats.get("mode") == "fast" else ""
+        if r.stats.get("pages_pruned"):
+            mode += f"  [{r.stats['pages_pruned']} pages pruned]"
+        if r.stats.get("pages_reused"):
+            mode += f"  [{r.stats['pages_reused']} pages unchanged]"
+        print(f"✓ Saved outline to {r.out}  ({r.pages} pages, {r.seconds:.2f}s){mode}")
+    else:
+        print(f"✗ {r.pdf.name}: {r.error}  ({r.seconds:.1f}s)")
 
-    lines = assign_levels(lines, probs, p_thresh=0.60)
 
-    title_line = next((L for L in lines if L["level"] == "Title"), None)
-    outline = {
-        "title": title_line["text"] if title_line else "",
-        "outline": [
-            {"level": L["level"], "text": L["text"], "page": L["page"] + 1}
-            for L in lines if L["level"] in ("H1", "H2", "H3")
-        ],
-    }
-
-    out_path.write_text(json.dumps(outline, indent=2, ensure_ascii=False))
-    print(f"✓ Saved outline to {out_path}  ({time.time() - t0:.1f}s)")
+# ------------------------------------------------------------------ driver
+def run(pdf_path: Path, out_path: Path,
+        dpi: int, model_dir: Path, head_path: Path,
+        incremental: Path | None = None) -> None:
+    """One‑shot helper: build a pipeline, process a single PDF."""
+    from pdf_outline.pipeline import OutlinePipeline
+    with OutlinePipeline(model_dir, head_path, dpi=dpi, incremental=incremental) as pipe:
+        _print_result(pipe.run(pdf_path, out_path))
+
+
+def _jobs(args: argparse.Namespace) -> list[tuple[Path, Path]]:
+    from pdf_outline.pipeline import dir_jobs
+    pdfs = [p.resolve() for p in args.pdf]
+    for p in pdfs:
+        if not p.exists():
+            raise SystemExit(f"❌ PDF not found: {p}")
+
+    if len(pdfs) == 1 and pdfs[0].is_file():
+        pdf = pdfs[0]
+        return [(pdf, args.out or pdf.with_name(pdf.stem + "_outline.json"))]
+
+    if args.out:
+        args.out.mkdir(parents=True, exist_ok=True)
+    jobs = []
+    for p in pdfs:
+        if p.is_dir():
+            jobs += dir_jobs(p, args.out or p)
+        else:
+            jobs.append((p, (args.out / f"{p.stem}.json") if args.out
+                            else p.with_name(p.stem + "_outline.json")))
+    return jobs
 
 
 def main() -> None:
     args = _parse()
-    pdf  = args.pdf.resolve()
-    if not pdf.exists():
-        raise SystemExit(f"❌ PDF not found: {pdf}")
-    out = args.out or pdf.with_name(pdf.stem + "_outline.json")
-    run(pdf, out, args.dpi, args.model, args.head)
+    jobs = _jobs(args)
+
+    from pdf_outline.cache import EmbeddingCache
+    from pdf_outline.metrics import MetricsLog
+    from pdf_outline.pipeline import OutlinePipeline
+
+    t0   = time.perf_counter()
+    cache = EmbeddingCache(args.cache, max_bytes=args.cache_mb << 20) if args.cache else None
+    pipe = OutlinePipeline(args.model, args.head, dpi=args.dpi,
+                           batch_size=args.batch_size,
+                           render_workers=args.workers,
+                           render_backend=args.render_backend,
+                           direct_render=args.direct,
+                           canvas=args.canvas,
+                           variant=args.variant,
+                           cache=cache,
+                           fast=args.fast,
+                           triage=args.triage,
+                           incremental=args.incremental,
+                           extract_workers=args.extract_workers,
+                           prune_lines=args.prune_lines,
+                           stream_window=args.stream_window,
+                           session_profile=profile_from_args(args))
+    t_load = time.perf_counter() - t0
+
+    log = MetricsLog(args.metrics)
+    results = []
+    for r in pipe.run_many(jobs, concurrency=args.jobs,
+                           max_latency=args.max_latency_ms / 1000):
+        _print_result(r)
+        log.add(r.metrics)
+        results.append(r)
+    log.close()
+    pipe.close()
+
+    if len(jobs) > 1:
+        n_ok = sum(r.ok for r in results)
+        print(f"— {n_ok}/{len(results)} PDFs in {time.perf_counter() - t0:.1f}s "
+              f"(model load {t_load:.1f}s)")
+    if pipe.batch_stats:
+        b = pipe.batch_stats
+        print(f"— encoder: {b['pages']} pages in {b['batches']} batches "
+              f"(mean batch {b['mean_batch']:.1f})")
+    if args.profile:
+        print(log.format_summary(pipe.batch_stats))
+    if args.metrics:
+        log.write_summary(args.metrics.with_suffix(".summary.json"), pipe.batch_stats)
+    if cache is not None:
+        cache.close()
+        print(f"— embedding cache: {cache.hits} hits, {cache.misses} misses "
+              f"({len(cache)}/{cache.capacity} entries)")
+    if any(not r.ok for r in results):
+        raise SystemExit(1)
 
 
 if __name__ == "__main__":
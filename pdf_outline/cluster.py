@@ -9,14 +9,22 @@ Algorithm (General-Purpose Robust Version)
 4.  Merge consecutive heads of same font + x‑bucket on title page.
 5.  Choose Title (largest font, multi‑word, not logo‑tagline).
 6.  Global font ranking → default H1/H2/H3. (Used as a fallback only)
+
+Engine
+------
+Only lines with prob ≥ threshold are looked at; each is stripped / split
+once, numbering depth comes from a single combined regex, and decisions are
+kept as int8 level codes (`LEVELS`) until they are written back.  Output is
+identical to the original multi‑pass dict implementation.
 """
 
 
 import re
 import numpy as np
-from itertools import groupby
 from collections import Counter
 
+from .extract_lines import LEVELS, LineTable
+
 
 # ---------- regex helpers (CORRECTED for general use) ---------------------
 _num_re   = re.compile(r"^\s*\d+(\.\d+)*\s")       # numbering
@@ -24,14 +32,25 @@ _allcaps  = re.compile(r"^[A-Z0-9\s\-]+$")          # logo taglines
 _dots_re  = re.compile(r"^[.\u2022·•_—–-]{3,}$")   # ..... or bullet/separator rows
 _num_only = re.compile(r"^[0-9./-]+$")             # pure numeric cell
 
+# One pass for "1. " (H1), "1.1 " (H2) and "1.1.1 " (H3) – no trailing dot
+# after the last number; the three alternatives are mutually exclusive.
+_pat_num = re.compile(r"^\d+\.(?:(\s)|\d+(?:(\s)|\.\d+\s))")
 
-# CORRECTED: These patterns no longer require a trailing dot after the last digit.
-pat_h1 = re.compile(r"^\d+\.\s")
-pat_h2 = re.compile(r"^\d+\.\d+\s")
-pat_h3 = re.compile(r"^\d+\.\d+\.\d+\s")
+NONE, TITLE, H1, H2, H3 = range(len(LEVELS))       # int8 level codes
+REPEAT_THRESHOLD = 3
 
 
 # ---------- table / form detector (STRICTER HEURISTIC) --------------------
+def _is_table(t: str, words: list) -> bool:
+    """`_looks_like_table` on an already stripped / split line."""
+    if not t: return True
+    if _dots_re.fullmatch(t): return True
+    if _num_only.fullmatch(t): return True
+    if len(t) <= 2: return True
+    if len(words) <= 2 and all(len(w) <= 4 for w in words): return True
+    return False
+
+
 def _looks_like_table(txt: str) -> bool:
     """
     Pragmatic filter for table / form fragments.
@@ -39,100 +58,135 @@ def _looks_like_table(txt: str) -> bool:
     table/form content, at the risk of removing some valid short headings.
     """
     t = txt.strip()
-    if not t: return True
-    if _dots_re.fullmatch(t): return True
-    if _num_only.fullmatch(t): return True
-    if len(t) <= 2: return True
-    words = t.split()
-    if len(words) <= 2 and all(len(w) <= 4 for w in words): return True
-    return False
+    return _is_table(t, t.split())
 
 
-# ---------- utility --------------------------------------------------------
-def _merge_same_font_block(lines):
-    """Merge consecutive heads with identical font & x‑position."""
-    merged = []
-    for _, group in groupby(
-        lines,
-        key=lambda l: (l["font_size"], round(l["bbox"][0] / 2) * 2),
-    ):
-        block = list(group)
-        if len(block) == 1:
-            merged.append(block[0])
-        else:
-            txt = " ".join(b["text"].strip() for b in block)
-            head = block[0].copy()
-            head["text"] = txt
-            merged.append(head)
-    return merged
+def _numbering_level(t: str) -> int:
+    """Level code from a numbering prefix; `t` is stripped text + " "."""
+    m = _pat_num.match(t)
+    if m is None:
+        return NONE
+    if m.group(1) is not None:
+        return H1
+    if m.group(2) is not None:
+        return H2
+    return H3
 
 
-# ---------- main (GENERAL-PURPOSE ROBUST LOGIC) ----------------------------
-def assign_levels(lines, probs, p_thresh=0.90):
-    # 1. basic mark + strict table/filter pass
-    for L, p in zip(lines, probs):
-        L["prob"]    = float(p)
-        L["level"]   = None
-        if _looks_like_table(L["text"]):
-            L["is_head"] = False
+# ---------- engine ---------------------------------------------------------
+def _pick_title(rows, text, key_of, font_size, x0):
+    """
+    Step 4 on the title page's un‑numbered heads `rows` (in line order):
+    merge consecutive same font + x‑bucket, keep the largest‑font groups.
+    Returns (title_rows, title_text); `key_of` maps a row to its stripped text.
+    """
+    groups = []                                    # [size, bucket, first_row, members]
+    for i in rows:
+        size, bucket = font_size[i], round(x0[i] / 2) * 2
+        if groups and groups[-1][0] == size and groups[-1][1] == bucket:
+            groups[-1][3].append(i)
         else:
-            L["is_head"] = p >= p_thresh
+            groups.append([size, bucket, i, [i]])
+    if not groups:
+        return [], ""
+    top_size = max(g[0] for g in groups)
+    cands = []
+    for size, _, first, members in groups:
+        if size != top_size:
+            continue
+        g_text = text[first] if len(members) == 1 else " ".join(key_of[m] for m in members)
+        if _allcaps.match(g_text) and len(g_text.split()) > 4:
+            continue
+        cands.append((members, g_text))
+    if not cands:
+        return [], ""
+    # a merged block is a synthetic line: only single‑line blocks carry the
+    # Title back onto the document lines
+    return ([m[0] for m, _ in cands if len(m) == 1],
+            " ".join(g_text.strip() for _, g_text in cands))
+
+
+def _engine(text, page, font_size, x0, probs, p_thresh):
+    """
+    Core of `assign_levels` over plain columns.
 
-    heads = [L for L in lines if L["is_head"]]
+    Returns (level int8 (N,), is_head bool (N,), title_rows, title_text) –
+    `title_rows` are the lines whose text becomes `title_text`.
+    """
+    n       = len(text)
+    level   = np.zeros(n, dtype=np.int8)
+    is_head = np.zeros(n, dtype=bool)
+
+    # 1. candidates + strict table filter – strip / split once per line
+    cand = np.flatnonzero(np.asarray(probs, dtype=np.float64) >= p_thresh).tolist()
+    rows, keys, nwords = [], [], []
+    for i in cand:
+        t = text[i].strip()
+        words = t.split()
+        if _is_table(t, words):
+            continue
+        rows.append(i)
+        keys.append(t)
+        nwords.append(len(words))
+    if not rows:
+        return level, is_head, [], ""
+
+    # 2. demote short running headers, 3. numbering override
+    counts = Counter(keys)
+    heads, key_of = [], {}
+    for i, t, nw in zip(rows, keys, nwords):
+        if counts[t] >= REPEAT_THRESHOLD and nw <= 5:
+            continue
+        heads.append(i)
+        key_of[i] = t
+        level[i] = _numbering_level(t + " ")
+    is_head[heads] = True
     if not heads:
-        return lines
+        return level, is_head, [], ""
+
+    # 4. title page: merge consecutive same font + x‑bucket, pick largest font
+    title_page = min(page[i] for i in heads)
+    title_rows, title_text = _pick_title(
+        [i for i in heads if page[i] == title_page and level[i] == NONE],
+        text, key_of, font_size, x0)
+    level[title_rows] = TITLE
 
-    # 2. Demote short running headers repeated on ≥3 pages
-    REPEAT_THRESHOLD = 3
-    counts = Counter(h["text"].strip() for h in heads)
-    for h in heads:
-        key = h["text"].strip()
-        if counts[key] >= REPEAT_THRESHOLD and len(key.split()) <= 5:
-            h["level"]   = None
-            h["is_head"] = False
-
-    heads = [h for h in heads if h["is_head"]]
-
-    # 3. Numbering override: High-confidence patterns first
-    for h in heads:
-        if h["level"] is not None: continue
-        t = h["text"].strip() + " " # Add space to handle no-text headings like "4.1"
-        # The order is important: check for most specific (H3) first.
-        if pat_h3.match(t):
-            h["level"] = "H3"
-        elif pat_h2.match(t):
-            h["level"] = "H2"
-        elif pat_h1.match(t):
-            h["level"] = "H1"
-
-    # 4. Title page processing
-    title_page = min((h["page"] for h in heads), default=0)
-    page_heads = [h for h in heads if h["page"] == title_page and h["level"] is None]
-    if page_heads:
-        page_heads = _merge_same_font_block(page_heads)
-        
-        top_size = max((h["font_size"] for h in page_heads), default=0)
-        title_cands = [h for h in page_heads if h["font_size"] == top_size]
-
-        title_cands = [
-            h for h in title_cands
-            if not (_allcaps.match(h["text"]) and len(h["text"].split()) > 4)
-        ]
-
-        if title_cands:
-            title_text = " ".join(h["text"].strip() for h in title_cands)
-            for h in title_cands:
-                h["level"] = "Title"
-                h["text"]  = title_text
-
-    # 5. Global font ranking as a fallback for remaining pages
-    remain = [h for h in heads if h["level"] is None]
+    # 5. global font ranking as a fallback for remaining heads
+    remain = [i for i in heads if level[i] == NONE]
     if remain:
-        uniq   = sorted({h["font_size"] for h in remain}, reverse=True)[:3]
-        size_map = {s: lvl for s, lvl in zip(uniq, ["H1", "H2", "H3"])}
+        uniq = sorted({font_size[i] for i in remain}, reverse=True)[:3]
+        size_map = dict(zip(uniq, (H1, H2, H3)))
+        for i in remain:
+            level[i] = size_map.get(font_size[i], NONE)
 
-        for h in remain:
-            if h["level"] is None:
-                h["level"] = size_map.get(h["font_size"], None)
+    return level, is_head, title_rows, title_text
 
+
+# ---------- main (GENERAL-PURPOSE ROBUST LOGIC) ----------------------------
+def assign_levels(lines, probs, p_thresh=0.90):
+    """
+    `lines` is the `extract_lines` output – a list of dicts (updated in
+    place and returned) or a `LineTable` (its `level`, `prob` and merged
+    Title `text` are filled in and the table is returned).
+    """
+    if isinstance(lines, LineTable):
+        level, _, title_rows, title_text = _engine(
+            lines.text, lines.page.tolist(), lines.font_size.tolist(),
+            lines.bbox[:, 0].tolist(), probs, p_thresh)
+        for i in title_rows:
+            lines.text[i] = title_text
+        lines.level = level
+        lines.prob  = np.asarray(probs, dtype=np.float64)
+        return lines
+
+    level, is_head, title_rows, title_text = _engine(
+        [L["text"] for L in lines], [L["page"] for L in lines],
+        [L["font_size"] for L in lines], [L["bbox"][0] for L in lines],
+        probs, p_thresh)
+    for L, p, code, head in zip(lines, probs, level.tolist(), is_head.tolist()):
+        L["prob"]    = float(p)
+        L["level"]   = LEVELS[code]
+        L["is_head"] = head
+    for i in title_rows:
+        lines[i]["text"] = title_text
     return lines
@@ -0,0 +1,131 @@
+# pdf_outline/document.py
+"""
+PdfDocument  –  one open PyMuPDF handle per PDF (and per worker thread).
+
+`render_pdf`, `iter_pages` and `extract_lines` all accept a PdfDocument, so a
+single document is parsed once instead of 2 + N times.  PyMuPDF handles are
+not thread‑safe: every thread that touches the document lazily gets its own
+handle, the creating thread keeps the one opened in `__init__`.  Handles of
+threads that have exited (per‑call pools) are closed when the next one opens.
+"""
+
+from __future__ import annotations
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import fitz                      # PyMuPDF
+import numpy as np
+from PIL import Image
+
+
+class _PixmapArray:
+    """Exposes a pixmap's samples to NumPy without a copy; the resulting
+    array keeps this holder – and therefore the pixmap – alive."""
+    def __init__(self, pix: fitz.Pixmap):
+        self.pix = pix
+        self.__array_interface__ = {
+            "shape":   (pix.h, pix.w, pix.n),
+            "typestr": "|u1",
+            "data":    (pix.samples_ptr, True),          # read‑only
+            "strides": (pix.stride, pix.n, 1),
+            "version": 3,
+        }
+
+
+def pixmap_array(pix: fitz.Pixmap) -> np.ndarray:
+    """Zero‑copy (h, w, n) uint8 view of `pix.samples`."""
+    return np.asarray(_PixmapArray(pix))
+
+
+class PdfDocument:
+    def __init__(self, pdf_path: str | Path, password: str | None = None):
+        self.path     = Path(pdf_path)
+        self.password = password
+
+        self._lock    = threading.Lock()
+        self._local   = threading.local()
+        self._handles: List[Tuple[threading.Thread, fitz.Document]] = []
+
+        doc = self._open()
+        self._local.doc = doc
+        self.page_count = len(doc)
+
+    # ------------------------------------------------------------------ handles
+    def _open(self) -> fitz.Document:
+        doc = fitz.open(self.path)
+        if doc.needs_pass and not doc.authenticate(self.password or ""):
+            doc.close()
+            raise PermissionError(f"PDF is encrypted, wrong or missing password: {self.path}")
+        with self._lock:
+            dead = [d for t, d in self._handles if not t.is_alive()]
+            self._handles = [(t, d) for t, d in self._handles if t.is_alive()]
+            self._handles.append((threading.current_thread(), doc))
+        for d in dead:
+            d.close()
+        return doc
+
+    @property
+    def doc(self) -> fitz.Document:
+        """The calling thread's handle (opened on first use)."""
+        doc = getattr(self._local, "doc", None)
+        if doc is None:
+            doc = self._local.doc = self._open()
+        return doc
+
+    def close(self) -> None:
+        with self._lock:
+            handles, self._handles = self._handles, []
+        for _, d in handles:
+            d.close()
+
+    def __len__(self) -> int:
+        return self.page_count
+
+    def __enter__(self) -> "PdfDocument":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ------------------------------------------------------------------ pages
+    def pixmap(self, pno: int, dpi: int) -> fitz.Pixmap:
+        """Rasterise page `pno` at `dpi` → RGB pixmap (no alpha)."""
+        page = self.doc.load_page(pno)
+        mat  = fitz.Matrix(dpi / 72, dpi / 72)          # 72 dpi is PDF default
+        return page.get_pixmap(matrix=mat, alpha=False)
+
+    def render(self, pno: int, dpi: int) -> Image.Image:
+        """Rasterise page `pno` at `dpi` → RGB PIL image."""
+        pix = self.pixmap(pno, dpi)
+        return Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+
+    def fitted_pixmap(self, pno: int, height: int, width: int) -> fitz.Pixmap:
+        """
+        Rasterise page `pno` so that its *long edge* spans `height` px and
+        only the part that lands on a `height × width` canvas (top‑left
+        anchored) is drawn – the same framing as resize + paste, but done by
+        MuPDF in one pass.
+        """
+        page  = self.doc.load_page(pno)
+        rect  = page.rect
+        scale = height / max(rect.width, rect.height)
+        clip  = fitz.Rect(rect.x0, rect.y0,
+                          rect.x0 + width / scale, rect.y0 + height / scale) & rect
+        return page.get_pixmap(matrix=fitz.Matrix(scale, scale), clip=clip, alpha=False)
+
+    def render_fitted(self, pno: int, height: int, width: int) -> np.ndarray:
+        """Canvas‑fitted page as a zero‑copy (h ≤ height, w ≤ width, 3) uint8 array."""
+        return pixmap_array(self.fitted_pixmap(pno, height, width))[:height, :width]
+
+    def text_blocks(self, pno: int) -> List[Dict[str, Any]]:
+        """`page.get_text("dict")` blocks for page `pno` (text only)."""
+        page = self.doc.load_page(pno)
+        return page.get_text("dict", flags=fitz.TEXTFLAGS_TEXT)["blocks"]
+
+
+def open_document(pdf: str | Path | PdfDocument) -> tuple[PdfDocument, bool]:
+    """(document, owned) – `owned` is True when the caller must close it."""
+    if isinstance(pdf, PdfDocument):
+        return pdf, False
+    return PdfDocument(pdf), True
@@ -3,104 +3,269 @@ DonutEncoder  –  lightweight ONNX front‑end that returns the CLS embedding
 for each page image.
 
 * loads **one** encoder_model.onnx into ONNXRuntime (CPU) with multi‑threading
+  – or `encoder_model_cls.onnx` when present (`scripts/trim_cls.py`), a
+  graph that emits only the (B, 1024) CLS row instead of (B, seq, 1024)
 * provides `.encode_pages(images, batch_size=8)` that returns   (N, 1024)
   CLS vectors as float32 numpy
+* `.encode_stream(images)` does the same lazily, one batch buffer at a time
+* runs the session through IO binding: the output is written into a
+  per‑thread buffer that is reused across batches instead of a fresh
+  ORT allocation per run
+* `canvas=(h, w)` selects a reduced input resolution, e.g. (640, 480) – about
+  4× less encoder work per page; needs a head trained on that canvas
+  (`classify.head_path_for`) and an export with dynamic height / width
+* `variant="int8_static"` loads `encoder_model_int8_static.onnx` (or its
+  trimmed `_cls` graph) from the same folder instead – fp32 / dynamic /
+  static INT8 exports side by side (`scripts/quantize_int8.py`,
+  `encoder_variants`); each variant has its own hash and head
 """
 
 from __future__ import annotations
-import os, warnings
+import threading, warnings
+from contextlib import nullcontext
+from functools import cached_property
 from pathlib import Path
-from typing import List
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Union
 
 import numpy as np
 from PIL import Image
 import onnxruntime as ort
 
+from .cache import file_sha256
+from .session import SessionProfile
+
+if TYPE_CHECKING:
+    from .metrics import DocMetrics
+
+Page = Union[Image.Image, np.ndarray]   # PIL page or canvas‑fitted (h, w, 3) uint8
+
+ENCODER_MODEL = "encoder_model.onnx"
+CLS_MODEL     = "encoder_model_cls.onnx"             # written by scripts/trim_cls.py
+SOURCE_HASH   = "pdf_outline.source_sha256"          # metadata key of a trimmed graph
+QUANT_INFO    = "pdf_outline.quantization"           # metadata: how a variant was made
+DEFAULT_VARIANT = "default"                          # encoder_model.onnx itself
+
+
+def variant_file(variant: str | None = None, cls: bool = False) -> str:
+    """encoder_model[_<variant>][_cls].onnx"""
+    stem = "encoder_model" if variant in (None, DEFAULT_VARIANT) else f"encoder_model_{variant}"
+    return stem + ("_cls" if cls else "") + ".onnx"
+
+
+def encoder_variants(model_dir: Path | str) -> Dict[str, Path]:
+    """
+    Variant name → ONNX file for the encoders in `model_dir`: "default" for
+    encoder_model.onnx, "int8_static" for encoder_model_int8_static.onnx, …
+    A trimmed `_cls` graph is listed in place of its source.
+    """
+    out: Dict[str, Path] = {}
+    for fp in sorted(Path(model_dir).glob("encoder_model*.onnx")):
+        rest = fp.stem[len("encoder_model"):]
+        cls = rest.endswith("_cls")
+        rest = rest[:-len("_cls")] if cls else rest
+        if rest and not rest.startswith("_"):
+            continue
+        name = rest[1:] or DEFAULT_VARIANT
+        if cls or name not in out:
+            out[name] = fp
+    return out
+
+
+def fit_page(page: Page, slot: np.ndarray) -> None:
+    """
+    Write one page into `slot` (3, h, w): long edge = canvas height
+    (1280 px by default), top‑left on a white canvas.  PIL pages are
+    resized here; uint8 HWC arrays are assumed to be canvas‑fitted
+    already (`iter_pages(fit=…)`) and are normalised straight into the
+    slot with no intermediate copy.
+    """
+    h_canvas, w_canvas = slot.shape[1:]
+    if isinstance(page, np.ndarray):
+        x = page
+    else:
+        im = page.convert("RGB")
+
+        # proportional resize so max(H, W) = canvas height
+        scale = h_canvas / max(im.width, im.height)
+        w, h  = int(im.width * scale), int(im.height * scale)
+        x     = np.asarray(im.resize((w, h), Image.BILINEAR))   # HWC uint8
+
+    # page cropped to the canvas like PIL.paste would, white margins
+    h, w = min(x.shape[0], h_canvas), min(x.shape[1], w_canvas)
+    slot[:, h:, :] = 1.0
+    slot[:, :h, w:] = 1.0
+    np.divide(x[:h, :w, :3].transpose(2, 0, 1), np.float32(255.0),
+              out=slot[:, :h, :w], dtype=np.float32)           # CHW
+
+
+def _untimed(name: str) -> nullcontext:
+    return nullcontext()
+
 
 class DonutEncoder:
-    def __init__(self, model_dir: Path | str):
+    def __init__(self, model_dir: Path | str, io_binding: bool = True,
+                 model_file: str | None = None,
+                 profile: SessionProfile | None = None,
+                 canvas: tuple[int, int] | None = None,
+                 variant: str | None = None):
         model_dir = Path(model_dir)
-        fp = model_dir / "encoder_model.onnx"
+        if model_file:                         # explicit graph, no auto choice
+            fp = model_dir / model_file
+        elif variant in (None, DEFAULT_VARIANT):
+            fp = model_dir / CLS_MODEL
+            if not fp.exists():
+                fp = model_dir / ENCODER_MODEL
+        else:
+            found = encoder_variants(model_dir)
+            if variant not in found:
+                raise FileNotFoundError(
+                    f"No encoder variant {variant!r} in {model_dir} (expected "
+                    f"{variant_file(variant)}; available: {', '.join(found) or 'none'})")
+            fp = found[variant]
         if not fp.exists():
             raise FileNotFoundError(f"Encoder model not found: {fp}")
+        self.model_path = fp
+        self.variant    = variant or DEFAULT_VARIANT
 
-        so = ort.SessionOptions()
-        so.intra_op_num_threads = max(1, (os.cpu_count() or 1) // 2)  # e.g. 4 on 8‑core
-        so.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
-
+        # threads / execution mode / arena … (defaults: cores // 2, ENABLE_ALL)
+        self.profile = profile or SessionProfile()
+        load_path, so = self.profile.resolve(fp)
         self.session = ort.InferenceSession(
-            str(fp), sess_options=so, providers=["CPUExecutionProvider"]
+            str(load_path), sess_options=so, providers=["CPUExecutionProvider"]
         )
+        self.profile.built(fp, so)
+
+        # input name & target shape (Donut base: 1280×960 after padding)
+        inp = self.session.get_inputs()[0]
+        self.input_name = inp.name
+        self.h_canvas, self.w_canvas = canvas or (self.H_CANVAS, self.W_CANVAS)
+        fixed = inp.shape[2:]
+        if any(isinstance(d, int) and d != c for d, c in zip(fixed, self.canvas)):
+            raise ValueError(f"{fp.name} has a static {fixed[0]}×{fixed[1]} input, "
+                             f"canvas {self.h_canvas}×{self.w_canvas} is not supported")
+        self.size = self.h_canvas
 
-        # input name & target shape
-        self.input_name = self.session.get_inputs()[0].name
-        self.size = 1280  # Donut base expects 1280×960 after padding
+        # first output only; rank 2 = CLS‑only graph, rank 3 = hidden states
+        out = self.session.get_outputs()[0]
+        self.output_name = out.name
+        self.cls_only    = len(out.shape) == 2
+        hidden = out.shape[-1]                 # symbolic in some exports → Donut base
+        self.dim         = hidden if isinstance(hidden, int) else 1024
+        self.io_binding  = io_binding
+        self._tls = threading.local()          # IOBinding + output buffer per thread
 
     # ------------------------------------------------------------------ utils
-        # ------------------------------------------------------------------ utils
-    def _preprocess(self, images: List[Image.Image]) -> np.ndarray:
+    H_CANVAS, W_CANVAS = 1280, 960             # default canvas
+
+    @cached_property
+    def model_hash(self) -> str:
         """
-        Resize each page so that its *long edge* = 1280 px, then paste it onto
-        a white 1280 × 960 canvas.  Output tensor shape is therefore
-        (N, 3, 1280, 960) for every batch – exactly what the ONNX encoder
-        expects.
+        sha256 of the ONNX file – ties caches / heads to these weights.  A
+        trimmed CLS graph reports the hash of the model it was cut from.
         """
-        H_CANVAS, W_CANVAS = 1280, 960
-        out = np.zeros((len(images), 3, H_CANVAS, W_CANVAS), dtype=np.float32)
+        meta = self.session.get_modelmeta().custom_metadata_map
+        return meta.get(SOURCE_HASH) or file_sha256(self.model_path)
 
-        for i, im in enumerate(images):
-            im = im.convert("RGB")
+    @property
+    def canvas(self) -> tuple[int, int]:
+        """(height, width) every page is fitted onto."""
+        return self.h_canvas, self.w_canvas
 
-            # proportional resize so max(H, W) = 1280
-            scale = H_CANVAS / max(im.width, im.height)
-            w, h  = int(im.width * scale), int(im.height * scale)
-            im    = im.resize((w, h), Image.BILINEAR)
+    def new_batch(self, batch_size: int) -> np.ndarray:
+        """Reusable (B, 3, h, w) float32 input buffer – (B, 3, 1280, 960) by default."""
+        return np.empty((batch_size, 3, self.h_canvas, self.w_canvas), dtype=np.float32)
 
-            # paste top‑left on white canvas 1280×960
-            canvas = Image.new("RGB", (W_CANVAS, H_CANVAS), (255, 255, 255))
-            canvas.paste(im, (0, 0))
-            x = np.asarray(canvas).astype("float32") / 255.0       # HWC
-            out[i] = x.transpose(2, 0, 1)                          # CHW
+    def _preprocess_into(self, page: Page, slot: np.ndarray) -> None:
+        """One page into a (3, h, w) slot of this encoder's canvas (`fit_page`)."""
+        fit_page(page, slot)
 
+    def _preprocess(self, images: List[Page]) -> np.ndarray:
+        """
+        (N, 3, 1280, 960) tensor for a list of pages – exactly what the ONNX
+        encoder expects.  Prefer `encode_stream`, which never holds more
+        than one batch.
+        """
+        out = self.new_batch(len(images))
+        for i, im in enumerate(images):
+            self._preprocess_into(im, out[i])
         return out
 
+    def _run(self, batch: np.ndarray) -> np.ndarray:
+        """(B, 1024) CLS vectors; the returned array is owned by the caller."""
+        if self.io_binding:
+            return self._run_bound(batch)
+        out = self.session.run([self.output_name], {self.input_name: batch})[0]
+        return out if self.cls_only else out[:, 0, :]
+
+    def _run_bound(self, batch: np.ndarray) -> np.ndarray:
+        tls = self._tls
+        io = getattr(tls, "io", None)
+        if io is None:
+            io = tls.io = self.session.io_binding()
+            tls.out = None
+        # bound by pointer: bind_cpu_input would keep `batch` (≈118 MB at the
+        # default canvas) referenced until the next call on this thread
+        batch = np.ascontiguousarray(batch, dtype=np.float32)
+        io.bind_input(self.input_name, "cpu", 0, np.float32, list(batch.shape),
+                      batch.ctypes.data)
+
+        B, out = len(batch), tls.out
+        if out is None or len(out) < B:
+            # unknown / larger shape: let ORT allocate once, keep it as the buffer
+            io.bind_output(self.output_name, "cpu")
+            self.session.run_with_iobinding(io)
+            out = tls.out = io.copy_outputs_to_cpu()[0]
+        else:
+            view = out[:B]                      # leading‑axis prefix is contiguous
+            io.bind_output(self.output_name, "cpu", 0, np.float32,
+                           list(view.shape), view.ctypes.data)
+            self.session.run_with_iobinding(io)
+        cls = out[:B] if self.cls_only else out[:B, 0, :]
+        return cls.copy()                       # the buffer is reused next batch
+
 
     # ------------------------------------------------------------------ public
-        # ------------------------------------------------------------------ public
-    def encode_pages(
+    def encode_stream(
         self,
-        images: List[Image.Image],
+        images: Iterable[Page],
         batch_size: int = 8,
-    ) -> np.ndarray:
+        metrics: DocMetrics | None = None,
+    ) -> Iterator[np.ndarray]:
         """
-        Return CLS vectors for a list of images.  Works even if the resized
-        pages end up with *different* padded sizes by grouping identical shapes
-        into the same ONNX run.
+        Consume pages lazily and yield one (B, 1024) CLS block per batch, in
+        input order.  A single batch buffer is reused, so peak memory is
+        O(batch_size) regardless of the page count.  With `metrics`, time is
+        split into `preprocess` / `session` and batch sizes are recorded.
         """
-        if not images:
-            return np.zeros((0, 1024), dtype=np.float32)
-
-        arr = self._preprocess(images)          # (N, 3, H?, W?) – H/W may differ
-        cls_vecs = []
-
-        # group indices that share the same (H,W) after padding
-        hw2idx: dict[tuple[int, int], list[int]] = {}
-        for i, x in enumerate(arr):
-            _, h, w = x.shape
-            hw2idx.setdefault((h, w), []).append(i)
-
-        for (h, w), idx_list in hw2idx.items():
-            # split into mini‑batches of identical shape
-            for j in range(0, len(idx_list), batch_size):
-                sel = idx_list[j : j + batch_size]
-                out = self.session.run(
-                    None, {self.input_name: arr[sel]}
-                )[0][:, 0, :]                 # (B, 1024)
-                cls_vecs.append((sel, out))
-
-        # restore original order
-        cls_final = np.zeros((len(images), 1024), dtype=np.float32)
-        for sel, vec in cls_vecs:
-            cls_final[sel, :] = vec
-        return cls_final
+        stage = metrics.stage if metrics is not None else _untimed
+        buf = self.new_batch(batch_size)
+        n = 0
+        for im in images:
+            with stage("preprocess"):
+                self._preprocess_into(im, buf[n])
+            n += 1
+            if n == batch_size:
+                yield self._run_batch(buf, metrics)
+                n = 0
+        if n:
+            yield self._run_batch(buf[:n], metrics)
+
+    def _run_batch(self, batch: np.ndarray, metrics: DocMetrics | None) -> np.ndarray:
+        if metrics is None:
+            return self._run(batch)
+        with metrics.stage("session"):
+            out = self._run(batch)
+        metrics.batches.append(len(batch))
+        return out
 
+    def encode_pages(
+        self,
+        images: Iterable[Page],
+        batch_size: int = 8,
+        metrics: DocMetrics | None = None,
+    ) -> np.ndarray:
+        """Return (N, 1024) CLS vectors for a list (or any iterable) of pages."""
+        blocks = list(self.encode_stream(images, batch_size=batch_size, metrics=metrics))
+        if not blocks:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.concatenate(blocks).astype(np.float32, copy=False)
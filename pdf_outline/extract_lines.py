@@ -1,41 +1,198 @@
 # pdf_outline/extract_lines.py
+from __future__ import annotations
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Dict, Any
-import fitz
+from contextlib import nullcontext
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
 
-def extract_lines(pdf_path: str | Path) -> List[Dict[str, Any]]:
+import numpy as np
+
+from .document import PdfDocument, open_document
+
+# level codes used by `LineTable.level` (int8) – index → name
+LEVELS = (None, "Title", "H1", "H2", "H3")
+
+
+@dataclass
+class LineTable:
+    """
+    Columnar form of the `extract_lines` output – one row per line.
+
+    NumPy columns make per‑page work a gather instead of a rescan:
+    ``probs = page_probs[table.page]``.  `assign_levels` fills `level`
+    (int8 codes into `LEVELS`) and `prob` in place when handed a table.
+    """
+    page:      np.ndarray                  # (N,)   int32
+    bbox:      np.ndarray                  # (N, 4) float64  x0,y0,x1,y1
+    font_size: np.ndarray                  # (N,)   float64
+    is_bold:   np.ndarray                  # (N,)   bool
+    text:      List[str]
+    font_name: List[str]
+    level:     np.ndarray | None = None    # (N,)   int8 code into LEVELS
+    prob:      np.ndarray | None = None
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+    @classmethod
+    def from_records(cls, lines: Sequence[Dict[str, Any]]) -> "LineTable":
+        n = len(lines)
+        return cls(
+            page      = np.fromiter((L["page"] for L in lines), np.int32, n),
+            bbox      = np.array([L["bbox"] for L in lines], dtype=np.float64).reshape(n, 4),
+            font_size = np.fromiter((L["font_size"] for L in lines), np.float64, n),
+            is_bold   = np.fromiter((L["is_bold"] for L in lines), bool, n),
+            text      = [L["text"] for L in lines],
+            font_name = [L["font_name"] for L in lines],
+        )
+
+    def records(self) -> List[Dict[str, Any]]:
+        """Row view as `extract_lines` dicts (plus level/prob once assigned)."""
+        out = [
+            {"page": int(p), "text": t, "bbox": tuple(b.tolist()),
+             "font_size": float(s), "font_name": f, "is_bold": bool(bo)}
+            for p, t, b, s, f, bo in zip(self.page, self.text, self.bbox,
+                                         self.font_size, self.font_name, self.is_bold)
+        ]
+        if self.level is not None:
+            for L, code in zip(out, self.level.tolist()):
+                L["level"] = LEVELS[code]
+        return out
+
+
+# ---------- per‑page engine -----------------------------------------------
+PRUNE_BELOW = 0.95          # with prune: drop lines smaller than page body × this
+
+# one page as parallel columns – cheap to pickle back from a worker process
+PageRows = Tuple[List[str], List[str], List[Tuple[float, float, float, float]], List[float]]
+
+
+def _page_rows(doc: PdfDocument, pno: int, prune: bool = False) -> PageRows:
+    """(texts, fonts, bboxes, sizes) of page `pno`, no per‑line dict."""
+    texts, fonts, bboxes, sizes = [], [], [], []
+    for b in doc.text_blocks(pno):
+        if b["type"] != 0:        # 0 = text, 1 = image, etc.
+            continue
+        for line in b["lines"]:
+            spans = line["spans"]
+            if not spans:
+                continue
+            text = (spans[0]["text"] if len(spans) == 1
+                    else "".join(s["text"] for s in spans)).strip()
+            if not text:
+                continue
+            # assume uniform style inside a line – take first span
+            span = spans[0]
+            texts.append(text)
+            fonts.append(span["font"])
+            bboxes.append(tuple(line["bbox"]))      # (x0,y0,x1,y1)
+            sizes.append(span["size"])
+    if prune and texts:
+        # footnotes, captions, page furniture: never larger than body text
+        hist: Dict[float, int] = {}
+        for size, text in zip(sizes, texts):
+            key = round(size * 2) / 2
+            hist[key] = hist.get(key, 0) + len(text)
+        limit = max(hist, key=hist.get) * PRUNE_BELOW     # char‑weighted modal size
+        keep = [i for i, size in enumerate(sizes) if size >= limit]
+        if len(keep) < len(texts):
+            texts  = [texts[i] for i in keep]
+            fonts  = [fonts[i] for i in keep]
+            bboxes = [bboxes[i] for i in keep]
+            sizes  = [sizes[i] for i in keep]
+    return texts, fonts, bboxes, sizes
+
+
+def _proc_extract_range(key: Tuple, pnos: Sequence[int], prune: bool) -> List[PageRows]:
+    from .render import _worker_doc          # the worker's handle for `key`
+    doc = _worker_doc(key)
+    return [_page_rows(doc, pno, prune) for pno in pnos]
+
+
+def _iter_rows(doc: PdfDocument, pnos: List[int], workers: int, backend: str,
+               prune: bool, chunk: int, pool: Executor | None = None) -> Iterator[PageRows]:
+    """Page columns in page order; threads share `doc` (one handle each)."""
+    if workers <= 1 or len(pnos) < 2 * chunk:
+        for pno in pnos:
+            yield _page_rows(doc, pno, prune)
+        return
+    if backend == "process":
+        from .render import doc_key, process_pool
+        runs = [pnos[i:i + chunk] for i in range(0, len(pnos), chunk)]
+        with (nullcontext(pool) if pool is not None else process_pool(workers)) as pool:
+            for rows in pool.map(_proc_extract_range, [doc_key(doc)] * len(runs), runs,
+                                 [prune] * len(runs)):
+                yield from rows
+        return
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(lambda pno: _page_rows(doc, pno, prune), pnos)
+
+
+def page_lines(doc: PdfDocument, pno: int, prune: bool = False) -> List[Dict[str, Any]]:
+    """Line dicts for a single page (see `extract_lines` for the keys)."""
+    texts, fonts, bboxes, sizes = _page_rows(doc, pno, prune)
+    return [{"page": pno, "text": t, "bbox": b, "font_size": s,
+             "font_name": f, "is_bold": "Bold" in f}
+            for t, f, b, s in zip(texts, fonts, bboxes, sizes)]
+
+
+def extract_table(pdf: str | Path | PdfDocument,
+                  workers: int = 1,
+                  backend: str = "thread",
+                  prune: bool = False,
+                  pages: Sequence[int] | None = None,
+                  chunk: int = 16,
+                  pool: Executor | None = None) -> LineTable:
+    """
+    `extract_lines(columnar=True)` built straight from per‑page columns.
+
+    With `workers` > 1 pages are parsed in parallel – threads with one
+    PyMuPDF handle each, or (``backend="process"``) worker processes that
+    keep the PDF open and parse `chunk` pages per task (in `pool`, a
+    `render.process_pool`, if given).  `prune` drops
+    lines smaller than their page's body text, which can never be headings.
+    """
+    doc, owned = open_document(pdf)
+    try:
+        pnos = list(range(len(doc))) if pages is None else [int(p) for p in pages]
+        counts, texts, fonts, bboxes, sizes = [], [], [], [], []
+        for t, f, b, s in _iter_rows(doc, pnos, workers, backend, prune, max(1, chunk), pool):
+            counts.append(len(t))
+            texts += t
+            fonts += f
+            bboxes += b
+            sizes += s
+    finally:
+        if owned:
+            doc.close()
+    n = len(texts)
+    return LineTable(
+        page      = np.repeat(np.asarray(pnos, dtype=np.int32), counts),
+        bbox      = np.array(bboxes, dtype=np.float64).reshape(n, 4),
+        font_size = np.array(sizes, dtype=np.float64),
+        is_bold   = np.fromiter(("Bold" in f for f in fonts), bool, n),
+        text      = texts,
+        font_name = fonts,
+    )
+
+
+def extract_lines(pdf: str | Path | PdfDocument,
+                  columnar: bool = False) -> List[Dict[str, Any]] | LineTable:
     """
     Output: list of dicts with keys
        page, text, bbox(x0,y0,x1,y1), font_size, font_name, is_bold
+    or, with `columnar=True`, the same data as a `LineTable`.
     Empty/whitespace lines are skipped.
     """
-    out: List[Dict[str, Any]] = []
-    pdf_path = Path(pdf_path)
-
-    with fitz.open(pdf_path) as doc:
+    if columnar:
+        return extract_table(pdf)
+    doc, owned = open_document(pdf)
+    try:
+        out: List[Dict[str, Any]] = []
         for pno in range(len(doc)):
-            page = doc.load_page(pno)
-            blocks = page.get_text("dict", flags=fitz.TEXTFLAGS_TEXT)["blocks"]
-
-            for b in blocks:
-                if b["type"] != 0:        # 0 = text, 1 = image, etc.
-                    continue
-                for line in b["lines"]:
-                    if not line["spans"]:
-                        continue
-                    text = "".join(s["text"] for s in line["spans"]).strip()
-                    if not text:
-                        continue
-                    # assume uniform style inside a line – take first span
-                    span = line["spans"][0]
-                    out.append(
-                        {
-                            "page": pno,
-                            "text": text,
-                            "bbox": tuple(line["bbox"]),        # (x0,y0,x1,y1)
-                            "font_size": span["size"],
-                            "font_name": span["font"],
-                            "is_bold": "Bold" in span["font"],
-                        }
-                    )
-    return out
+            out += page_lines(doc, pno)
+        return out
+    finally:
+        if owned:
+            doc.close()
@@ -0,0 +1,131 @@
+# pdf_outline/manifest.py
+"""
+PageManifest  –  per‑document record of what each page looked like last time.
+
+    store = ManifestStore("cache/manifests")
+    old   = store.load("report.pdf")               # None on first sight
+    fps   = page_fingerprints(doc)
+    ...                                            # reuse pages whose fp is in `old`
+    store.save("report.pdf", PageManifest(config, entries))
+
+A page fingerprint hashes everything text extraction and rendering read:
+the raw content streams, the image / form XObject streams and font objects
+it references, its annotations and form widgets (their objects, appearance
+streams and parent fields), its mediabox and rotation.  Pages are matched by fingerprint,
+not position, so inserting or deleting a page leaves the other pages
+reusable.  Per page the manifest keeps the extracted lines (without their
+page index) and the page heading probability; the probability is only
+trusted while `config` (render key, encoder + head hash) is unchanged.
+
+One JSON file per document (keyed by file name), replaced atomically.
+"""
+
+from __future__ import annotations
+import hashlib, json, os, re, threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+
+from .document import PdfDocument
+
+MANIFEST_VERSION = 1
+_REF = re.compile(r"(\d+) 0 R")                 # indirect references in an object
+
+
+def page_fingerprints(doc: PdfDocument) -> List[str]:
+    """sha1 per page of its content + referenced image / form / font objects + annotations."""
+    d = doc.doc
+    seen: Dict[int, bytes] = {}                 # xref → digest, shared resources hash once
+
+    def xref_digest(xref: int) -> bytes:
+        if xref not in seen:
+            h = hashlib.sha1(d.xref_object(xref, compressed=True).encode())
+            if d.xref_is_stream(xref):
+                h.update(d.xref_stream_raw(xref) or b"")
+            seen[xref] = h.digest()
+        return seen[xref]
+
+    out = []
+    for pno in range(len(doc)):
+        page = d.load_page(pno)
+        h = hashlib.sha1(b"%r|%d" % (tuple(page.mediabox), page.rotation))
+        for xref in page.get_contents():
+            h.update(d.xref_stream_raw(xref) or b"")
+        for xref in sorted({img[0] for img in page.get_images(full=True)}
+                           | {x[0] for x in page.get_xobjects()}
+                           | {f[0] for f in page.get_fonts(full=True)}):
+            if xref > 0:
+                h.update(xref_digest(xref))
+        # rendered too: stamps, markup, form fields (value may sit on the parent)
+        for xref, *_ in page.annot_xrefs():
+            h.update(xref_digest(xref))
+            for key in ("AP", "Parent"):
+                kind, val = d.xref_get_key(xref, key)
+                if kind in ("xref", "dict"):
+                    for ref in _REF.findall(val):
+                        h.update(xref_digest(int(ref)))
+        out.append(h.hexdigest())
+    return out
+
+
+@dataclass
+class PageEntry:
+    fp:    str
+    lines: List[Dict[str, Any]]                 # `page_lines` dicts minus "page"
+    prob:  float | None = None                  # page heading prob; None = not encoded
+
+
+@dataclass
+class PageManifest:
+    config:  Dict[str, str]
+    entries: List[PageEntry] = field(default_factory=list)
+
+    def by_fp(self) -> Dict[str, PageEntry]:
+        return {e.fp: e for e in reversed(self.entries)}   # first page wins
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "version": MANIFEST_VERSION, "config": self.config,
+            "pages": [{"fp": e.fp, "prob": e.prob,
+                       "lines": [[L["text"], list(L["bbox"]), L["font_size"],
+                                  L["font_name"], L["is_bold"]] for L in e.lines]}
+                      for e in self.entries]}, separators=(",", ":"), ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, text: str) -> "PageManifest | None":
+        data = json.loads(text)
+        if data.get("version") != MANIFEST_VERSION:
+            return None
+        return cls(data["config"], [
+            PageEntry(p["fp"], [{"text": t, "bbox": tuple(b), "font_size": s,
+                                 "font_name": f, "is_bold": bo}
+                                for t, b, s, f, bo in p["lines"]], p["prob"])
+            for p in data["pages"]])
+
+
+def with_page(lines: Sequence[Dict[str, Any]], pno: int) -> List[Dict[str, Any]]:
+    """Stored lines → `extract_lines` dicts for page `pno`."""
+    return [{"page": pno, **L} for L in lines]
+
+
+class ManifestStore:
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def path(self, doc_id: str) -> Path:
+        name = re.sub(r"[^\w.-]", "_", Path(doc_id).name)
+        return self.root / f"{name}.manifest.json"
+
+    def load(self, doc_id: str) -> PageManifest | None:
+        fp = self.path(doc_id)
+        try:
+            return PageManifest.from_json(fp.read_text(encoding="utf-8"))
+        except (OSError, ValueError, KeyError, TypeError):
+            return None                         # missing / unreadable → full run
+
+    def save(self, doc_id: str, manifest: PageManifest) -> None:
+        fp = self.path(doc_id)
+        tmp = fp.with_name(f"{fp.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(manifest.to_json(), encoding="utf-8")
+        os.replace(tmp, fp)
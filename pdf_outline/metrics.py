@@ -0,0 +1,180 @@
+# pdf_outline/metrics.py
+"""
+Per‑stage instrumentation – cheap enough to leave on.
+
+`DocMetrics` records, for one document, wall and CPU seconds per stage
+(open, extract, triage, render, preprocess, session, encode, classify,
+assign, write), the ONNX batch sizes it ran and the process' peak RSS.  A
+stage costs two clock reads on entry and two on exit.  Stages are
+*exclusive*: time spent in a nested stage (e.g. `render` while the encoder
+pulls the next page) is not counted again in the enclosing one, so the
+stage times of a document add up to its wall time.
+
+CPU time is the calling thread's (`time.thread_time`): work done by render
+worker threads / processes shows up as `render` *wall* time in the
+document thread that waited for it.
+
+`MetricsLog` collects the records of a run, optionally appends each one as
+a JSON line to a file, and aggregates them into a summary (per stage
+totals, pages/s, document latency percentiles, batch sizes, peak RSS).
+"""
+
+from __future__ import annotations
+import json, resource, sys, threading, time
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterable, Iterator, List, TypeVar
+
+import numpy as np
+
+T = TypeVar("T")
+
+
+def peak_rss_mb() -> float:
+    """High‑water resident set size of this process, MiB."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1 << 20) if sys.platform == "darwin" else rss / 1024   # bytes vs KiB
+
+
+class DocMetrics:
+    """Stage timings of one document; use from the document's own thread."""
+
+    def __init__(self) -> None:
+        self.wall: Dict[str, float] = defaultdict(float)
+        self.cpu:  Dict[str, float] = defaultdict(float)
+        self.batches: List[int] = []              # ONNX batch sizes run for this doc
+        self._stack: List[str] = []
+        self._t0 = time.perf_counter()
+        self._c0 = time.thread_time()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        w, c = time.perf_counter(), time.thread_time()
+        self._stack.append(name)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            self.add(name, time.perf_counter() - w, time.thread_time() - c)
+
+    def add(self, name: str, wall: float, cpu: float = 0.0) -> None:
+        self.wall[name] += wall
+        self.cpu[name]  += cpu
+        if self._stack:                           # keep the parent exclusive
+            self.wall[self._stack[-1]] -= wall
+            self.cpu[self._stack[-1]]  -= cpu
+
+    def timed(self, items: Iterable[T], name: str) -> Iterator[T]:
+        """Yield from `items`, charging the time spent waiting on it to `name`."""
+        it = iter(items)
+        while True:
+            with self.stage(name):
+                try:
+                    x = next(it)
+                except StopIteration:
+                    return
+            yield x
+
+    def record(self, **extra: Any) -> Dict[str, Any]:
+        """JSON‑ready dict: totals, per‑stage wall/CPU, batches, peak RSS."""
+        wall = time.perf_counter() - self._t0
+        cpu  = time.thread_time() - self._c0
+        pages = extra.get("pages", 0)
+        return {
+            **extra,
+            "wall_s": round(wall, 4),
+            "cpu_s":  round(cpu, 4),
+            "pages_per_s": round(pages / wall, 2) if wall and pages else 0.0,
+            "stages": {k: {"wall_s": round(self.wall[k], 4), "cpu_s": round(self.cpu[k], 4)}
+                       for k in self.wall},
+            "batches": self.batches,
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+        }
+
+
+class MetricsLog:
+    """
+    Run‑wide collector; `path` gets one JSON line per document.  `keep`
+    bounds the records held for `summary()` (long‑running services).
+    """
+
+    def __init__(self, path: Path | str | None = None, keep: int | None = None) -> None:
+        self.path = Path(path) if path else None
+        self.records: Deque[Dict[str, Any]] = deque(maxlen=keep)
+        self._lock = threading.Lock()
+        self._fh = self.path.open("a") if self.path else None
+        self._t0 = time.perf_counter()
+
+    def add(self, rec: Dict[str, Any]) -> None:
+        with self._lock:
+            self.records.append(rec)
+            if self._fh is not None:
+                self._fh.write(json.dumps(rec, ensure_ascii=False) + "\n")
+                self._fh.flush()
+
+    def close(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def summary(self, encoder: Dict[str, Any] | None = None) -> Dict[str, Any]:
+        """
+        Aggregate of all records; `encoder` is `BatchScheduler.stats` when
+        pages of several documents shared batches.
+        """
+        recs = self.records
+        wall = time.perf_counter() - self._t0
+        pages = sum(r.get("pages", 0) for r in recs)
+        stage_wall, stage_cpu = Counter(), Counter()
+        batches: List[int] = []
+        for r in recs:
+            for k, v in r.get("stages", {}).items():
+                stage_wall[k] += v["wall_s"]
+                stage_cpu[k]  += v["cpu_s"]
+            batches += r.get("batches", [])
+        if encoder and encoder.get("sizes"):
+            batches = [int(b) for b, n in encoder["sizes"].items() for _ in range(n)]
+        doc_s = [r["wall_s"] for r in recs]
+        total = sum(stage_wall.values()) or 1.0
+        return {
+            "docs": len(recs),
+            "failed": sum(1 for r in recs if r.get("error")),
+            "pages": pages,
+            "wall_s": round(wall, 2),
+            "pages_per_s": round(pages / wall, 2) if wall else 0.0,
+            "doc_s": dict(zip(("p50", "p90", "p99", "max"),
+                              (round(float(x), 3) for x in
+                               (*np.percentile(doc_s, (50, 90, 99)), max(doc_s))))) if doc_s else {},
+            "stages": {k: {"wall_s": round(stage_wall[k], 3), "cpu_s": round(stage_cpu[k], 3),
+                           "share": round(stage_wall[k] / total, 3)}
+                       for k, _ in stage_wall.most_common()},
+            "batches": {"count": len(batches),
+                        "mean": round(float(np.mean(batches)), 2) if batches else 0.0,
+                        "sizes": dict(sorted(Counter(batches).items()))},
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+        }
+
+    def write_summary(self, path: Path | str,
+                      encoder: Dict[str, Any] | None = None) -> None:
+        Path(path).write_text(json.dumps(self.summary(encoder), indent=2))
+
+    def format_summary(self, encoder: Dict[str, Any] | None = None) -> str:
+        s = self.summary(encoder)
+        out = [f"{s['docs']} docs, {s['pages']} pages in {s['wall_s']:.1f}s "
+               f"({s['pages_per_s']:.1f} pages/s), peak RSS {s['peak_rss_mb']:.0f} MiB"]
+        if s["doc_s"]:
+            d = s["doc_s"]
+            out.append(f"per doc  p50 {d['p50']:.2f}s  p90 {d['p90']:.2f}s  "
+                       f"p99 {d['p99']:.2f}s  max {d['max']:.2f}s")
+        out.append(f"{'stage':<11} {'wall s':>8} {'cpu s':>8} {'share':>6}")
+        for k, v in s["stages"].items():
+            out.append(f"{k:<11} {v['wall_s']:>8.2f} {v['cpu_s']:>8.2f} {v['share']:>6.1%}")
+        b = s["batches"]
+        if b["count"]:
+            out.append(f"ONNX batches: {b['count']} (mean size {b['mean']:.1f}; "
+                       + ", ".join(f"{k}×{v}" for k, v in b["sizes"].items()) + ")")
+        if encoder and "session_s" in encoder:  # shared dispatcher, not per document
+            out.append(f"shared encoder: preprocess {encoder['preprocess_s']:.2f}s, "
+                       f"session {encoder['session_s']:.2f}s (inside `encode` above)")
+        return "\n".join(out)
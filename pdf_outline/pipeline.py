@@ -0,0 +1,518 @@
+# pdf_outline/pipeline.py
+"""
+OutlinePipeline  –  long‑lived driver for many PDFs.
+
+* builds the ONNX `InferenceSession` and loads the head weights **once**
+* `.run(pdf, out)` processes one document and writes its JSON outline
+* `.run_many(jobs)` streams `DocResult`s (outline + wall time) for a batch
+* with `incremental=DIR` a revised PDF only re‑extracts / re‑encodes the
+  pages whose content fingerprint changed (see `manifest.py`)
+* with `stream_window=N` pages go through N at a time and settled outline
+  entries are written to `<out>.ndjson` as they are found (see `stream.py`)
+* with `render_backend="process"` one pool of worker processes renders and
+  parses every document; `.close()` (or `with`) stops it
+
+The encoder (onnxruntime) is imported on first use, so `fast=True` runs
+that never need it do not pay for loading it.
+"""
+
+from __future__ import annotations
+import hashlib, json, os, threading, time, traceback
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import Executor, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from functools import cached_property
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+from .cache import EmbeddingCache, file_sha256
+from .document import PdfDocument
+from .render import iter_pages
+from .extract_lines import LEVELS, LineTable, extract_table, page_lines
+from .classify import DEFAULT_CANVAS, Head, head_path_for, load_head, predict, resolve_head
+from .cluster import assign_levels
+from .layout_probs import degenerate_reason, line_heading_probs
+from .manifest import ManifestStore, PageEntry, PageManifest, page_fingerprints, with_page
+from .metrics import DocMetrics
+from .session import SessionProfile
+from .stream import Emit, NdjsonWriter, OutlineStream
+from .triage import candidate_pages
+
+if TYPE_CHECKING:
+    from .donut_infer import DonutEncoder
+    from .scheduler import BatchScheduler
+
+
+# ---------- result record --------------------------------------------------
+@dataclass
+class DocResult:
+    pdf: Path
+    out: Path | None
+    outline: Dict[str, Any] | None
+    seconds: float
+    pages: int = 0
+    error: str | None = None
+    stats: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @property
+    def metrics(self) -> Dict[str, Any]:
+        """Per‑document `DocMetrics` record (a stub for failed documents)."""
+        return self.stats.get("metrics") or {
+            "pdf": str(self.pdf), "error": self.error, "wall_s": round(self.seconds, 4)}
+
+
+# ---------- helpers --------------------------------------------------------
+def build_outline(lines: List[Dict[str, Any]] | LineTable) -> Dict[str, Any]:
+    """Lines with `level` set → {"title": ..., "outline": [...]}."""
+    if isinstance(lines, LineTable):
+        rows = [(LEVELS[c], t, p) for c, t, p in
+                zip(lines.level.tolist(), lines.text, lines.page.tolist())]
+        return {
+            "title": next((t for lvl, t, _ in rows if lvl == "Title"), ""),
+            "outline": [
+                {"level": lvl, "text": t, "page": p + 1}
+                for lvl, t, p in rows if lvl in ("H1", "H2", "H3")
+            ],
+        }
+    title_line = next((L for L in lines if L["level"] == "Title"), None)
+    return {
+        "title": title_line["text"] if title_line else "",
+        "outline": [
+            {"level": L["level"], "text": L["text"], "page": L["page"] + 1}
+            for L in lines if L["level"] in ("H1", "H2", "H3")
+        ],
+    }
+
+
+def render_key(dpi: int, canvas: Tuple[int, int] = DEFAULT_CANVAS, direct: bool = False) -> str:
+    """Embedding‑cache key part for how a page reached the encoder."""
+    if direct:
+        return "fit%dx%d" % tuple(canvas)
+    if tuple(canvas) != DEFAULT_CANVAS:        # same raster, different encoder input
+        return f"dpi{dpi}@%dx%d" % tuple(canvas)
+    return f"dpi{dpi}"
+
+
+def write_outline(outline: Dict[str, Any], out_path: Path) -> None:
+    """Atomic: a reader (or a resumed batch) never sees a half‑written JSON."""
+    out_path = Path(out_path)
+    tmp = out_path.with_name(f".{out_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_text(json.dumps(outline, indent=2, ensure_ascii=False))
+    os.replace(tmp, out_path)
+
+
+# ---------- pipeline -------------------------------------------------------
+class OutlinePipeline:
+    def __init__(self,
+                 model_dir: Path | str,
+                 head_path: Path | str,
+                 dpi: int = 120,
+                 p_thresh: float = 0.60,
+                 batch_size: int = 8,
+                 render_workers: int = 2,
+                 render_backend: str = "thread",
+                 direct_render: bool = False,
+                 cache: EmbeddingCache | None = None,
+                 fast: bool = False,
+                 triage: bool = False,
+                 session_profile: SessionProfile | None = None,
+                 canvas: Tuple[int, int] | None = None,
+                 incremental: Path | str | None = None,
+                 extract_workers: int = 1,
+                 prune_lines: bool = False,
+                 stream_window: int = 0,
+                 variant: str | None = None):
+        self.dpi            = dpi
+        self.p_thresh       = p_thresh
+        self.batch_size     = batch_size
+        self.render_workers = render_workers
+        self.render_backend = render_backend
+        self.direct_render  = direct_render        # rasterise at encoder canvas size
+        self.cache          = cache                # page CLS vectors, keyed by content
+        self.fast           = fast                 # layout‑only probs when usable
+        self.triage         = triage               # skip pages with no heading cue
+        self.session_profile = session_profile     # ORT threads / arena / …
+        self.canvas         = tuple(canvas or DEFAULT_CANVAS)   # encoder input (H, W)
+        self.manifests      = ManifestStore(incremental) if incremental else None
+        self.extract_workers = extract_workers     # page text parsing (render_backend)
+        self.prune_lines    = prune_lines          # drop lines below page body size
+        self.stream_window  = stream_window        # >0: `run` streams NDJSON per window
+        self.variant        = variant              # encoder_model_<variant>.onnx (None = default)
+
+        self.model_dir = Path(model_dir)
+        self.head_path = head_path_for(head_path, self.canvas, variant)   # head of this encoder
+        self._lock      = threading.Lock()         # lazy loads + cache access
+        self._encoder: DonutEncoder | None = None
+        self._head: Head | None            = None
+        self._scheduler: BatchScheduler | None = None
+        self._procs: Executor | None = None        # process backend workers, all documents
+        self.batch_stats: Dict[str, Any] = {}     # last concurrent run_many
+        if not fast:                               # fail early, load once
+            self.encoder, self.head
+
+    # ------------------------------------------------------------------ models
+    @property
+    def encoder(self) -> DonutEncoder:
+        with self._lock:
+            if self._encoder is None:
+                from .donut_infer import DonutEncoder
+                self._encoder = DonutEncoder(self.model_dir, profile=self.session_profile,
+                                             canvas=self.canvas, variant=self.variant)
+            return self._encoder
+
+    @property
+    def head(self) -> Head:
+        enc = self.encoder                     # validated against, loaded outside the lock
+        with self._lock:
+            if self._head is None:
+                if not resolve_head(self.head_path).exists():
+                    hint = " --canvas %dx%d" % self.canvas if self.canvas != DEFAULT_CANVAS else ""
+                    if enc.variant != "default":
+                        hint += f" --variant {enc.variant}"
+                    raise FileNotFoundError(
+                        f"{self.head_path}: no head for this encoder – train one with "
+                        f"scripts/train_head.py{hint}")
+                head = load_head(self.head_path, model_hash=enc.model_hash,
+                                 canvas=self.canvas)
+                if head.n_classes != 1:
+                    raise ValueError(
+                        f"{self.head_path}: {head.n_classes}-class head – the pipeline "
+                        f"needs a single heading probability per page (n_classes=1)")
+                self._head = head
+            return self._head
+
+    def _workers(self) -> Executor | None:
+        """The process backend's worker pool, started on first use (else None)."""
+        if self.render_backend != "process":
+            return None
+        with self._lock:
+            if self._procs is None:
+                from .render import process_pool
+                self._procs = process_pool(max(self.render_workers, self.extract_workers))
+            return self._procs
+
+    def close(self) -> None:
+        """Stop the worker processes (if any); the pipeline restarts them on use."""
+        with self._lock:
+            procs, self._procs = self._procs, None
+        if procs is not None:
+            procs.shutdown()
+
+    def __enter__(self) -> "OutlinePipeline":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ------------------------------------------------------------------ core
+    def _render_key(self) -> str:
+        return render_key(self.dpi, self.canvas, self.direct_render)
+
+    def _encode(self, doc: PdfDocument, pages: Sequence[int] | None = None,
+                m: DocMetrics | None = None,
+                pool: Executor | None = None) -> np.ndarray:
+        """Render + encode `pages` (all by default), streamed through one batch buffer."""
+        fit = self.encoder.canvas if self.direct_render else None
+        imgs = iter_pages(doc, dpi=self.dpi, max_workers=self.render_workers,
+                          prefetch=2 * self.batch_size, backend=self.render_backend,
+                          fit=fit, pages=pages, pool=pool or self._workers())
+        if m is not None:                          # waiting for a raster = render
+            imgs = m.timed(imgs, "render")
+        if self._scheduler is not None:            # cross‑document batches
+            return self._scheduler.encode(imgs, len(doc) if pages is None else len(pages))
+        return self.encoder.encode_pages(imgs, batch_size=self.batch_size, metrics=m)
+
+    def _embed(self, doc: PdfDocument, stats: Dict[str, Any],
+               pages: Sequence[int] | None = None,
+               m: DocMetrics | None = None,
+               pool: ThreadPoolExecutor | None = None) -> np.ndarray:
+        """
+        (len(pages), 1024) CLS vectors for `pages` (all by default); cached
+        pages never reach the encoder.  `pool`: render threads to reuse.
+        """
+        pages = list(range(len(doc))) if pages is None else [int(p) for p in pages]
+        if self.cache is None:
+            return self._encode(doc, pages, m, pool)
+
+        pdf_hash = file_sha256(doc.path)
+        keys = [self.cache.key(pdf_hash, p, self._render_key(), self.encoder.model_hash)
+                for p in pages]
+        with self._lock:
+            cls_vecs, hit = self.cache.get_many(keys)
+        miss = np.flatnonzero(~hit)
+        if miss.size:
+            cls_vecs[miss] = self._encode(doc, [pages[i] for i in miss], m, pool)
+            with self._lock:
+                self.cache.put_many([keys[i] for i in miss], cls_vecs[miss])
+                self.cache.flush()
+        stats["cache_hits"], stats["cache_misses"] = int(hit.sum()), int(miss.size)
+        return cls_vecs
+
+    @cached_property
+    def head_hash(self) -> str:
+        head = self.head
+        return hashlib.sha1(head.w.tobytes() + head.b.tobytes()).hexdigest()
+
+    def _prob_config(self) -> Dict[str, str]:
+        """What a stored page probability depends on (manifest `config`)."""
+        return {"render": self._render_key(), "encoder": self.encoder.model_hash,
+                "head": self.head_hash, **self._lines_config()}
+
+    def _lines_config(self) -> Dict[str, str]:
+        """What stored manifest lines depend on (empty for the default extractor)."""
+        return {"lines": "pruned"} if self.prune_lines else {}
+
+    def _extract(self, doc: PdfDocument, reused: List[PageEntry | None] | None
+                 ) -> Tuple[LineTable, List[List[Dict[str, Any]]] | None]:
+        """All lines as a table; with a manifest only new pages are parsed."""
+        if reused is None:
+            return extract_table(doc, workers=self.extract_workers, backend=self.render_backend,
+                                 prune=self.prune_lines, pool=self._workers()), None
+        per_page = [with_page(e.lines, pno) if e is not None
+                    else page_lines(doc, pno, prune=self.prune_lines)
+                    for pno, e in enumerate(reused)]
+        return LineTable.from_records([L for ls in per_page for L in ls]), per_page
+
+    def outline(self, pdf_path: Path | str,
+                metrics: DocMetrics | None = None,
+                doc_id: str | None = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Return (outline dict, stats) for one PDF – nothing is written.
+        Stage timings go to `metrics` if given (the caller finishes the
+        record), else `stats["metrics"]` holds the `DocMetrics` record.
+        `doc_id` names the manifest in incremental mode (default: file name).
+        """
+        m = metrics or DocMetrics()
+        stats: Dict[str, Any] = {}
+        doc_id = doc_id or Path(pdf_path).name
+        with m.stage("open"):
+            doc = PdfDocument(pdf_path)
+        with doc:
+            stats["pages"] = npages = len(doc)
+
+            # 0. incremental: match pages against the last run by fingerprint
+            old = reused = None
+            if self.manifests is not None:
+                with m.stage("fingerprint"):
+                    fps = page_fingerprints(doc)
+                    old = self.manifests.load(doc_id)
+                    lines_cfg = self._lines_config().get("lines")
+                    if old is not None and old.config.get("lines") != lines_cfg:
+                        old = None                 # lines stored by the other extractor
+                    prev = old.by_fp() if old is not None else {}
+                    reused = [prev.get(fp) for fp in fps]
+                stats["pages_reused"] = sum(e is not None for e in reused)
+
+            # 1. text boxes (columnar: page → line broadcasts are gathers)
+            with m.stage("extract"):
+                lines, per_page = self._extract(doc, reused)
+
+            # fast path: heading likelihood straight from font metadata
+            if self.fast:
+                with m.stage("fast"):
+                    probs = line_heading_probs(lines)
+                if probs is None:
+                    stats["fast_fallback"] = degenerate_reason(lines)
+            else:
+                probs = None
+            stats["mode"] = "donut" if probs is None else "fast"
+
+            # page probs known from the manifest (NaN = must encode)
+            known = np.full(npages, np.nan)
+            config = old.config if old is not None else self._lines_config()
+            if probs is None and reused is not None:
+                config = self._prob_config()
+                if old is not None and old.config == config:
+                    known[:] = [np.nan if e is None or e.prob is None else e.prob
+                                for e in reused]
+
+            if probs is None:
+                # 2. triage: pages without any heading‑like line skip Donut
+                if self.triage:
+                    with m.stage("triage"):
+                        cand = np.flatnonzero(candidate_pages(lines, npages))
+                    stats["pages_pruned"] = npages - len(cand)
+                else:
+                    cand = np.arange(npages)
+                todo = cand[np.isnan(known[cand])]
+
+                # 3. raster → CLS embeddings (render / preprocess / session
+                #    are split out of `encode` when measurable)
+                with m.stage("encode"):
+                    cls_vecs = self._embed(doc, stats, pages=todo, m=m)
+
+                # 4. heading probability per page then broadcast to lines
+                with m.stage("classify"):
+                    if len(todo):
+                        known[todo] = predict(cls_vecs, self.head)  # (N,)
+                    page_probs = np.zeros(npages)
+                    page_probs[cand] = known[cand]
+                    probs = page_probs[lines.page]
+            elif reused is not None and old is not None:  # keep still‑valid probs
+                known[:] = [np.nan if e is None or e.prob is None else e.prob
+                            for e in reused]
+
+            if self.manifests is not None:
+                self.manifests.save(doc_id, PageManifest(config, [
+                    PageEntry(fp, [{k: v for k, v in L.items() if k != "page"} for L in ls],
+                              None if np.isnan(p) else float(p))
+                    for fp, ls, p in zip(fps, per_page, known.tolist())]))
+
+        with m.stage("assign"):
+            lines = assign_levels(lines, probs, p_thresh=self.p_thresh)
+            outline = build_outline(lines)
+        if metrics is None:
+            stats["metrics"] = m.record(pdf=str(pdf_path), pages=npages, mode=stats["mode"])
+        return outline, stats
+
+    def _window_probs(self, doc: PdfDocument, lines: LineTable, pages: np.ndarray,
+                      stats: Dict[str, Any], m: DocMetrics,
+                      pool: ThreadPoolExecutor | None = None) -> np.ndarray:
+        """Per‑line heading probabilities for one window of `pages`."""
+        if self.fast:
+            with m.stage("fast"):
+                probs = line_heading_probs(lines)
+            if probs is not None:
+                stats["fast_windows"] += 1
+                return probs
+        cand = pages
+        if self.triage:
+            with m.stage("triage"):
+                keep = candidate_pages(lines, len(doc))
+            cand = pages[keep[pages]]
+            stats["pages_pruned"] += len(pages) - len(cand)
+        with m.stage("encode"):
+            cls_vecs = self._embed(doc, stats, pages=cand, m=m, pool=pool)
+        with m.stage("classify"):
+            page_probs = np.zeros(len(doc))
+            if len(cand):
+                page_probs[cand] = predict(cls_vecs, self.head)
+            return page_probs[lines.page]
+
+    def outline_stream(self, pdf_path: Path | str, emit: Emit, window: int = 16,
+                       metrics: DocMetrics | None = None
+                       ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        `outline()` a window of pages at a time: each run of `window` pages is
+        extracted, encoded and classified, then fed to an `OutlineStream`
+        that hands settled entries to `emit` – only one window of lines is
+        held.  Returns (consolidated outline, stats) like `outline()`; the
+        outline matches it except that `fast` / `triage` statistics (body
+        size) come from each window.  Manifests are not used.
+        """
+        m = metrics or DocMetrics()
+        stats: Dict[str, Any] = {"pages_pruned": 0, "fast_windows": 0}
+        with m.stage("open"):
+            doc = PdfDocument(pdf_path)
+        # one render pool for all windows: its threads keep their handles
+        pool = (ThreadPoolExecutor(max_workers=self.render_workers)
+                if self.render_backend == "thread" else None)
+        with doc, (pool or nullcontext()):
+            stats["pages"] = npages = len(doc)
+            stream = OutlineStream(emit, self.p_thresh, window)
+            for start in range(0, npages, window):
+                pages = np.arange(start, min(npages, start + window))
+                with m.stage("extract"):
+                    lines = extract_table(doc, workers=self.extract_workers,
+                                          backend=self.render_backend,
+                                          prune=self.prune_lines, pages=pages,
+                                          pool=self._workers())
+                probs = self._window_probs(doc, lines, pages, stats, m, pool)
+                with m.stage("assign"):
+                    stream.add(pages, lines, probs)
+            with m.stage("assign"):
+                outline = stream.close()
+        n_windows = -(-npages // window)
+        stats["mode"] = "fast" if n_windows and stats["fast_windows"] == n_windows else "donut"
+        if metrics is None:
+            stats["metrics"] = m.record(pdf=str(pdf_path), pages=npages, mode=stats["mode"])
+        return outline, stats
+
+    def run(self, pdf_path: Path | str, out_path: Path | str) -> DocResult:
+        """
+        Process one PDF, write its JSON and return the timing record.  With
+        `stream_window` the entries also go to `<out>.ndjson` as they settle –
+        whatever was settled survives a failure later in the document.
+        """
+        t0 = time.perf_counter()
+        m = DocMetrics()
+        if self.stream_window:
+            with NdjsonWriter(Path(out_path).with_suffix(".ndjson")) as emit:
+                outline, stats = self.outline_stream(pdf_path, emit, self.stream_window, m)
+        else:
+            outline, stats = self.outline(pdf_path, m)
+        with m.stage("write"):
+            write_outline(outline, Path(out_path))
+        stats["metrics"] = m.record(pdf=str(pdf_path), pages=stats["pages"],
+                                    mode=stats["mode"])
+        return DocResult(Path(pdf_path), Path(out_path), outline,
+                         time.perf_counter() - t0, pages=stats["pages"], stats=stats)
+
+    def _run_safe(self, pdf_path: Path | str, out_path: Path | str) -> DocResult:
+        t0 = time.perf_counter()
+        try:
+            return self.run(pdf_path, out_path)
+        except Exception as e:
+            traceback.print_exc()
+            return DocResult(Path(pdf_path), Path(out_path), None,
+                             time.perf_counter() - t0, error=f"{type(e).__name__}: {e}")
+
+    def run_many(self,
+                 jobs: Iterable[Tuple[Path | str, Path | str]],
+                 concurrency: int = 1,
+                 max_latency: float = 0.05,
+                 ) -> Iterator[DocResult]:
+        """
+        Run (pdf, out_json) pairs through the shared session.  A failing
+        document yields a `DocResult` with `.error` set instead of raising,
+        so one bad PDF never aborts the batch.
+
+        With `concurrency` > 1 that many documents are in flight at once and
+        their pages are packed into shared encoder batches by a
+        `BatchScheduler` (partial batches flush after `max_latency` s);
+        results are then yielded in completion order.
+        """
+        if concurrency <= 1 or self.fast:
+            # fast mode rarely touches the encoder – plain per‑document batches
+            for pdf_path, out_path in jobs:
+                yield self._run_safe(pdf_path, out_path)
+            return
+
+        with self.batching(max_latency):
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                futs = [pool.submit(self._run_safe, pdf, out) for pdf, out in jobs]
+                for fut in as_completed(futs):
+                    yield fut.result()
+
+    @contextmanager
+    def batching(self, max_latency: float = 0.05) -> Iterator[BatchScheduler]:
+        """
+        While active, every `outline()` call – from any thread – hands its
+        pages to one `BatchScheduler` on the shared session.
+        """
+        from .scheduler import BatchScheduler
+        sched = BatchScheduler(self.encoder, self.batch_size, max_latency)
+        self._scheduler = sched
+        try:
+            yield sched
+        finally:
+            self._scheduler = None
+            sched.close()
+            self.batch_stats = sched.stats
+
+    @property
+    def scheduler_stats(self) -> Dict[str, Any] | None:
+        """Live stats of the active `batching()` scheduler (None outside one)."""
+        sched = self._scheduler
+        return sched.stats if sched is not None else None
+
+
+def dir_jobs(in_dir: Path, out_dir: Path) -> List[Tuple[Path, Path]]:
+    """(pdf, out_dir/<stem>.json) for every PDF in `in_dir`, sorted by name."""
+    return [(pdf, out_dir / f"{pdf.stem}.json") for pdf in sorted(in_dir.glob("*.pdf"))]
@@ -1,30 +1,193 @@
 # pdf_outline/render.py
-from concurrent.futures import ThreadPoolExecutor
+"""
+Page rasterisation with two interchangeable backends:
+
+* ``"thread"``  – ThreadPoolExecutor, one PyMuPDF handle per thread.  Cheap
+  to start, but PyMuPDF holds the GIL for much of the work, so it tops out
+  at a couple of cores.
+* ``"process"`` – ProcessPoolExecutor; each worker keeps the PDFs it is
+  sent open, renders a *range* of pages per task and hands the RGB buffers
+  back through `multiprocessing.shared_memory` instead of pickling PIL images.
+
+With ``fit=(H, W)`` pages are rasterised straight at encoder resolution and
+yielded as (h, w, 3) uint8 arrays ready for `DonutEncoder` – no PIL resize.
+"""
+import os
+from collections import OrderedDict, deque
+from contextlib import nullcontext
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from multiprocessing import get_all_start_methods, get_context, resource_tracker
+from multiprocessing.shared_memory import SharedMemory
 from pathlib import Path
-from typing import List
-import fitz                      # PyMuPDF
+from typing import Iterator, List, Sequence, Tuple, Union
+import numpy as np
 from PIL import Image
 
-def _render_one(pdf_path: Path, pno: int, dpi: int) -> Image.Image:
-    with fitz.open(pdf_path) as doc:
-        page = doc.load_page(pno)
-        mat  = fitz.Matrix(dpi / 72, dpi / 72)          # 72 dpi is PDF default
-        pix  = page.get_pixmap(matrix=mat, alpha=False)
-        return Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+from .document import PdfDocument, open_document
+
+BACKENDS = ("thread", "process")
+
+Page = Union[Image.Image, np.ndarray]           # PIL page or canvas‑fitted HWC array
+Fit  = Tuple[int, int] | None                   # (height, width) of the encoder canvas
+
+def _render_one(doc: PdfDocument, pno: int, dpi: int, fit: Fit = None) -> Page:
+    if fit:
+        return doc.render_fitted(pno, *fit)
+    return doc.render(pno, dpi)                 # per‑thread handle, opened once
+
+
+# ---------- process backend ------------------------------------------------
+# One pool serves many documents (`process_pool`): each task names its PDF by
+# `doc_key` and a worker keeps the last few it was sent open.
+DocKey = Tuple[str, str | None, int, int]        # path, password, mtime_ns, size
+_WORKER_DOCS = 4
+_worker_docs: "OrderedDict[DocKey, PdfDocument]" = OrderedDict()
+
+def doc_key(doc: PdfDocument) -> DocKey:
+    """Identifies `doc` to the workers – a rewritten file gets a new key."""
+    st = os.stat(doc.path)
+    return (str(doc.path), doc.password, st.st_mtime_ns, st.st_size)
+
+def _worker_doc(key: DocKey) -> PdfDocument:
+    """This worker's open handle for `key` (least recently used closed first)."""
+    doc = _worker_docs.pop(key, None)
+    if doc is None:
+        while len(_worker_docs) >= _WORKER_DOCS:
+            _worker_docs.popitem(last=False)[1].close()
+        doc = PdfDocument(key[0], key[1])
+    _worker_docs[key] = doc
+    return doc
+
+def _proc_render_range(key: DocKey, pnos: Sequence[int], dpi: int,
+                       fit: Fit = None) -> List[Tuple[str, int, int, bool]]:
+    """Render a run of pages into fresh shared‑memory blocks → (name, w, h, fit)."""
+    doc = _worker_doc(key)
+    out = []
+    for pno in pnos:
+        if fit:
+            pix = doc.fitted_pixmap(pno, *fit)
+        else:
+            pix = doc.pixmap(pno, dpi)
+        buf = pix.samples_mv
+        shm = SharedMemory(create=True, size=max(1, buf.nbytes))
+        shm.buf[:buf.nbytes] = buf
+        out.append((shm.name, pix.width, pix.height, bool(fit)))
+        shm.close()                              # parent attaches + unlinks
+    return out
+
+def _take_page(name: str, w: int, h: int, fitted: bool = False) -> Page:
+    shm = SharedMemory(name=name)
+    try:
+        if fitted:
+            arr = np.frombuffer(shm.buf, dtype=np.uint8, count=w * h * 3)
+            return arr.reshape(h, w, 3).copy()
+        return Image.frombytes("RGB", (w, h), shm.buf[: w * h * 3])
+    finally:
+        arr = None                               # drop the view before close()
+        shm.close()
+        shm.unlink()
+
+def process_pool(max_workers: int) -> Executor:
+    """Worker processes for the process backend – start once, pass as `pool`."""
+    # share the parent's tracker so blocks created by workers and unlinked
+    # here are not reported as leaked
+    resource_tracker.ensure_running()
+    method = "forkserver" if "forkserver" in get_all_start_methods() else "spawn"
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=get_context(method))
+
+def _iter_process(doc: PdfDocument, pnos: Sequence[int], dpi: int, max_workers: int,
+                  prefetch: int, chunk: int, fit: Fit,
+                  pool: Executor | None = None) -> Iterator[Page]:
+    npages = len(pnos)
+    key    = doc_key(doc)
+    window: deque = deque()                      # futures of in‑flight ranges
+    ready:  deque = deque()                      # finished blocks not yet taken
+    with (nullcontext(pool) if pool is not None else process_pool(max_workers)) as pool:
+        try:
+            nxt = 0
+            while nxt < npages or window:
+                while nxt < npages and len(window) * chunk < prefetch:
+                    stop = min(npages, nxt + chunk)
+                    window.append(pool.submit(_proc_render_range, key, pnos[nxt:stop],
+                                              dpi, fit))
+                    nxt = stop
+                ready.extend(window.popleft().result())
+                while ready:
+                    yield _take_page(*ready.popleft())
+        finally:
+            # consumer stopped early or a worker failed – free pending blocks
+            for fut in window:
+                try:
+                    ready.extend(fut.result())
+                except Exception:
+                    pass
+            for blk in ready:
+                _take_page(*blk)
+
+
+# ---------- public API -----------------------------------------------------
+def iter_pages(pdf: str | Path | PdfDocument,
+               dpi: int = 150,
+               max_workers: int = 8,
+               prefetch: int | None = None,
+               backend: str = "thread",
+               chunk: int = 4,
+               fit: Fit = None,
+               pages: Sequence[int] | None = None,
+               pool: Executor | None = None) -> Iterator[Page]:
+    """
+    Yield pages in original order while at most `prefetch` rendered
+    (or in‑flight) pages are held – memory stays O(prefetch), not O(pages).
+    The process backend renders `chunk` consecutive pages per task.
+    PIL images by default; canvas‑fitted uint8 arrays when `fit` is given.
+    `pages` restricts rendering to those page indices (in the given order).
+    A `pool` of the backend's kind (threads, or `process_pool`) is used
+    instead of a fresh one – its workers keep their document handles (and
+    MuPDF's caches) across calls.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown render backend {backend!r} (expected one of {BACKENDS})")
+    doc, owned = open_document(pdf)
+    pnos     = list(range(len(doc))) if pages is None else [int(p) for p in pages]
+    npages   = len(pnos)
+    prefetch = max(1, prefetch or 2 * max_workers)
+
+    try:
+        if backend == "process":
+            yield from _iter_process(doc, pnos, dpi, max_workers, prefetch, max(1, chunk),
+                                     fit, pool)
+            return
+        with (nullcontext(pool) if pool is not None
+              else ThreadPoolExecutor(max_workers=max_workers)) as pool:
+            window: deque = deque()
+            nxt = 0
+            while nxt < npages or window:
+                while nxt < npages and len(window) < prefetch:
+                    window.append(pool.submit(_render_one, doc, pnos[nxt], dpi, fit))
+                    nxt += 1
+                yield window.popleft().result()
+    finally:
+        if owned:
+            doc.close()
 
-def render_pdf(pdf_path: str | Path,
+def render_pdf(pdf: str | Path | PdfDocument,
                dpi: int = 150,
-               max_workers: int = 8) -> List[Image.Image]:
+               max_workers: int = 8,
+               backend: str = "thread") -> List[Image.Image]:
     """
     Return list[ PIL.Image ] – one per page, in original order.
     """
-    pdf_path = Path(pdf_path)
-    with fitz.open(pdf_path) as doc:
-        npages = len(doc)
-
-    with ThreadPoolExecutor(max_workers=max_workers) as pool:
-        pages = list(
-            pool.map(lambda idx: _render_one(pdf_path, idx, dpi), range(npages))
-        )
+    doc, owned = open_document(pdf)
+    try:
+        if backend == "process":
+            return list(iter_pages(doc, dpi, max_workers, prefetch=len(doc),
+                                   backend="process",
+                                   chunk=-(-len(doc) // max(1, max_workers))))
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            pages = list(
+                pool.map(lambda idx: _render_one(doc, idx, dpi), range(len(doc)))
+            )
+    finally:
+        if owned:
+            doc.close()
     return pages
-    
\ No newline at end of file
@@ -0,0 +1,177 @@
+# pdf_outline/scheduler.py
+"""
+BatchScheduler  –  cross‑document dynamic batching for one DonutEncoder.
+
+Document workers call `.encode(pages, n)` concurrently.  Each worker claims
+a slot in the batch being filled and fits + normalises its page straight
+into it (`fit_page`) – preprocessing runs in the document threads, in
+parallel.  Two batch buffers alternate: while the dispatcher thread runs
+one full batch through the shared `InferenceSession`, workers fill the
+other.  A batch that is not full after `max_latency` seconds is flushed
+anyway, so a lone short PDF never waits for company.  CLS vectors are
+routed back to the document that owns each page.
+"""
+
+from __future__ import annotations
+import threading, time
+from collections import Counter
+from concurrent.futures import Future
+from typing import Iterable, List, Tuple
+
+import numpy as np
+
+from .donut_infer import DonutEncoder, Page, fit_page
+
+
+class _Ticket:
+    """Pending CLS vectors of one document."""
+    __slots__ = ("vecs", "remaining", "future")
+
+    def __init__(self, n: int, dim: int):
+        self.vecs      = np.zeros((n, dim), dtype=np.float32)
+        self.remaining = n
+        self.future: Future = Future()
+        if n == 0:
+            self.future.set_result(self.vecs)
+
+
+class BatchScheduler:
+    def __init__(self, encoder: DonutEncoder,
+                 batch_size: int = 8,
+                 max_latency: float = 0.05):
+        self.encoder     = encoder
+        self.batch_size  = batch_size
+        self.max_latency = max_latency
+
+        # the batch being filled: claimed slots, slots written, their owners
+        # (None = page failed to preprocess); the other buffer may be running
+        self._bufs = [encoder.new_batch(batch_size), encoder.new_batch(batch_size)]
+        self._fill = 0
+        self._claimed = 0
+        self._ready   = 0
+        self._owners: List[Tuple[_Ticket, int] | None] = []
+        self._deadline: float | None = None
+        self._stop = False
+        self._cond = threading.Condition()
+
+        self.batches = 0
+        self.pages   = 0
+        self.sizes: Counter = Counter()          # batch size → count
+        self.preprocess_s = 0.0                  # summed over document threads
+        self.session_s    = 0.0
+        self._thread = threading.Thread(target=self._loop, name="batch-scheduler",
+                                        daemon=True)
+        self._thread.start()
+
+    # ------------------------------------------------------------------ client side
+    def submit(self, pages: Iterable[Page], n: int) -> Future:
+        """
+        Fit `n` pages into batch slots (blocks while both buffers are busy)
+        → Future[(n, dim)].
+        """
+        t = _Ticket(n, self.encoder.dim)
+        for i, page in enumerate(pages):
+            with self._cond:
+                while self._claimed == self.batch_size:
+                    self._cond.wait()
+                slot = self._claimed
+                buf  = self._bufs[self._fill]
+                self._claimed += 1
+                self._owners.append((t, i))
+                if self._deadline is None:
+                    self._deadline = time.monotonic() + self.max_latency
+            t0 = time.perf_counter()
+            try:
+                fit_page(page, buf[slot])        # outside the lock, in this thread
+            except Exception as e:
+                with self._cond:
+                    self._owners[slot] = None
+                if not t.future.done():
+                    t.future.set_exception(e)
+            finally:
+                with self._cond:
+                    self.preprocess_s += time.perf_counter() - t0
+                    self._ready += 1
+                    self._cond.notify_all()
+        return t.future
+
+    def encode(self, pages: Iterable[Page], n: int) -> np.ndarray:
+        return self.submit(pages, n).result()
+
+    def close(self) -> None:
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def __enter__(self) -> "BatchScheduler":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @property
+    def stats(self) -> dict:
+        return {"batches": self.batches, "pages": self.pages,
+                "mean_batch": self.pages / self.batches if self.batches else 0.0,
+                "sizes": dict(sorted(self.sizes.items())),
+                "preprocess_s": round(self.preprocess_s, 3),
+                "session_s": round(self.session_s, 3)}
+
+    # ------------------------------------------------------------------ dispatcher
+    def _take(self) -> Tuple[np.ndarray, List[Tuple[_Ticket, int] | None]] | None:
+        """Wait for a full (or timed‑out) batch whose slots are all written and
+        swap buffers; None once closed and drained."""
+        with self._cond:
+            while True:
+                settled = self._ready == self._claimed
+                if settled and self._claimed and (
+                        self._claimed == self.batch_size or self._stop
+                        or time.monotonic() >= self._deadline):
+                    break
+                if settled and not self._claimed and self._stop:
+                    return None
+                timeout = None                   # unsettled: woken by the last write
+                if settled and self._deadline is not None:
+                    timeout = max(0.0, self._deadline - time.monotonic())
+                self._cond.wait(timeout)
+            buf, owners = self._bufs[self._fill][:self._claimed], self._owners
+            self._fill ^= 1
+            self._claimed = self._ready = 0
+            self._owners = []
+            self._deadline = None
+            self._cond.notify_all()              # the other buffer is free to fill
+            return buf, owners
+
+    def _loop(self) -> None:
+        while True:
+            taken = self._take()
+            if taken is None:
+                return
+            self._flush(*taken)
+
+    def _flush(self, buf: np.ndarray, owners: List[Tuple[_Ticket, int] | None]) -> None:
+        live = [o for o in owners if o is not None and not o[0].future.done()]
+        if not live:
+            return
+        t0 = time.perf_counter()
+        try:
+            out = self.encoder._run(buf)
+        except Exception as e:
+            for t, _ in live:
+                if not t.future.done():
+                    t.future.set_exception(e)
+        else:
+            n = sum(o is not None for o in owners)   # failed slots ran but encode nothing
+            self.session_s += time.perf_counter() - t0
+            self.batches += 1
+            self.pages   += n
+            self.sizes[n] += 1
+            for owner, vec in zip(owners, out):
+                if owner is None:
+                    continue
+                t, i = owner
+                t.vecs[i] = vec
+                t.remaining -= 1
+                if t.remaining == 0 and not t.future.done():
+                    t.future.set_result(t.vecs)
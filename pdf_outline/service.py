@@ -0,0 +1,337 @@
+# pdf_outline/service.py
+"""
+OutlineService  –  asyncio job service in front of one `OutlinePipeline`.
+
+    python -m pdf_outline.service --port 8080            # TCP
+    python -m pdf_outline.service --unix /tmp/outline.sock
+
+    POST /outline     body = PDF bytes   → 200 {"title": ..., "outline": [...]}
+    GET  /metrics                        → queue depth, latency percentiles, …
+    GET  /healthz                        → 200 "ok"
+
+Uploads go into a bounded queue; when it is full the request is answered
+``503`` (with ``Retry-After``) straight away instead of piling up.  `workers`
+jobs run at once in a thread pool – rasterisation and text extraction happen
+there – while all of them hand their pages to one `BatchScheduler` on the
+pipeline's single `InferenceSession`.  A job that has not finished
+`timeout` seconds after it was accepted is answered ``504``; if it was still
+queued it is dropped, a running one finishes in the background (threads
+cannot be interrupted) but its result is discarded.
+
+Plain HTTP/1.1, one request per connection, stdlib only.
+"""
+
+from __future__ import annotations
+import argparse, asyncio, json, os, tempfile, time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Deque, Dict, Tuple
+
+import numpy as np
+
+from .cache import EmbeddingCache
+from .classify import parse_canvas
+from .metrics import MetricsLog
+from .pipeline import OutlinePipeline
+from .session import add_session_args, profile_from_args
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 422: "Unprocessable Entity",
+            503: "Service Unavailable", 504: "Gateway Timeout"}
+
+
+class _Job:
+    __slots__ = ("data", "future", "t_submit", "t_start")
+
+    def __init__(self, data: bytes, future: asyncio.Future):
+        self.data     = data
+        self.future   = future
+        self.t_submit = time.perf_counter()
+        self.t_start  = 0.0
+
+
+def _percentiles(xs: Deque[float]) -> Dict[str, float]:
+    if not xs:
+        return {"p50": 0.0, "p90": 0.0, "p99": 0.0, "max": 0.0}
+    p50, p90, p99 = np.percentile(np.fromiter(xs, float), (50, 90, 99))
+    return {"p50": round(p50 * 1e3, 1), "p90": round(p90 * 1e3, 1),
+            "p99": round(p99 * 1e3, 1), "max": round(max(xs) * 1e3, 1)}
+
+
+class OutlineService:
+    def __init__(self,
+                 pipeline: OutlinePipeline,
+                 workers: int = 4,
+                 max_queue: int = 16,
+                 timeout: float = 60.0,
+                 max_latency: float = 0.05,
+                 max_body: int = 64 << 20,
+                 window: int = 1024,
+                 metrics_path: Path | str | None = None):
+        self.pipeline    = pipeline
+        self.workers     = workers
+        self.max_queue   = max_queue
+        self.timeout     = timeout             # s, from accept to answer
+        self.max_latency = max_latency         # partial encoder batch flush
+        self.max_body    = max_body            # bytes per upload
+
+        self._q: asyncio.Queue | None = None
+        self.pending   = 0                     # accepted, not started, not timed out
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="outline")
+        self._latency: Deque[float] = deque(maxlen=window)   # accept → done, s
+        self._waited:  Deque[float] = deque(maxlen=window)   # accept → start, s
+        self.log = MetricsLog(metrics_path, keep=window)     # per‑doc stage timings
+        self.counts = dict(accepted=0, rejected=0, completed=0, failed=0, timed_out=0)
+        self.in_flight = 0
+        self.max_depth = 0
+        self.pages     = 0
+        self._t0 = time.perf_counter()
+
+    # ------------------------------------------------------------------ jobs
+    def _process(self, data: bytes) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Runs in the pool: spool the upload to disk, outline it."""
+        fd, tmp = tempfile.mkstemp(suffix=".pdf", prefix="outline-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            return self.pipeline.outline(tmp)
+        finally:
+            os.unlink(tmp)
+
+    async def _worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            job: _Job = await self._q.get()
+            if job.future.done():               # timed out while queued
+                continue
+            self.pending -= 1
+            job.t_start = time.perf_counter()
+            self._waited.append(job.t_start - job.t_submit)
+            self.in_flight += 1
+            try:
+                res = await loop.run_in_executor(self._pool, self._process, job.data)
+            except Exception as e:
+                self.counts["failed"] += 1
+                if not job.future.done():
+                    job.future.set_exception(e)
+            else:
+                self.counts["completed"] += 1
+                self.pages += res[1].get("pages", 0)
+                self.log.add(res[1]["metrics"])
+                self._latency.append(time.perf_counter() - job.t_submit)
+                if not job.future.done():
+                    job.future.set_result(res)
+            finally:
+                self.in_flight -= 1
+
+    async def submit(self, data: bytes) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Queue one PDF and wait for its (outline, stats).  Raises
+        `asyncio.QueueFull` when the service is saturated and
+        `asyncio.TimeoutError` after `timeout` seconds.
+        """
+        # admission counts live jobs only – timed‑out ones still sitting in
+        # the asyncio queue are skipped by the workers and take no slot
+        if self.pending >= self.max_queue:
+            self.counts["rejected"] += 1
+            raise asyncio.QueueFull
+        job = _Job(data, asyncio.get_running_loop().create_future())
+        self._q.put_nowait(job)
+        self.pending += 1
+        self.counts["accepted"] += 1
+        self.max_depth = max(self.max_depth, self.pending)
+        try:
+            return await asyncio.wait_for(asyncio.shield(job.future), self.timeout)
+        except asyncio.TimeoutError:
+            self.counts["timed_out"] += 1
+            if not job.t_start:                 # still queued → drop it
+                self.pending -= 1
+            job.future.cancel()                 # running → result discarded
+            raise
+
+    def metrics(self) -> Dict[str, Any]:
+        up = time.perf_counter() - self._t0
+        m: Dict[str, Any] = {
+            "uptime_s":    round(up, 1),
+            "queue_depth": self.pending,
+            "queue_max":   self.max_queue,
+            "queue_peak":  self.max_depth,
+            "in_flight":   self.in_flight,
+            "workers":     self.workers,
+            **self.counts,
+            "pages":       self.pages,
+            "pages_per_s": round(self.pages / up, 2) if up else 0.0,
+            "latency_ms":    _percentiles(self._latency),
+            "queue_wait_ms": _percentiles(self._waited),
+        }
+        encoder = self.pipeline.scheduler_stats
+        summary = self.log.summary(encoder)
+        m["stages"] = summary["stages"]
+        m["batches"] = summary["batches"]
+        m["peak_rss_mb"] = summary["peak_rss_mb"]
+        if encoder is not None:
+            m["encoder"] = encoder
+        cache = self.pipeline.cache
+        if cache is not None:
+            m["cache"] = {"hits": cache.hits, "misses": cache.misses}
+        return m
+
+    # ------------------------------------------------------------------ HTTP
+    async def _route(self, method: str, path: str, body: bytes
+                     ) -> Tuple[int, Any, Dict[str, str]]:
+        if path == "/outline":
+            if method != "POST":
+                return 405, {"error": "POST a PDF"}, {"Allow": "POST"}
+            if not body:
+                return 400, {"error": "empty body"}, {}
+            try:
+                outline, stats = await self.submit(body)
+            except asyncio.QueueFull:
+                return 503, {"error": "queue full"}, {"Retry-After": "1"}
+            except asyncio.TimeoutError:
+                return 504, {"error": f"not done after {self.timeout:g}s"}, {}
+            except Exception as e:
+                return 422, {"error": f"{type(e).__name__}: {e}"}, {}
+            return 200, outline, {"X-Pages": str(stats.get("pages", 0)),
+                                  "X-Mode": stats.get("mode", "donut")}
+        if path == "/metrics" and method == "GET":
+            return 200, self.metrics(), {}
+        if path == "/healthz" and method == "GET":
+            return 200, "ok", {}
+        return 404, {"error": f"no route {method} {path}"}, {}
+
+    async def _handle(self, reader: asyncio.StreamReader,
+                      writer: asyncio.StreamWriter) -> None:
+        status, payload, extra = 400, {"error": "malformed request"}, {}
+        try:
+            method, target, _ = (await reader.readline()).decode("latin-1").split(" ", 2)
+            headers: Dict[str, str] = {}
+            while True:
+                h = await reader.readline()
+                if h in (b"\r\n", b"\n", b""):
+                    break
+                k, _, v = h.decode("latin-1").partition(":")
+                headers[k.strip().lower()] = v.strip()
+            n = int(headers.get("content-length", 0))
+            if n > self.max_body:
+                status, payload = 413, {"error": f"body over {self.max_body} bytes"}
+            else:
+                body = await reader.readexactly(n) if n else b""
+                status, payload, extra = await self._route(method, target.split("?")[0], body)
+        except (ValueError, asyncio.IncompleteReadError):
+            pass
+        except ConnectionError:
+            writer.close()
+            return
+
+        if isinstance(payload, str):
+            data, ctype = payload.encode(), "text/plain; charset=utf-8"
+        else:
+            data = json.dumps(payload, indent=2, ensure_ascii=False).encode()
+            ctype = "application/json"
+        head = [f"HTTP/1.1 {status} {_REASONS.get(status, '')}",
+                f"Content-Type: {ctype}", f"Content-Length: {len(data)}",
+                "Connection: close", *(f"{k}: {v}" for k, v in extra.items())]
+        try:
+            writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + data)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    # ------------------------------------------------------------------ lifecycle
+    async def serve(self, host: str = "127.0.0.1", port: int = 8080,
+                    unix: str | Path | None = None) -> None:
+        """Serve until cancelled (Ctrl‑C)."""
+        self._q = asyncio.Queue()
+        workers = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        if unix:
+            server = await asyncio.start_unix_server(self._handle, path=str(unix))
+            where = f"unix:{unix}"
+        else:
+            server = await asyncio.start_server(self._handle, host, port)
+            where = "http://%s:%d" % server.sockets[0].getsockname()[:2]
+        print(f"outline service on {where}  ({self.workers} workers, "
+              f"queue {self.max_queue}, timeout {self.timeout:g}s)", flush=True)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for w in workers:
+                w.cancel()
+            self.log.close()
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            if unix:
+                Path(unix).unlink(missing_ok=True)
+
+    def run(self, host: str = "127.0.0.1", port: int = 8080,
+            unix: str | Path | None = None) -> None:
+        """Blocking entry point; the encoder scheduler lives as long as the server."""
+        if self.pipeline.fast:                  # encoder only for fall‑backs
+            asyncio.run(self.serve(host, port, unix))
+            return
+        with self.pipeline.batching(self.max_latency):
+            asyncio.run(self.serve(host, port, unix))
+
+
+# --------------------------------------------------------------------- CLI
+def _parse() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Serve the PDF outline extractor over HTTP.")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8080)
+    p.add_argument("--unix", type=Path, metavar="PATH", help="listen on a Unix socket instead")
+    p.add_argument("--dpi", type=int, default=120, help="render DPI (120 recommended)")
+    p.add_argument("--model", type=Path, default=Path("models/donut_base_int8/int8"),
+                   help="folder with encoder_model.onnx")
+    p.add_argument("--head", type=Path, default=Path("models/donut_head.pkl"),
+                   help="head file (a converted .head beside a .pkl is used)")
+    p.add_argument("--batch-size", type=int, default=8, help="pages per ONNX run")
+    p.add_argument("--canvas", type=parse_canvas, metavar="HxW",
+                   help="reduced encoder input, e.g. 640x480 (needs a matching head)")
+    p.add_argument("--variant", metavar="NAME",
+                   help="encoder variant, e.g. int8_static (needs a matching head)")
+    p.add_argument("--render-workers", type=int, default=2,
+                   help="page rasterisation workers per job")
+    p.add_argument("--jobs", type=int, default=4, help="PDFs processed concurrently")
+    p.add_argument("--queue", type=int, default=16,
+                   help="accepted PDFs waiting for a worker; beyond this → 503")
+    p.add_argument("--timeout", type=float, default=60, help="per‑job timeout in seconds")
+    p.add_argument("--max-latency-ms", type=float, default=50,
+                   help="flush a partial cross‑document batch after this long")
+    p.add_argument("--max-body-mb", type=int, default=64, help="largest accepted upload")
+    p.add_argument("--fast", action="store_true", help="text‑only mode (see extract_outline)")
+    p.add_argument("--triage", action="store_true", help="skip pages with no heading cue")
+    p.add_argument("--cache", type=Path, metavar="DIR", help="on‑disk page embedding cache")
+    p.add_argument("--cache-mb", type=int, default=512, help="embedding cache size limit")
+    p.add_argument("--metrics", type=Path, metavar="JSONL",
+                   help="append per‑document stage timings here")
+    add_session_args(p)
+    return p.parse_args()
+
+
+def main() -> None:
+    args = _parse()
+    cache = EmbeddingCache(args.cache, max_bytes=args.cache_mb << 20) if args.cache else None
+    pipe = OutlinePipeline(args.model, args.head, dpi=args.dpi,
+                           batch_size=args.batch_size,
+                           render_workers=args.render_workers,
+                           canvas=args.canvas,
+                           variant=args.variant,
+                           cache=cache, fast=args.fast, triage=args.triage,
+                           session_profile=profile_from_args(args))
+    svc = OutlineService(pipe, workers=args.jobs, max_queue=args.queue,
+                         timeout=args.timeout, max_latency=args.max_latency_ms / 1000,
+                         max_body=args.max_body_mb << 20, metrics_path=args.metrics)
+    try:
+        svc.run(args.host, args.port, args.unix)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if cache is not None:
+            cache.close()
+
+
+if __name__ == "__main__":
+    main()
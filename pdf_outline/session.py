@@ -0,0 +1,198 @@
+# pdf_outline/session.py
+"""
+SessionProfile  –  how the ONNX Runtime session is built.
+
+The defaults reproduce the previous hard‑coded setup (half the cores for
+intra‑op work, everything else ORT's default).  When several pipelines share
+a machine, give each a slice of the cores instead:
+
+    SessionProfile(intra_op_threads=2, allow_spinning=False)
+
+Profiles are plain JSON (`save` / `load`); `python -m pdf_outline.tune`
+sweeps the knobs on the local machine and writes the fastest one.
+
+`optimized_model` names a file where ORT's optimised graph is stored on
+first use and loaded from afterwards (graph optimisation is then skipped).
+A `<file>.json` stamp records the source model, ORT version and level; a
+stale file is rebuilt.  The optimised graph can hold CPU‑specific kernels –
+keep it per machine.  `cpu_isa` names the INT8 instruction set the CPU
+offers – which quantised encoder variant suits it (scripts/quantize_int8.py).
+
+onnxruntime is imported when a session is built, not with this module, so
+the CLI flags can be declared without loading it.
+"""
+
+from __future__ import annotations
+import argparse, json, os, platform
+from dataclasses import asdict, dataclass, field, fields
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Tuple
+
+if TYPE_CHECKING:
+    import onnxruntime as ort
+
+# name → ort.ExecutionMode / ort.GraphOptimizationLevel member
+EXECUTION_MODES = {"sequential": "ORT_SEQUENTIAL",
+                   "parallel":   "ORT_PARALLEL"}
+OPT_LEVELS = {"disable":  "ORT_DISABLE_ALL",
+              "basic":    "ORT_ENABLE_BASIC",
+              "extended": "ORT_ENABLE_EXTENDED",
+              "all":      "ORT_ENABLE_ALL"}
+
+# best INT8 path first; "x86" = none of the SIMD extensions below
+ISAS = ("avx512_vnni", "avx_vnni", "avx512", "avx2", "arm64", "x86")
+
+
+def cpu_isa() -> str:
+    """
+    INT8 instruction set of this CPU: VNNI does u8×s8 dot products in 32 bit,
+    plain AVX2 / AVX‑512 go through 16‑bit sums that can saturate.  Flags
+    come from /proc/cpuinfo; elsewhere x86 reports the conservative "x86".
+    """
+    machine = platform.machine().lower()
+    if machine in ("arm64", "aarch64"):
+        return "arm64"
+    flags: set = set()
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("flags"):
+                    flags = set(line.split(":", 1)[1].split())
+                    break
+    except OSError:
+        pass
+    if "avx512_vnni" in flags:
+        return "avx512_vnni"
+    if "avx_vnni" in flags:
+        return "avx_vnni"
+    if {"avx512f", "avx512bw"} <= flags:
+        return "avx512"
+    if "avx2" in flags:
+        return "avx2"
+    return "x86"
+
+
+@dataclass
+class SessionProfile:
+    intra_op_threads: int | None = None        # None → cpu_count // 2
+    inter_op_threads: int | None = None        # parallel mode only; None → ORT default
+    execution_mode: str = "sequential"         # | "parallel"
+    graph_optimization: str = "all"            # disable | basic | extended | all
+    cpu_mem_arena: bool = True
+    mem_pattern: bool = True
+    allow_spinning: bool = True                # busy‑wait between ops; off when sharing cores
+    optimized_model: str | None = None         # cache of the optimised graph
+    config: Dict[str, str] = field(default_factory=dict)   # extra session config entries
+
+    def __post_init__(self):
+        if self.execution_mode not in EXECUTION_MODES:
+            raise ValueError(f"execution_mode must be one of {sorted(EXECUTION_MODES)}")
+        if self.graph_optimization not in OPT_LEVELS:
+            raise ValueError(f"graph_optimization must be one of {sorted(OPT_LEVELS)}")
+
+    # ------------------------------------------------------------------ io
+    @classmethod
+    def load(cls, path: Path | str) -> "SessionProfile":
+        """Read a profile; unknown keys (e.g. tuning notes) are ignored."""
+        data = json.loads(Path(path).read_text())
+        data = data.get("profile", data)
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known})
+
+    def save(self, path: Path | str, **notes: Any) -> None:
+        Path(path).write_text(json.dumps({"profile": asdict(self), **notes}, indent=2))
+
+    def replace(self, **changes: Any) -> "SessionProfile":
+        return SessionProfile(**{**asdict(self), **changes})
+
+    # ------------------------------------------------------------------ ORT
+    def session_options(self) -> ort.SessionOptions:
+        import onnxruntime as ort
+        so = ort.SessionOptions()
+        so.intra_op_num_threads = (self.intra_op_threads or
+                                   max(1, (os.cpu_count() or 1) // 2))   # e.g. 4 on 8‑core
+        if self.inter_op_threads:
+            so.inter_op_num_threads = self.inter_op_threads
+        so.execution_mode = getattr(ort.ExecutionMode, EXECUTION_MODES[self.execution_mode])
+        so.graph_optimization_level = getattr(ort.GraphOptimizationLevel,
+                                              OPT_LEVELS[self.graph_optimization])
+        so.enable_cpu_mem_arena = self.cpu_mem_arena
+        so.enable_mem_pattern = self.mem_pattern
+        if not self.allow_spinning:
+            so.add_session_config_entry("session.intra_op.allow_spinning", "0")
+            so.add_session_config_entry("session.inter_op.allow_spinning", "0")
+        for k, v in self.config.items():
+            so.add_session_config_entry(k, str(v))
+        return so
+
+    def _stamp(self, model_path: Path) -> Dict[str, str]:
+        import onnxruntime as ort
+        from .cache import file_sha256
+        return {"source": str(model_path), "source_sha256": file_sha256(model_path),
+                "onnxruntime": ort.__version__, "graph_optimization": self.graph_optimization}
+
+    def _stamp_path(self) -> Path:
+        opt = Path(self.optimized_model)
+        return opt.with_name(opt.name + ".json")
+
+    def resolve(self, model_path: Path) -> Tuple[Path, ort.SessionOptions]:
+        """(file to load, options) – handles the optimised‑model cache."""
+        so = self.session_options()
+        if not self.optimized_model:
+            return model_path, so
+        opt, stamp_path = Path(self.optimized_model), self._stamp_path()
+        if opt.exists() and stamp_path.exists() and \
+                json.loads(stamp_path.read_text()) == self._stamp(model_path):
+            import onnxruntime as ort
+            so.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL  # already optimised
+            return opt, so
+        stamp_path.unlink(missing_ok=True)
+        opt.parent.mkdir(parents=True, exist_ok=True)
+        so.optimized_model_filepath = str(opt)          # written while the session builds
+        return model_path, so
+
+    def built(self, model_path: Path, so: ort.SessionOptions) -> None:
+        """Call once the session exists: stamps a freshly written optimised graph."""
+        if self.optimized_model and so.optimized_model_filepath:
+            self._stamp_path().write_text(json.dumps(self._stamp(model_path), indent=2))
+
+
+# ---------------------------------------------------------------------- CLI glue
+def add_session_args(p: argparse.ArgumentParser) -> None:
+    """ONNX Runtime flags shared by the CLI, the service and the tuner."""
+    g = p.add_argument_group("ONNX Runtime session")
+    g.add_argument("--session-profile", type=Path, metavar="JSON",
+                   help="load a saved profile (e.g. from `python -m pdf_outline.tune`); "
+                        "the flags below override it")
+    g.add_argument("--intra-threads", type=int, help="intra‑op threads (default cores/2)")
+    g.add_argument("--inter-threads", type=int, help="inter‑op threads (parallel mode)")
+    g.add_argument("--execution-mode", choices=sorted(EXECUTION_MODES))
+    g.add_argument("--graph-opt", choices=list(OPT_LEVELS))
+    g.add_argument("--no-arena", action="store_true", help="disable the CPU memory arena")
+    g.add_argument("--no-mem-pattern", action="store_true", help="disable memory patterns")
+    g.add_argument("--no-spinning", action="store_true",
+                   help="idle threads sleep instead of spinning (several workers per host)")
+    g.add_argument("--optimized-model", type=Path, metavar="FILE",
+                   help="store / reuse ORT's optimised graph here")
+
+
+def profile_from_args(args: argparse.Namespace) -> SessionProfile:
+    prof = SessionProfile.load(args.session_profile) if args.session_profile else SessionProfile()
+    changes: Dict[str, Any] = {}
+    if args.intra_threads:
+        changes["intra_op_threads"] = args.intra_threads
+    if args.inter_threads:
+        changes["inter_op_threads"] = args.inter_threads
+    if args.execution_mode:
+        changes["execution_mode"] = args.execution_mode
+    if args.graph_opt:
+        changes["graph_optimization"] = args.graph_opt
+    if args.no_arena:
+        changes["cpu_mem_arena"] = False
+    if args.no_mem_pattern:
+        changes["mem_pattern"] = False
+    if args.no_spinning:
+        changes["allow_spinning"] = False
+    if args.optimized_model:
+        changes["optimized_model"] = str(args.optimized_model)
+    return prof.replace(**changes) if changes else prof
@@ -0,0 +1,186 @@
+# pdf_outline/stream.py
+"""
+OutlineStream  –  `assign_levels` + `build_outline` over pages fed in order.
+
+For very long documents the outline is emitted while the PDF is still being
+processed: pages are added a run at a time (`add`), and once `window` more
+pages have arrived a page is *settled* and its entries are emitted as plain
+dicts – one NDJSON line each with `NdjsonWriter`:
+
+    {"type": "title",   "text": "…", "page": 1}
+    {"type": "heading", "level": "H1", "text": "…", "page": 3}
+    {"type": "progress", "pages": 16}           # pages settled so far
+
+Streamed decisions use the sliding window instead of the whole document:
+
+*  running headers: a short line is demoted when it repeats ≥ 3 times within
+   `window` pages before or after its page
+*  Title: picked on the first settled page with heading lines, as in
+   `cluster.assign_levels`
+*  numbered headings get their level at once; the font‑size fallback ranks
+   against the heading sizes settled so far, so an early streamed level can
+   differ from the final one
+
+Only lines at or above the threshold that pass the table filter are kept
+past their window – a small fraction of the document – and `close()` runs
+the regular engine on them: the consolidated outline it returns is the
+one `assign_levels` + `build_outline` give for the whole document.
+"""
+
+from __future__ import annotations
+import json
+from collections import Counter, deque
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from .cluster import (H1, H2, H3, NONE, REPEAT_THRESHOLD, TITLE, _engine, _is_table,
+                      _numbering_level, _pick_title)
+from .extract_lines import LEVELS, LineTable
+
+Emit = Callable[[Dict[str, Any]], None]
+
+# one candidate line: (row, stripped text, words, size, x0) – rows index the
+# kept columns below
+_Row = Tuple[int, str, int, float, float]
+
+
+class OutlineStream:
+    def __init__(self, emit: Emit, p_thresh: float = 0.60, window: int = 8):
+        self.emit     = emit
+        self.p_thresh = p_thresh
+        self.window   = max(1, window)
+
+        # kept candidates (for `close`): columns of `cluster._engine`
+        self._text:  List[str]   = []
+        self._page:  List[int]   = []
+        self._size:  List[float] = []
+        self._x0:    List[float] = []
+        self._prob:  List[float] = []
+
+        self._pending: Deque[Tuple[int, List[_Row]]] = deque()   # added, not settled
+        self._trail:   Deque[Tuple[int, List[_Row]]] = deque()   # settled, still counted
+        self._counts: Counter = Counter()           # candidate texts in the window
+        self._sizes: set = set()                    # font sizes of settled plain heads
+        self._title_done = False
+        self._next_page  = 0
+        self.settled     = 0
+
+    # ------------------------------------------------------------------ feed
+    def add(self, pages: Sequence[int], lines: LineTable, probs: np.ndarray) -> None:
+        """
+        Lines (+ per‑line probabilities) of consecutive `pages`, which must
+        continue where the previous call stopped; pages without lines count.
+        """
+        pages = [int(p) for p in pages]
+        if pages and pages[0] != self._next_page:
+            raise ValueError(f"pages must arrive in order: expected {self._next_page}, "
+                             f"got {pages[0]}")
+        per_page: Dict[int, List[_Row]] = {p: [] for p in pages}
+        probs = np.asarray(probs, dtype=np.float64)
+        x0 = lines.bbox[:, 0].tolist() if len(lines) else []
+        for i in np.flatnonzero(probs >= self.p_thresh).tolist():
+            t = lines.text[i].strip()
+            words = t.split()
+            if _is_table(t, words):
+                continue
+            pno = int(lines.page[i])
+            row = len(self._text)
+            self._text.append(lines.text[i])
+            self._page.append(pno)
+            self._size.append(float(lines.font_size[i]))
+            self._x0.append(x0[i])
+            self._prob.append(float(probs[i]))
+            per_page[pno].append((row, t, len(words), self._size[-1], x0[i]))
+
+        for pno in pages:
+            self._pending.append((pno, per_page[pno]))
+            self._counts.update(r[1] for r in per_page[pno])
+        if pages:
+            self._next_page = pages[-1] + 1
+        before = self.settled
+        while self._pending and self._pending[0][0] + self.window < self._next_page:
+            self._settle()
+        if self.settled != before:
+            self.emit({"type": "progress", "pages": self.settled})
+
+    def close(self) -> Dict[str, Any]:
+        """Settle the remaining pages; return the consolidated outline."""
+        before = self.settled
+        while self._pending:
+            self._settle()
+        if self.settled != before:
+            self.emit({"type": "progress", "pages": self.settled})
+
+        level, _, title_rows, title_text = _engine(
+            self._text, self._page, self._size, self._x0, self._prob, self.p_thresh)
+        text = list(self._text)
+        for i in title_rows:
+            text[i] = title_text
+        codes = level.tolist()
+        return {
+            "title": next((text[i] for i, c in enumerate(codes) if c == TITLE), ""),
+            "outline": [{"level": LEVELS[c], "text": text[i], "page": self._page[i] + 1}
+                        for i, c in enumerate(codes) if H1 <= c <= H3],
+        }
+
+    # ------------------------------------------------------------------ settle
+    def _settle(self) -> None:
+        pno, rows = self._pending.popleft()
+        # the window around `pno` is [pno - window, pno + window]
+        while self._trail and self._trail[0][0] < pno - self.window:
+            for r in self._trail.popleft()[1]:
+                self._counts[r[1]] -= 1
+                if not self._counts[r[1]]:
+                    del self._counts[r[1]]
+
+        heads = [r for r in rows
+                 if not (self._counts[r[1]] >= REPEAT_THRESHOLD and r[2] <= 5)]
+        level = {r[0]: _numbering_level(r[1] + " ") for r in heads}
+
+        if heads and not self._title_done:
+            self._title_done = True
+            key_of = {r[0]: r[1] for r in heads}
+            title_rows, title_text = _pick_title(
+                [r[0] for r in heads if level[r[0]] == NONE],
+                self._text, key_of, self._size, self._x0)
+            for i in title_rows:
+                level[i] = TITLE
+            if title_rows:                     # as `build_outline`: a Title line
+                self.emit({"type": "title", "text": title_text, "page": pno + 1})
+
+        plain = [r for r in heads if level[r[0]] == NONE]
+        if plain:
+            self._sizes.update(r[3] for r in plain)
+            size_map = dict(zip(sorted(self._sizes, reverse=True)[:3], (H1, H2, H3)))
+            for r in plain:
+                level[r[0]] = size_map.get(r[3], NONE)
+        for r in heads:
+            code = level[r[0]]
+            if H1 <= code <= H3:
+                self.emit({"type": "heading", "level": LEVELS[code],
+                           "text": self._text[r[0]], "page": pno + 1})
+
+        self._trail.append((pno, rows))
+        self.settled = pno + 1
+
+
+class NdjsonWriter:
+    """`emit` callback: one JSON object per line, flushed so readers can tail it."""
+    def __init__(self, path: Path | str):
+        self.path = Path(path)
+        self._f = open(self.path, "w", encoding="utf-8")
+
+    def __call__(self, record: Dict[str, Any]) -> None:
+        self._f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._f.flush()
+
+    def close(self) -> None:
+        self._f.close()
+
+    def __enter__(self) -> "NdjsonWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,42 @@
+# pdf_outline/triage.py  –  cheap pre‑pass that decides which pages need Donut
+"""
+A page can only contribute a heading if one of its lines stands out from
+body text.  From the `extract_lines` output we keep a page as a *candidate*
+when it has at least one line that is
+
+*  larger than the document body size (char‑weighted modal size), or
+*  bold, or
+*  numbered like a section heading (`cluster._num_re`),
+
+plus the first page with text (Title).  Every other page – dense body text,
+or no text layer at all – is pruned: it is not rendered or encoded and its
+heading probability is 0.
+"""
+
+import numpy as np
+
+from .cluster import _num_re
+from .extract_lines import LineTable
+from .layout_probs import Lines, body_size
+
+
+SIZE_MARGIN = 1.05          # "larger than body" means > body × margin
+
+
+def candidate_pages(lines: Lines, npages: int) -> np.ndarray:
+    """(npages,) bool mask – True for pages that must go through the encoder."""
+    keep = np.zeros(npages, dtype=bool)
+    if not len(lines):
+        return keep
+    t = lines if isinstance(lines, LineTable) else LineTable.from_records(lines)
+
+    limit = body_size(t) * SIZE_MARGIN
+    cue = (t.font_size > limit) | t.is_bold
+    # numbering only matters on pages not already kept by size/bold
+    todo = ~np.isin(t.page, t.page[cue])
+    for i in np.flatnonzero(todo):
+        if _num_re.match(t.text[i].strip() + " "):
+            cue[i] = True
+    keep[t.page[cue]] = True
+    keep[t.page.min()] = True                           # title page
+    return keep
@@ -0,0 +1,134 @@
+# pdf_outline/tune.py
+"""
+Auto‑tune the ONNX Runtime session for this machine.
+
+    python -m pdf_outline.tune --model models/donut_base_int8/int8 \\
+        --procs 2 -o session_profile.json
+    python -m pdf_outline.cli … --session-profile session_profile.json
+
+`--procs` is the number of pipelines that will share the host (Docker
+replicas, `process_pdfs.py` instances …); every trial runs that many
+encoder processes at once and scores their *combined* pages/s, so the
+winner is the profile that does not oversubscribe the cores.
+
+The sweep is greedy, one knob at a time, each stage starting from the best
+profile so far: intra‑op threads → execution mode → thread spinning →
+arena / memory patterns → graph optimisation level.  A candidate has to
+beat the incumbent by `--min-gain` to replace it, so noise never trades a
+default for an exotic setting.
+"""
+
+from __future__ import annotations
+import argparse, multiprocessing as mp, os, platform, time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+
+from .session import SessionProfile, add_session_args, cpu_isa, profile_from_args
+
+
+def _worker(model_dir, profile, batch_size, batches, barrier, results) -> None:
+    from .donut_infer import DonutEncoder
+    enc = DonutEncoder(model_dir, profile=profile)
+    x = np.random.default_rng(0).random((batch_size, 3, *enc.canvas), dtype=np.float32)
+    enc._run(x)                                  # warm‑up
+    barrier.wait()
+    lat = []
+    t0 = time.perf_counter()
+    for _ in range(batches):
+        t = time.perf_counter()
+        enc._run(x)
+        lat.append(time.perf_counter() - t)
+    results.put((time.perf_counter() - t0, lat))
+
+
+def measure(model_dir: Path, profile: SessionProfile, procs: int,
+            batch_size: int, batches: int) -> Dict[str, float]:
+    """Run `procs` encoders concurrently → combined pages/s and batch latency."""
+    ctx = mp.get_context("spawn")
+    barrier, results = ctx.Barrier(procs), ctx.Queue()
+    ps = [ctx.Process(target=_worker, args=(model_dir, profile, batch_size, batches,
+                                            barrier, results)) for _ in range(procs)]
+    for p in ps:
+        p.start()
+    out = [results.get() for _ in ps]
+    for p in ps:
+        p.join()
+    wall = max(w for w, _ in out)
+    lat = np.concatenate([l for _, l in out])
+    return {"pages_per_s": procs * batches * batch_size / wall,
+            "batch_ms_p50": float(np.median(lat) * 1e3),
+            "batch_ms_p90": float(np.percentile(lat, 90) * 1e3)}
+
+
+def _stages(cores: int) -> List[tuple]:
+    """(stage name, changes for each candidate) – evaluated in order."""
+    threads = sorted({1, 2, 4, 8, 16, cores, max(1, cores // 2)} & set(range(1, cores + 1)))
+    return [
+        ("intra_op_threads", [{"intra_op_threads": t} for t in threads]),
+        ("execution_mode",   [{"execution_mode": "sequential", "inter_op_threads": None},
+                              {"execution_mode": "parallel", "inter_op_threads": 2}]),
+        ("allow_spinning",   [{"allow_spinning": True}, {"allow_spinning": False}]),
+        ("memory",           [{"cpu_mem_arena": True, "mem_pattern": True},
+                              {"cpu_mem_arena": True, "mem_pattern": False},
+                              {"cpu_mem_arena": False, "mem_pattern": False}]),
+        ("graph_optimization", [{"graph_optimization": g} for g in ("all", "extended")]),
+    ]
+
+
+def tune(model_dir: Path, base: SessionProfile, procs: int = 1, batch_size: int = 8,
+         batches: int = 3, min_gain: float = 0.03) -> Dict[str, Any]:
+    cores = max(1, (os.cpu_count() or 1) // procs)       # per‑process share
+    # trials run concurrently: no shared optimised‑model file until the end
+    best = base.replace(intra_op_threads=base.intra_op_threads or max(1, cores // 2),
+                        optimized_model=None)
+    best_score = measure(model_dir, best, procs, batch_size, batches)
+    trials = [{"stage": "start", "profile": asdict(best), **best_score}]
+    print(f"start  {best_score['pages_per_s']:7.2f} pages/s  {asdict(best)}")
+
+    for stage, candidates in _stages(cores):
+        for change in candidates:
+            cand = best.replace(**change)
+            if cand == best:
+                continue
+            score = measure(model_dir, cand, procs, batch_size, batches)
+            trials.append({"stage": stage, "profile": asdict(cand), **score})
+            won = score["pages_per_s"] > best_score["pages_per_s"] * (1 + min_gain)
+            print(f"{stage:<18} {score['pages_per_s']:7.2f} pages/s  "
+                  f"p50 {score['batch_ms_p50']:7.1f} ms  {change}{'  ← best' if won else ''}")
+            if won:
+                best, best_score = cand, score
+    return {"profile": best.replace(optimized_model=base.optimized_model),
+            "score": best_score, "trials": trials}
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Sweep ONNX Runtime settings, save the fastest.")
+    p.add_argument("--model", type=Path, default=Path("models/donut_base_int8/int8"),
+                   help="folder with encoder_model.onnx")
+    p.add_argument("-o", "--out", type=Path, default=Path("session_profile.json"))
+    p.add_argument("--procs", type=int, default=1,
+                   help="pipelines that will share this host (run concurrently per trial)")
+    p.add_argument("--batch-size", type=int, default=8)
+    p.add_argument("--batches", type=int, default=3, help="timed batches per trial")
+    p.add_argument("--min-gain", type=float, default=0.03,
+                   help="a candidate must be this much faster to win")
+    add_session_args(p)                  # starting point / fixed settings (e.g. --optimized-model)
+    args = p.parse_args()
+
+    t0 = time.perf_counter()
+    res = tune(args.model, profile_from_args(args), args.procs, args.batch_size,
+               args.batches, args.min_gain)
+    res["profile"].save(args.out, tuned={
+        "host": platform.node(), "machine": platform.machine(), "isa": cpu_isa(),
+        "cpus": os.cpu_count(),
+        "procs": args.procs, "batch_size": args.batch_size, "model": str(args.model),
+        **res["score"], "trials": res["trials"]})
+    print(f"✅  {res['score']['pages_per_s']:.2f} pages/s with {asdict(res['profile'])}\n"
+          f"    saved to {args.out}  ({time.perf_counter() - t0:.0f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,37 +1,102 @@
 # process_pdfs.py
 from pathlib import Path
-import json, sys, traceback
+import os, sys, time
 
-# import the pipeline driver
-from pdf_outline.cli import run as extract_outline
+# each worker keeps one ONNX session + head for the whole input folder
+from pdf_outline.batch import BatchDriver
+from pdf_outline.pipeline import OutlinePipeline, dir_jobs
+from pdf_outline.cache import EmbeddingCache
+from pdf_outline.classify import parse_canvas
+from pdf_outline.metrics import MetricsLog
+from pdf_outline.session import SessionProfile
 
 # ---------- config ---------------------------------------------------------
 INPUT_DIR  = Path("/app/input")
 OUTPUT_DIR = Path("/app/output")
 MODEL_DIR  = Path("/app/models/donut_base_int8/int8")        # encoder/decoder .onnx
-HEAD_PATH  = Path("/app/models/donut_head.pkl")              # your trained head
+HEAD_PATH  = Path("/app/models/donut_head.pkl")               # .head beside it wins
 DPI        = 120                                              # default resolution
+RENDER_WORKERS = int(os.environ.get("RENDER_WORKERS", 2))    # rasterisation workers
+RENDER_BACKEND = os.environ.get("RENDER_BACKEND", "thread")  # "thread" | "process"
+DIRECT_RENDER  = os.environ.get("DIRECT_RENDER", "0") == "1" # render at encoder size
+DOC_JOBS       = int(os.environ.get("DOC_JOBS", 1))           # PDFs in flight
+FAST_MODE      = os.environ.get("FAST_MODE", "0") == "1"     # layout‑only probs
+TRIAGE         = os.environ.get("TRIAGE", "0") == "1"        # skip body‑text pages
+EMBED_CACHE    = os.environ.get("EMBED_CACHE")                # cache dir (optional)
+EMBED_CACHE_MB = int(os.environ.get("EMBED_CACHE_MB", 512))
+INCREMENTAL    = os.environ.get("INCREMENTAL_DIR")            # page manifests (optional)
+METRICS_JSONL  = os.environ.get("METRICS_JSONL")              # per‑doc stage timings
+SESSION_PROFILE = os.environ.get("SESSION_PROFILE")           # from `python -m pdf_outline.tune`
+CANVAS         = os.environ.get("CANVAS")                     # e.g. "640x480"; needs its head
+ENCODER_VARIANT = os.environ.get("ENCODER_VARIANT")           # e.g. "int8_static"; needs its head
+WORKERS        = os.environ.get("WORKERS", "auto")            # processes; "0" = in‑process
+DOC_TIMEOUT    = float(os.environ.get("DOC_TIMEOUT", 120))    # s per PDF (+2 s/page)
+RESUME         = os.environ.get("RESUME", "0") == "1"         # skip PDFs whose JSON exists
+EXTRACT_WORKERS = int(os.environ.get("EXTRACT_WORKERS", 1))   # page text parsing threads
+PRUNE_LINES    = os.environ.get("PRUNE_LINES", "0") == "1"   # drop lines below body size
+STREAM_WINDOW  = int(os.environ.get("STREAM_WINDOW", 0))      # >0: <name>.ndjson as it goes
 # ---------------------------------------------------------------------------
 
 
 def main() -> None:
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
-    for pdf in INPUT_DIR.glob("*.pdf"):
-        out_json = OUTPUT_DIR / f"{pdf.stem}.json"
-        try:
-            data = extract_outline(
-                pdf_path=str(pdf),
-                out_path=out_json,
-                model_dir=str(MODEL_DIR),
-                head_path=str(HEAD_PATH),
-                dpi=DPI,
-            )
-            # `run` already writes the file; data returned for completeness
-            print(f"✓ {pdf.name}  →  {out_json.relative_to(OUTPUT_DIR.parent)}")
-        except Exception as e:
-            print(f"✗ {pdf.name}: {e}", file=sys.stderr)
-            traceback.print_exc()
+    t0 = time.perf_counter()
+    cache = (EmbeddingCache(EMBED_CACHE, max_bytes=EMBED_CACHE_MB << 20)
+             if EMBED_CACHE else None)
+    config = dict(model_dir=MODEL_DIR, head_path=HEAD_PATH, dpi=DPI,
+                  render_workers=RENDER_WORKERS,
+                  render_backend=RENDER_BACKEND,
+                  direct_render=DIRECT_RENDER,
+                  canvas=parse_canvas(CANVAS) if CANVAS else None,
+                  variant=ENCODER_VARIANT,
+                  fast=FAST_MODE,
+                  triage=TRIAGE,
+                  incremental=INCREMENTAL,
+                  extract_workers=EXTRACT_WORKERS,
+                  prune_lines=PRUNE_LINES,
+                  stream_window=STREAM_WINDOW,
+                  session_profile=(SessionProfile.load(SESSION_PROFILE)
+                                   if SESSION_PROFILE else None))
+    jobs = dir_jobs(INPUT_DIR, OUTPUT_DIR)
+    # the embedding cache (single writer) and cross‑document batches need
+    # one in‑process pipeline; otherwise crash‑isolated worker processes
+    if WORKERS == "0" or cache is not None or DOC_JOBS > 1:
+        pipeline = OutlinePipeline(**config, cache=cache)
+        print(f"Loaded encoder + head in {time.perf_counter() - t0:.1f}s")
+        if RESUME:
+            jobs = [(pdf, out) for pdf, out in jobs if not out.exists()]
+        results = pipeline.run_many(jobs, concurrency=DOC_JOBS)
+        batch_stats = lambda: pipeline.batch_stats
+        close = pipeline.close
+    else:
+        driver = BatchDriver(config, workers=None if WORKERS == "auto" else int(WORKERS),
+                             timeout=DOC_TIMEOUT, resume=RESUME)
+        results = driver.run(jobs)
+        batch_stats = lambda: None
+        close = lambda: None
+
+    log = MetricsLog(METRICS_JSONL)
+    n_ok = n_err = 0
+    for r in results:
+        log.add(r.metrics)
+        if r.ok:
+            n_ok += 1
+            print(f"✓ {r.pdf.name}  →  {r.out.relative_to(OUTPUT_DIR.parent)}  "
+                  f"({r.pages} pages, {r.seconds:.2f}s, {r.stats.get('mode', 'donut')})")
+        else:
+            n_err += 1
+            print(f"✗ {r.pdf.name}: {r.error}", file=sys.stderr)
+
+    close()
+    print(f"Done: {n_ok} ok, {n_err} failed in {time.perf_counter() - t0:.1f}s")
+    log.close()
+    print(log.format_summary(batch_stats()))
+    if METRICS_JSONL:
+        log.write_summary(Path(METRICS_JSONL).with_suffix(".summary.json"), batch_stats())
+    if cache is not None:
+        cache.close()
+        print(f"Embedding cache: {cache.hits} hits, {cache.misses} misses")
 
 if __name__ == "__main__":
     main()
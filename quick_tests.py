@@ -10,7 +10,7 @@ Usage:
 from pathlib import Path
 import sys
 
-from pdf_outline import render, extract_lines
+from pdf_outline import PdfDocument, render_pdf, extract_lines
 
 
 def main(pdf_path: str | Path):
@@ -19,13 +19,14 @@ def main(pdf_path: str | Path):
         print(f"❌  File not found: {pdf_path}")
         sys.exit(1)
 
-    # --- Render pages ------------------------------------------------------
-    pages = render.render_pdf(pdf_path, dpi=150, max_workers=4)
-    print(f"Rendered {len(pages)} pages – first page size: {pages[0].size}")
+    with PdfDocument(pdf_path) as doc:             # opened once for both steps
+        # --- Render pages --------------------------------------------------
+        pages = render_pdf(doc, dpi=150, max_workers=4)
+        print(f"Rendered {len(pages)} pages – first page size: {pages[0].size}")
 
-    # --- Extract text lines ------------------------------------------------
-    lines = extract_lines.extract_lines(pdf_path)
-    print(f"Extracted {len(lines)} text lines.")
+        # --- Extract text lines --------------------------------------------
+        lines = extract_lines(doc)
+        print(f"Extracted {len(lines)} text lines.")
 
     # show first 5 lines for inspection
     for i, line in enumerate(lines[:5], 1):
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+bench_canvas.py  – accuracy / throughput tradeoff of reduced encoder canvases
+
+For each canvas (default 1280x960, 960x720, 640x480) in a fresh process:
+
+*  encoder pages/s on a fixed batch – the pure session cost, which scales
+   roughly with the pixel count (Donut's patch sequence)
+*  end‑to‑end pages/s and mean heading F1 / title hits on
+   `sample_dataset/pdfs` against `sample_dataset/outputs`
+
+Every canvas needs its own head (`<head>_HxW.head`, see
+`scripts/train_head.py --canvas`); canvases without one are reported as
+skipped.  --train-missing fits them on --train-pdfs first – when that is
+sample_dataset itself the F1 column is optimistic (train == test).
+
+Usage:
+    python scripts/bench_canvas.py --canvas 1280x960 960x720 640x480 512x384
+    python scripts/bench_canvas.py --train-missing --train-pdfs pdfs --json canvas.json
+"""
+
+from pathlib import Path
+import argparse, json, multiprocessing as mp, time
+
+import numpy as np
+
+from pdf_outline.classify import head_path_for, parse_canvas, resolve_head
+from pdf_outline.metrics import peak_rss_mb
+from pdf_outline.pipeline import OutlinePipeline
+
+from bench_suite import SAMPLE, score
+
+DEFAULT_CANVASES = ["1280x960", "960x720", "640x480"]
+
+
+def _measure(args) -> dict:
+    cfg, canvas = args
+    pipe = OutlinePipeline(cfg["model"], cfg["head"], dpi=cfg["dpi"],
+                           batch_size=cfg["batch_size"], canvas=canvas)
+    enc = pipe.encoder
+    x = np.random.default_rng(0).random((cfg["batch_size"], 3, *enc.canvas), dtype=np.float32)
+    enc._run(x)                                   # warm‑up
+    t0 = time.perf_counter()
+    for _ in range(cfg["batches"]):
+        enc._run(x)
+    enc_pps = cfg["batches"] * cfg["batch_size"] / (time.perf_counter() - t0)
+
+    pages = 0
+    wall = 0.0
+    acc = []
+    for pdf in sorted((SAMPLE / "pdfs").glob("*.pdf")):
+        outline, stats = pipe.outline(pdf)
+        pages += stats["pages"]
+        wall += stats["metrics"]["wall_s"]
+        acc.append(score(outline, json.loads((SAMPLE / "outputs" / f"{pdf.stem}.json").read_text())))
+    return {"canvas": "%dx%d" % enc.canvas, "head": str(pipe.head_path),
+            "encoder_pages_per_s": round(enc_pps, 2),
+            "pages_per_s": round(pages / wall, 2) if wall else None,
+            "mean_f1": round(float(np.mean([a["f1"] for a in acc])), 4),
+            "titles": sum(a["title"] for a in acc), "docs": len(acc),
+            "peak_rss_mb": round(peak_rss_mb(), 1)}
+
+
+def _train(cfg: dict, canvas: tuple, pdfs: Path) -> None:
+    from train_head import train
+    out = train(sorted(pdfs.glob("*.pdf")), cfg["model"], cfg["head"], canvas,
+                dpi=cfg["dpi"], batch_size=cfg["batch_size"])
+    print(f"trained {out}")
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    p.add_argument("--canvas", nargs="+", default=DEFAULT_CANVASES, metavar="HxW")
+    p.add_argument("--model", type=Path, default=Path("models/donut_base_int8/int8"))
+    p.add_argument("--head", type=Path, default=Path("models/donut_head.pkl"))
+    p.add_argument("--dpi", type=int, default=120)
+    p.add_argument("--batch-size", type=int, default=8)
+    p.add_argument("--batches", type=int, default=3, help="timed encoder batches")
+    p.add_argument("--train-missing", action="store_true",
+                   help="fit heads for canvases that have none")
+    p.add_argument("--train-pdfs", type=Path, default=SAMPLE / "pdfs")
+    p.add_argument("--json", type=Path, help="write the rows here")
+    args = p.parse_args()
+
+    cfg = {"model": args.model, "head": args.head, "dpi": args.dpi,
+           "batch_size": args.batch_size, "batches": args.batches}
+    ctx = mp.get_context("spawn")
+    rows = []
+    for spec in args.canvas:
+        canvas = parse_canvas(spec)
+        if not resolve_head(head_path_for(args.head, canvas)).exists():
+            if not args.train_missing:
+                print(f"{spec}: skipped, no {head_path_for(args.head, canvas)} (--train-missing)")
+                continue
+            _train(cfg, canvas, args.train_pdfs)
+        with ctx.Pool(1) as pool:
+            rows.append(pool.apply(_measure, ((cfg, canvas),)))
+
+    if not rows:
+        raise SystemExit("❌  nothing measured")
+    base = rows[0]
+    print(f"\n{'canvas':<10} {'enc pg/s':>9} {'speed‑up':>9} {'e2e pg/s':>9} "
+          f"{'mean F1':>8} {'titles':>7} {'RSS MiB':>8}")
+    for r in rows:
+        print(f"{r['canvas']:<10} {r['encoder_pages_per_s']:>9.2f} "
+              f"{r['encoder_pages_per_s'] / base['encoder_pages_per_s']:>8.2f}× "
+              f"{r['pages_per_s'] or 0:>9.2f} {r['mean_f1']:>8.3f} "
+              f"{r['titles']:>3}/{r['docs']:<3} {r['peak_rss_mb']:>8.0f}")
+    if args.train_missing and args.train_pdfs.resolve() == (SAMPLE / "pdfs").resolve():
+        print("(heads trained on sample_dataset – F1 is not a held‑out estimate)")
+    if args.json:
+        args.json.write_text(json.dumps(rows, indent=2))
+
+
+if __name__ == "__main__":
+    main()
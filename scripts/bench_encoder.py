@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+bench_encoder.py  – per‑batch latency / memory of the encoder run paths
+
+    run      session.run(None, …)[0][:, 0, :]  – every output, fresh allocation
+    bound    IO binding, output written into a reused per‑thread buffer
+    cls      IO binding on encoder_model_cls.onnx (scripts/trim_cls.py)
+
+Every (path, batch size) runs in a fresh process so its peak RSS is its own.
+
+Usage:
+    python scripts/bench_encoder.py models/donut_base_int8/int8 --batch 1 2 4 8 16
+"""
+
+from pathlib import Path
+import argparse, multiprocessing as mp, time
+
+import numpy as np
+
+from pdf_outline.donut_infer import CLS_MODEL, ENCODER_MODEL, DonutEncoder
+from pdf_outline.metrics import peak_rss_mb
+
+PATHS = ("run", "bound", "cls")
+
+
+def _measure(args) -> dict:
+    model_dir, path, B, repeat = args
+    if path == "cls":
+        enc = DonutEncoder(model_dir, model_file=CLS_MODEL)
+    else:
+        enc = DonutEncoder(model_dir, io_binding=path == "bound", model_file=ENCODER_MODEL)
+    if path == "run":                          # the pre‑IO‑binding call
+        run = lambda x: enc.session.run(None, {enc.input_name: x})[0][:, 0, :]
+    else:
+        run = enc._run
+
+    x = np.random.default_rng(0).random((B, 3, *enc.canvas), dtype=np.float32)
+    rss_load = peak_rss_mb()
+    run(x)                                     # warm‑up: arena, kernels, buffers
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        run(x)
+        times.append(time.perf_counter() - t0)
+    peak = peak_rss_mb()
+    one = enc.session.run([enc.output_name], {enc.input_name: x[:1]})[0]
+    return {"path": path, "batch": B,
+            "median_ms": float(np.median(times) * 1e3),
+            "p90_ms": float(np.percentile(times, 90) * 1e3),
+            "rss_load_mb": rss_load, "peak_rss_mb": peak,
+            "out_kib_per_page": one.nbytes / 1024}
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    p.add_argument("model_dir", type=Path)
+    p.add_argument("--batch", type=int, nargs="+", default=[1, 2, 4, 8])
+    p.add_argument("--paths", nargs="+", choices=PATHS, default=list(PATHS))
+    p.add_argument("--repeat", type=int, default=10)
+    args = p.parse_args()
+
+    paths = [x for x in args.paths if x != "cls" or (args.model_dir / CLS_MODEL).exists()]
+    if len(paths) < len(args.paths):
+        print(f"(no {CLS_MODEL} – run scripts/trim_cls.py to include the 'cls' path)")
+
+    ctx = mp.get_context("spawn")
+    rows = []
+    for B in args.batch:
+        for path in paths:
+            with ctx.Pool(1) as pool:
+                rows.append(pool.apply(_measure, ((args.model_dir, path, B, args.repeat),)))
+
+    print(f"{'path':<6} {'batch':>5} {'median ms':>10} {'p90 ms':>8} {'ms/page':>8} "
+          f"{'RSS load':>9} {'RSS peak':>9} {'Δ MiB':>7}")
+    base = {r["batch"]: r for r in rows if r["path"] == paths[0]}
+    for r in rows:
+        print(f"{r['path']:<6} {r['batch']:>5} {r['median_ms']:>10.1f} {r['p90_ms']:>8.1f} "
+              f"{r['median_ms'] / r['batch']:>8.1f} {r['rss_load_mb']:>9.0f} "
+              f"{r['peak_rss_mb']:>9.0f} {r['peak_rss_mb'] - r['rss_load_mb']:>7.0f}"
+              + ("" if r is base[r["batch"]] else
+                 f"   {r['median_ms'] / base[r['batch']]['median_ms'] - 1:+.1%} vs {paths[0]}"))
+    print("\ngraph output per page: " + ", ".join(
+        f"{path} {next(r['out_kib_per_page'] for r in rows if r['path'] == path):.0f} KiB"
+        for path in paths))
+
+
+if __name__ == "__main__":
+    main()
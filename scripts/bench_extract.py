@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+bench_extract.py  – pages/sec of the line extractors
+
+Compares, on the same PDFs (best of --repeat runs):
+
+*  ``records``  – the per‑line dict extractor + `LineTable.from_records`
+   (what the pipeline did before `extract_table`)
+*  ``table``    – `extract_table`, columns built straight from each page
+*  ``prune``    – `extract_table(prune=True)`, lines below body size dropped
+*  ``thread N`` / ``process N`` – `extract_table` with N parallel workers
+
+plus the raw `get_text("dict")` vs ``"rawdict"`` cost per page (rawdict
+returns one dict per character, so it is the slower of the two).
+
+Usage:
+    python scripts/bench_extract.py sample_dataset/pdfs/*.pdf
+    python scripts/bench_extract.py --synth-pages 1000 --workers 2 4
+"""
+
+from pathlib import Path
+import argparse, os, time
+
+import fitz                      # PyMuPDF
+
+from pdf_outline.document import PdfDocument
+from pdf_outline.extract_lines import LineTable, extract_lines, extract_table
+from pdf_outline.render import BACKENDS
+
+from synth_pdfs import ensure_corpus
+
+
+def _best(fn, pdfs, repeat: int) -> tuple[float, int]:
+    """(best seconds over all `pdfs`, lines of the last run)."""
+    best, n = float("inf"), 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        n = sum(len(fn(pdf)) for pdf in pdfs)
+        best = min(best, time.perf_counter() - t0)
+    return best, n
+
+
+def _get_text(mode: str):
+    def run(pdf):
+        with fitz.open(pdf) as doc:
+            return [page.get_text(mode, flags=fitz.TEXTFLAGS_TEXT) for page in doc]
+    return run
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    p.add_argument("pdfs", type=Path, nargs="*")
+    p.add_argument("--synth-pages", type=int, nargs="+", default=[],
+                   help="also bench synthetic PDFs of these page counts")
+    p.add_argument("--work", type=Path, default=Path("/tmp/pdf_outline_bench"))
+    p.add_argument("--workers", type=int, nargs="+",
+                   default=sorted({2, os.cpu_count() or 1} - {1}) or [2])
+    p.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    p.add_argument("--repeat", type=int, default=3, help="best of N runs")
+    args = p.parse_args()
+
+    pdfs = list(args.pdfs)
+    if args.synth_pages:
+        pdfs += ensure_corpus(args.work, sorted(args.synth_pages))
+    if not pdfs:
+        raise SystemExit("❌  no PDFs (pass files or --synth-pages)")
+    pages = sum(len(PdfDocument(pdf)) for pdf in pdfs)
+    print(f"{len(pdfs)} PDFs, {pages} pages, {os.cpu_count()} CPUs\n")
+
+    rows = [("records", lambda pdf: LineTable.from_records(extract_lines(pdf))),
+            ("table", extract_table),
+            ("prune", lambda pdf: extract_table(pdf, prune=True))]
+    for backend in args.backends:
+        for w in args.workers:
+            rows.append((f"{backend} {w}",
+                         lambda pdf, w=w, b=backend: extract_table(pdf, workers=w, backend=b)))
+    rows += [('get_text "dict"', _get_text("dict")),
+             ('get_text "rawdict"', _get_text("rawdict"))]
+
+    base = None
+    print(f"{'extractor':<20} {'seconds':>8} {'pages/s':>8} {'lines':>8} {'speed‑up':>9}")
+    for name, fn in rows:
+        sec, n = _best(fn, pdfs, args.repeat)
+        base = base or sec
+        lines = "" if name.startswith("get_text") else n
+        print(f"{name:<20} {sec:>8.3f} {pages / sec:>8.1f} {lines:>8} {base / sec:>8.2f}×")
+
+
+if __name__ == "__main__":
+    main()
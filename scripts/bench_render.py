@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+bench_render.py  – pages/sec of the thread vs process rasterisation backends
+
+Usage:
+    python scripts/bench_render.py sample_dataset/pdfs/*.pdf --dpi 120 --workers 2 4 8
+"""
+
+from contextlib import nullcontext
+from pathlib import Path
+import argparse, os, time
+
+from pdf_outline.document import PdfDocument
+from pdf_outline.render import BACKENDS, iter_pages, process_pool
+
+
+def _count_pages(pdf: Path) -> int:
+    with PdfDocument(pdf) as doc:
+        return len(doc)
+
+
+def _bench(pdfs, dpi, workers, backend, repeat):
+    best = float("inf")
+    npages = 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        npages = 0
+        # one worker pool for all PDFs, as the pipeline uses it (start‑up timed)
+        with (process_pool(workers) if backend == "process" else nullcontext()) as pool:
+            for pdf in pdfs:
+                for _page in iter_pages(pdf, dpi=dpi, max_workers=workers, backend=backend,
+                                        pool=pool):
+                    npages += 1
+        best = min(best, time.perf_counter() - t0)
+    return npages, best
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    p.add_argument("pdfs", type=Path, nargs="+")
+    p.add_argument("--dpi", type=int, default=120)
+    p.add_argument("--workers", type=int, nargs="+",
+                   default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    p.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    p.add_argument("--repeat", type=int, default=3, help="best of N runs")
+    args = p.parse_args()
+
+    total = sum(_count_pages(pdf) for pdf in args.pdfs)
+    print(f"{len(args.pdfs)} PDFs, {total} pages @ {args.dpi} dpi\n")
+    print(f"{'backend':<8} {'workers':>7} {'seconds':>8} {'pages/s':>8}")
+    for backend in args.backends:
+        for w in args.workers:
+            n, sec = _bench(args.pdfs, args.dpi, w, backend, args.repeat)
+            print(f"{backend:<8} {w:>7} {sec:>8.2f} {n / sec:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+bench_startup.py  – cold‑start latency of the CLI entry point
+
+Every case runs in a fresh interpreter (best of --repeat):
+
+*  ``import``      – `import pdf_outline`
+*  ``--help``      – `python -m pdf_outline.cli --help`
+*  ``1 page fast`` – a 1‑page PDF in text‑only mode (no onnxruntime)
+*  ``1 page``      – the same PDF through the encoder (needs --model/--head)
+
+followed by the slowest imports of `--help` (`python -X importtime`) and
+whether the heavy runtime modules were loaded for it.  `--max-help-ms`
+turns the `--help` time into a pass/fail budget.
+
+Usage:
+    python scripts/bench_startup.py
+    python scripts/bench_startup.py --model models/donut_base_int8/int8 --max-help-ms 300
+"""
+
+from pathlib import Path
+import argparse, os, subprocess, sys, tempfile, time
+
+ROOT  = Path(__file__).resolve().parents[1]
+HEAVY = ("numpy", "fitz", "PIL", "onnxruntime", "torch", "transformers")
+
+
+def _run(argv: list, repeat: int) -> float:
+    """Best wall time (s) of `python argv…` in a fresh process."""
+    env = {**os.environ, "PYTHONPATH": str(ROOT)}
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, *argv], env=env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def _import_profile(argv: list, top: int) -> tuple[list, list]:
+    """(slowest `top` (cumulative µs, module), heavy modules imported)."""
+    env = {**os.environ, "PYTHONPATH": str(ROOT)}
+    err = subprocess.run([sys.executable, "-X", "importtime", *argv], env=env,
+                         stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True).stderr
+    rows = []
+    for line in err.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cum, name = (c.strip() for c in line[len("import time:"):].split("|"))
+        rows.append((int(cum), name))
+    loaded = {name.strip() for _, name in rows}
+    heavy = [m for m in HEAVY if m in loaded]
+    top_level = [r for r in rows if not r[1].startswith(" ")]
+    return sorted(top_level, reverse=True)[:top], heavy
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    p.add_argument("--pdf", type=Path,
+                   default=ROOT / "sample_dataset/pdfs/TOPJUMP-PARTY-INVITATION-20161003-V01.pdf",
+                   help="1‑page PDF")
+    p.add_argument("--model", type=Path, help="encoder folder (adds the full 1‑page run)")
+    p.add_argument("--head", type=Path, default=Path("models/donut_head.pkl"))
+    p.add_argument("--repeat", type=int, default=5, help="best of N runs")
+    p.add_argument("--top", type=int, default=8, help="slowest imports to list")
+    p.add_argument("--max-help-ms", type=float, help="fail if `--help` takes longer")
+    args = p.parse_args()
+
+    out = Path(tempfile.mkdtemp()) / "outline.json"
+    cli = ["-m", "pdf_outline.cli"]
+    cases = [("import", ["-c", "import pdf_outline"]),
+             ("--help", [*cli, "--help"]),
+             ("1 page fast", [*cli, str(args.pdf), "-o", str(out), "--fast"])]
+    if args.model:
+        cases.append(("1 page", [*cli, str(args.pdf), "-o", str(out),
+                                 "--model", str(args.model), "--head", str(args.head)]))
+    base = _run(["-c", "pass"], args.repeat)
+
+    print(f"{'case':<12} {'ms':>8} {'over python':>12}")
+    print(f"{'python':<12} {base * 1e3:>8.0f} {'':>12}")
+    times = {}
+    for name, argv in cases:
+        times[name] = sec = _run(argv, args.repeat)
+        print(f"{name:<12} {sec * 1e3:>8.0f} {(sec - base) * 1e3:>11.0f}ms")
+
+    top, heavy = _import_profile([*cli, "--help"], args.top)
+    print("\nslowest imports for --help (cumulative):")
+    for us, name in top:
+        print(f"  {us / 1e3:>7.1f} ms  {name}")
+    print(f"heavy modules loaded for --help: {', '.join(heavy) or 'none'}")
+
+    if args.max_help_ms and times["--help"] * 1e3 > args.max_help_ms:
+        raise SystemExit(f"❌  --help took {times['--help'] * 1e3:.0f} ms "
+                         f"(budget {args.max_help_ms:.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+bench_suite.py  – reproducible speed / memory / accuracy benchmark
+
+Runs `sample_dataset/pdfs` plus synthetic PDFs of 1 … 2000 pages (see
+`synth_pdfs.py`, generated once into --work) through one OutlinePipeline
+and reports, per document:
+
+*  wall time, pages/s and the per‑stage split from `DocMetrics`
+   (extract, render, preprocess, session, assign, …)
+*  peak RSS – the process high‑water mark, or with --isolate the peak of a
+   fresh process per document (model load included, reported separately)
+*  accuracy against the expected outline: `sample_dataset/outputs/<name>.json`
+   or the synthetic ground truth – title match, heading P/R/F1 on exact
+   (level, text, page) and whether the JSON is identical
+
+--save-baseline writes the results; --baseline compares against a saved run
+and exits 1 if throughput, peak RSS or accuracy regressed beyond tolerance.
+Baselines are machine‑specific: record one on the machine you compare on.
+
+Usage:
+    python scripts/bench_suite.py --save-baseline /tmp/bench_base.json
+    python scripts/bench_suite.py --baseline /tmp/bench_base.json
+    python scripts/bench_suite.py --synth-pages 1 10 100 500 2000 --isolate
+"""
+
+from pathlib import Path
+import argparse, json, multiprocessing as mp, os, platform, subprocess, sys, time
+
+import numpy as np
+
+from pdf_outline.classify import parse_canvas
+from pdf_outline.metrics import peak_rss_mb
+from pdf_outline.pipeline import OutlinePipeline
+
+from synth_pdfs import ensure_corpus
+
+ROOT   = Path(__file__).resolve().parents[1]
+SAMPLE = ROOT / "sample_dataset"
+
+
+# ---------------------------------------------------------------- accuracy
+def score(pred: dict, truth: dict) -> dict:
+    """Title match + heading precision / recall / F1 on exact (level, text, page)."""
+    key = lambda h: (h["level"], h["text"].strip(), h["page"])
+    p = {key(h) for h in pred["outline"]}
+    t = {key(h) for h in truth["outline"]}
+    tp = len(p & t)
+    prec = tp / len(p) if p else float(not t)
+    rec  = tp / len(t) if t else float(not p)
+    return {"title": pred["title"].strip() == truth["title"].strip(),
+            "precision": round(prec, 4), "recall": round(rec, 4),
+            "f1": round(2 * prec * rec / (prec + rec), 4) if prec + rec else 0.0,
+            "exact": pred == truth}
+
+
+# ---------------------------------------------------------------- running
+def _pipeline(cfg: dict) -> OutlinePipeline:
+    return OutlinePipeline(cfg["model"], cfg["head"], dpi=cfg["dpi"],
+                           batch_size=cfg["batch_size"], render_workers=cfg["workers"],
+                           render_backend=cfg["render_backend"], direct_render=cfg["direct"],
+                           fast=cfg["fast"], triage=cfg["triage"], canvas=cfg.get("canvas"),
+                           prune_lines=cfg.get("prune_lines", False))
+
+
+def _bench_doc(pipe: OutlinePipeline, pdf: Path, truth: Path, repeat: int) -> dict:
+    best = None
+    for _ in range(repeat):
+        outline, stats = pipe.outline(pdf)
+        rec = stats["metrics"]
+        if best is None or rec["wall_s"] < best["wall_s"]:
+            best = rec
+    pages = best["pages"]
+    stages = best["stages"]
+    return {
+        "name": pdf.name, "pages": pages, "mode": best["mode"],
+        "wall_s": best["wall_s"], "pages_per_s": best["pages_per_s"],
+        "stages": {k: {**v, "pages_per_s": round(pages / v["wall_s"], 1) if v["wall_s"] > 0 else None}
+                   for k, v in stages.items()},
+        "batches": best["batches"],
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "accuracy": score(outline, json.loads(truth.read_text())),
+    }
+
+
+def _isolated(args) -> dict:
+    """Runs in a fresh process: own pipeline, own RSS high‑water mark."""
+    cfg, pdf, truth, repeat = args
+    pipe = _pipeline(cfg)
+    rss_load = peak_rss_mb()
+    rec = _bench_doc(pipe, pdf, truth, repeat)
+    rec["rss_after_load_mb"] = round(rss_load, 1)
+    return rec
+
+
+def _env(cfg: dict) -> dict:
+    import fitz, onnxruntime
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                         stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"commit": commit, "python": platform.python_version(),
+            "machine": platform.machine(), "cpus": os.cpu_count(),
+            "numpy": np.__version__, "onnxruntime": onnxruntime.__version__,
+            "pymupdf": fitz.VersionBind, "config": {k: str(v) for k, v in cfg.items()}}
+
+
+# ---------------------------------------------------------------- reporting
+def _print(rows: list) -> None:
+    cols = ("extract", "render", "preprocess", "session", "assign")
+    print(f"{'pdf':<34} {'pages':>5} {'wall s':>7} {'pg/s':>6} "
+          + " ".join(f"{c[:7]:>7}" for c in cols) + f" {'RSS MiB':>8} {'F1':>5} exact")
+    for r in rows:
+        st = r["stages"]
+        print(f"{r['name'][:34]:<34} {r['pages']:>5} {r['wall_s']:>7.2f} {r['pages_per_s']:>6.1f} "
+              + " ".join(f"{st[c]['wall_s'] if c in st else 0:>7.2f}" for c in cols)
+              + f" {r['peak_rss_mb']:>8.0f} {r['accuracy']['f1']:>5.2f} "
+              + ("yes" if r["accuracy"]["exact"] else "no"))
+
+
+def _summary(rows: list) -> dict:
+    out = {}
+    for group in ("sample", "synthetic"):
+        g = [r for r in rows if r["group"] == group]
+        if not g:
+            continue
+        pages, wall = sum(r["pages"] for r in g), sum(r["wall_s"] for r in g)
+        out[group] = {"docs": len(g), "pages": pages, "wall_s": round(wall, 3),
+                      "pages_per_s": round(pages / wall, 2) if wall else 0.0,
+                      "mean_f1": round(float(np.mean([r["accuracy"]["f1"] for r in g])), 4),
+                      "exact": sum(r["accuracy"]["exact"] for r in g),
+                      "peak_rss_mb": max(r["peak_rss_mb"] for r in g)}
+    return out
+
+
+def compare(rows: list, base: dict, cfg: dict, tol: float, rss_tol: float,
+            min_wall: float) -> int:
+    """
+    Print deltas vs `base`; return the number of regressions.  Speed is
+    only judged for documents taking ≥ `min_wall` s – shorter runs are noise.
+    """
+    if base.get("env", {}).get("config") != {k: str(v) for k, v in cfg.items()}:
+        print("⚠️  baseline was recorded with a different pipeline config")
+    old = {r["name"]: r for r in base["docs"]}
+    bad = 0
+    print(f"\n{'pdf':<34} {'pg/s':>7} {'base':>7} {'Δ':>7} {'RSS Δ':>7} {'F1':>5} {'base':>5}")
+    for r in rows:
+        o = old.get(r["name"])
+        if o is None:
+            print(f"{r['name'][:34]:<34} (not in baseline)")
+            continue
+        speed = r["pages_per_s"] / o["pages_per_s"] - 1 if o["pages_per_s"] else 0.0
+        rss   = r["peak_rss_mb"] / o["peak_rss_mb"] - 1 if o["peak_rss_mb"] else 0.0
+        flags = []
+        if speed < -tol and max(r["wall_s"], o["wall_s"]) >= min_wall:
+            flags.append("SLOWER")
+        if rss > rss_tol:
+            flags.append("MEMORY")
+        if (r["accuracy"]["f1"] < o["accuracy"]["f1"]
+                or (o["accuracy"]["exact"] and not r["accuracy"]["exact"])
+                or (o["accuracy"]["title"] and not r["accuracy"]["title"])):
+            flags.append("ACCURACY")
+        bad += bool(flags)
+        print(f"{r['name'][:34]:<34} {r['pages_per_s']:>7.1f} {o['pages_per_s']:>7.1f} "
+              f"{speed:>+7.1%} {rss:>+7.1%} {r['accuracy']['f1']:>5.2f} "
+              f"{o['accuracy']['f1']:>5.2f}  {' '.join(flags)}")
+    return bad
+
+
+# ---------------------------------------------------------------- main
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    p.add_argument("--synth-pages", type=int, nargs="*", default=[1, 10, 100, 2000],
+                   help="synthetic document sizes (none: sample_dataset only)")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--work", type=Path, default=Path("/tmp/pdf_outline_bench"),
+                   help="where synthetic PDFs are generated (and reused)")
+    p.add_argument("--no-sample", action="store_true", help="skip sample_dataset/pdfs")
+    p.add_argument("--repeat", type=int, default=2, help="best of N runs per document")
+    p.add_argument("--isolate", action="store_true",
+                   help="fresh process per document → per‑document peak RSS")
+    p.add_argument("--json", type=Path, help="write the full report here")
+    p.add_argument("--save-baseline", type=Path, metavar="FILE")
+    p.add_argument("--baseline", type=Path, metavar="FILE",
+                   help="compare against a saved run; exit 1 on regression")
+    p.add_argument("--tolerance", type=float, default=0.10,
+                   help="allowed pages/s drop vs baseline (fraction)")
+    p.add_argument("--rss-tolerance", type=float, default=0.15,
+                   help="allowed peak RSS growth vs baseline (fraction)")
+    p.add_argument("--min-wall", type=float, default=0.5,
+                   help="don't judge the speed of documents faster than this (s)")
+    # pipeline config – kept in the report so baselines are comparable
+    p.add_argument("--model", type=Path, default=Path("models/donut_base_int8/int8"))
+    p.add_argument("--head", type=Path, default=Path("models/donut_head.pkl"))
+    p.add_argument("--dpi", type=int, default=120)
+    p.add_argument("--batch-size", type=int, default=8)
+    p.add_argument("--workers", type=int, default=2)
+    p.add_argument("--render-backend", default="thread")
+    p.add_argument("--direct", action="store_true")
+    p.add_argument("--canvas", type=parse_canvas, metavar="HxW")
+    p.add_argument("--fast", action="store_true")
+    p.add_argument("--triage", action="store_true")
+    p.add_argument("--prune-lines", action="store_true")
+    args = p.parse_args()
+
+    cfg = {k: getattr(args, k) for k in ("model", "head", "dpi", "batch_size", "workers",
+                                         "render_backend", "direct", "canvas", "fast",
+                                         "triage", "prune_lines", "isolate")}
+
+    jobs = []                                         # (group, pdf, truth json)
+    if not args.no_sample:
+        for pdf in sorted((SAMPLE / "pdfs").glob("*.pdf")):
+            jobs.append(("sample", pdf, SAMPLE / "outputs" / f"{pdf.stem}.json"))
+    if args.synth_pages:
+        t0 = time.perf_counter()
+        for pdf in ensure_corpus(args.work, sorted(args.synth_pages), args.seed):
+            jobs.append(("synthetic", pdf, pdf.with_suffix(".json")))
+        print(f"synthetic corpus ready in {time.perf_counter() - t0:.1f}s ({args.work})")
+
+    rows = []
+    if args.isolate:
+        ctx = mp.get_context("spawn")
+        for group, pdf, truth in jobs:
+            with ctx.Pool(1) as pool:
+                rec = pool.apply(_isolated, ((cfg, pdf, truth, args.repeat),))
+            rows.append({"group": group, **rec})
+    else:
+        t0 = time.perf_counter()
+        pipe = _pipeline(cfg)
+        print(f"pipeline loaded in {time.perf_counter() - t0:.1f}s, RSS {peak_rss_mb():.0f} MiB")
+        for group, pdf, truth in jobs:
+            rows.append({"group": group, **_bench_doc(pipe, pdf, truth, args.repeat)})
+
+    print()
+    _print(rows)
+    summary = _summary(rows)
+    for group, s in summary.items():
+        print(f"— {group}: {s['docs']} docs, {s['pages']} pages, {s['pages_per_s']:.1f} pages/s, "
+              f"mean F1 {s['mean_f1']:.3f}, {s['exact']}/{s['docs']} identical, "
+              f"peak RSS {s['peak_rss_mb']:.0f} MiB")
+
+    report = {"env": _env(cfg), "summary": summary, "docs": rows}
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2))
+    if args.save_baseline:
+        args.save_baseline.write_text(json.dumps(report, indent=2))
+        print(f"baseline saved to {args.save_baseline}")
+    if args.baseline:
+        bad = compare(rows, json.loads(args.baseline.read_text()), cfg,
+                      args.tolerance, args.rss_tolerance, args.min_wall)
+        print(f"\n{'❌' if bad else '✅'}  {bad} regression(s) vs {args.baseline}")
+        sys.exit(1 if bad else 0)
+
+
+if __name__ == "__main__":
+    main()
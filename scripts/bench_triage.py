@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+bench_triage.py  – pages pruned by page triage and end‑to‑end speed‑up
+
+Runs every PDF twice through one OutlinePipeline (triage off / on) and
+reports pruned pages, wall time and whether the outline changed.
+
+Usage:
+    python scripts/bench_triage.py sample_dataset/pdfs
+"""
+
+from pathlib import Path
+import argparse, json, time
+
+from pdf_outline.pipeline import OutlinePipeline
+
+
+def _timed(pipe, pdf, repeat):
+    best, res = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        res = pipe.outline(pdf)
+        best = min(best, time.perf_counter() - t0)
+    return res, best
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    p.add_argument("pdf_dir", type=Path)
+    p.add_argument("--model", type=Path, default=Path("models/donut_base_int8/int8"))
+    p.add_argument("--head", type=Path, default=Path("models/donut_head.pkl"))
+    p.add_argument("--dpi", type=int, default=120)
+    p.add_argument("--repeat", type=int, default=2, help="best of N runs")
+    p.add_argument("--json", type=Path, help="also write the report here")
+    args = p.parse_args()
+
+    pipe = OutlinePipeline(args.model, args.head, dpi=args.dpi)
+    rows = []
+    print(f"{'pdf':<42} {'pages':>5} {'pruned':>6} {'full s':>7} {'triage s':>8} "
+          f"{'speedup':>7}  same")
+    for pdf in sorted(args.pdf_dir.glob("*.pdf")):
+        pipe.triage = False
+        (full, _), t_full = _timed(pipe, pdf, args.repeat)
+        pipe.triage = True
+        (tri, stats), t_tri = _timed(pipe, pdf, args.repeat)
+        row = {"pdf": pdf.name, "pages": stats["pages"],
+               "pruned": stats.get("pages_pruned", 0),
+               "full_s": t_full, "triage_s": t_tri, "same_outline": full == tri}
+        rows.append(row)
+        print(f"{pdf.name[:42]:<42} {row['pages']:>5} {row['pruned']:>6} {t_full:>7.2f} "
+              f"{t_tri:>8.2f} {t_full / t_tri:>6.2f}x  {'yes' if row['same_outline'] else 'NO'}")
+
+    pages  = sum(r["pages"] for r in rows)
+    pruned = sum(r["pruned"] for r in rows)
+    t_full = sum(r["full_s"] for r in rows)
+    t_tri  = sum(r["triage_s"] for r in rows)
+    print(f"\nTotal: {pruned}/{pages} pages pruned ({pruned / max(pages, 1):.0%}), "
+          f"{t_full:.2f}s → {t_tri:.2f}s ({t_full / max(t_tri, 1e-9):.2f}x), "
+          f"{sum(not r['same_outline'] for r in rows)} outline(s) changed")
+    if args.json:
+        args.json.write_text(json.dumps(rows, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+bench_variants.py  – speed / memory / accuracy of the encoder variants
+
+For every variant in --model (`encoder_variants`: default, fp32,
+int8_dynamic, int8_static, …), each in a fresh process:
+
+*  encoder pages/s and batch latency on a fixed batch, peak RSS, file size
+*  CLS drift against the --ref variant on real pages of sample_dataset:
+   cosine similarity and the largest change of the reference head's
+   heading probability – small values mean the variant could share its head
+*  mean heading F1 / title hits on `sample_dataset/pdfs` against
+   `sample_dataset/outputs`, with the variant's own head
+
+Variants need their own head (`<head>_<variant>.head`, see
+`scripts/train_head.py --variant`) for the F1 columns; --train-missing fits
+them on --train-pdfs first – when that is sample_dataset itself the F1
+column is optimistic (train == test).  Run it on each CPU type: the fastest
+variant whose F1 holds up is the one to deploy there (`--variant`).
+
+Usage:
+    python scripts/bench_variants.py
+    python scripts/bench_variants.py --variants fp32 int8_dynamic int8_static --ref fp32
+    python scripts/bench_variants.py --train-missing --json variants.json
+"""
+
+from pathlib import Path
+import argparse, json, multiprocessing as mp, time
+
+import numpy as np
+
+from pdf_outline.classify import head_path_for, load_head, predict, resolve_head
+from pdf_outline.document import PdfDocument
+from pdf_outline.donut_infer import QUANT_INFO, DonutEncoder, encoder_variants
+from pdf_outline.metrics import peak_rss_mb
+from pdf_outline.pipeline import OutlinePipeline
+from pdf_outline.render import iter_pages
+from pdf_outline.session import cpu_isa
+
+from bench_suite import SAMPLE, score
+
+
+def _drift_pages(n: int) -> list:
+    """(pdf, page) of the first `n` pages of sample_dataset, in file order."""
+    out = []
+    for pdf in sorted((SAMPLE / "pdfs").glob("*.pdf")):
+        with PdfDocument(pdf) as doc:
+            out += [(pdf, p) for p in range(len(doc))]
+    return out[:n]
+
+
+def _measure(args) -> dict:
+    cfg, variant = args
+    pipe = None
+    if resolve_head(head_path_for(cfg["head"], variant=variant)).exists():
+        pipe = OutlinePipeline(cfg["model"], cfg["head"], dpi=cfg["dpi"],
+                               batch_size=cfg["batch_size"], variant=variant)
+    enc = pipe.encoder if pipe else DonutEncoder(cfg["model"], variant=variant)
+    x = np.random.default_rng(0).random((cfg["batch_size"], 3, *enc.canvas), dtype=np.float32)
+    enc._run(x)                                   # warm‑up
+    t0 = time.perf_counter()
+    for _ in range(cfg["batches"]):
+        enc._run(x)
+    sec = time.perf_counter() - t0
+
+    cls = []
+    for pdf, pno in cfg["drift_pages"]:
+        with PdfDocument(pdf) as doc:
+            cls.append(enc.encode_pages(iter_pages(doc, dpi=cfg["dpi"], pages=[pno]),
+                                        batch_size=1))
+    row = {"variant": variant, "file": enc.model_path.name,
+           "mb": round(enc.model_path.stat().st_size / (1 << 20), 1),
+           "quantization": json.loads(
+               enc.session.get_modelmeta().custom_metadata_map.get(QUANT_INFO, "null")),
+           "encoder_pages_per_s": round(cfg["batches"] * cfg["batch_size"] / sec, 2),
+           "batch_ms": round(sec / cfg["batches"] * 1e3, 1),
+           "cls": np.concatenate(cls).tolist() if cls else []}
+    del x
+
+    if pipe is not None:
+        acc = [score(pipe.outline(pdf)[0],
+                     json.loads((SAMPLE / "outputs" / f"{pdf.stem}.json").read_text()))
+               for pdf in sorted((SAMPLE / "pdfs").glob("*.pdf"))]
+        row.update(head=str(pipe.head_path),
+                   mean_f1=round(float(np.mean([a["f1"] for a in acc])), 4),
+                   titles=sum(a["title"] for a in acc), docs=len(acc))
+    row["peak_rss_mb"] = round(peak_rss_mb(), 1)
+    return row
+
+
+def _train(cfg: dict, variant: str, pdfs: Path) -> None:
+    from train_head import train
+    out = train(sorted(pdfs.glob("*.pdf")), cfg["model"], cfg["head"],
+                dpi=cfg["dpi"], batch_size=cfg["batch_size"], variant=variant)
+    print(f"trained {out}")
+
+
+def _drift(rows: list, ref: dict, head: Path) -> None:
+    """cos / Δp of every row's CLS vectors against `ref`'s (in place)."""
+    a = np.asarray(ref["cls"], dtype=np.float64)
+    ref_head = head_path_for(head, variant=ref["variant"])
+    w = load_head(ref_head) if resolve_head(ref_head).exists() and len(a) else None
+    for r in rows:
+        b = np.asarray(r.pop("cls"), dtype=np.float64)
+        if not len(a) or a.shape != b.shape:
+            continue
+        cos = (a * b).sum(1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1) + 1e-12)
+        r["min_cos"] = round(float(cos.min()), 5)
+        if w is not None:
+            dp = np.abs(predict(b.astype(np.float32), w) - predict(a.astype(np.float32), w))
+            r["max_dp"] = round(float(dp.max()), 4)
+    ref.pop("cls", None)
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    p.add_argument("--model", type=Path, default=Path("models/donut_base_int8/int8"))
+    p.add_argument("--head", type=Path, default=Path("models/donut_head.pkl"))
+    p.add_argument("--variants", nargs="+", metavar="NAME",
+                   help="default: every encoder_model*.onnx in --model")
+    p.add_argument("--ref", default=None, metavar="NAME",
+                   help="drift reference (default: fp32 if present, else the first)")
+    p.add_argument("--dpi", type=int, default=120)
+    p.add_argument("--batch-size", type=int, default=8)
+    p.add_argument("--batches", type=int, default=3, help="timed encoder batches")
+    p.add_argument("--drift-pages", type=int, default=8, help="sample pages compared")
+    p.add_argument("--train-missing", action="store_true",
+                   help="fit heads for variants that have none")
+    p.add_argument("--train-pdfs", type=Path, default=SAMPLE / "pdfs")
+    p.add_argument("--json", type=Path, help="write the rows here")
+    args = p.parse_args()
+
+    found = encoder_variants(args.model)
+    variants = args.variants or list(found)
+    missing = [v for v in variants if v not in found]
+    if missing:
+        raise SystemExit(f"❌  no {', '.join(missing)} in {args.model} "
+                         f"(available: {', '.join(found) or 'none'})")
+    ref = args.ref or ("fp32" if "fp32" in variants else variants[0])
+    if ref not in variants:
+        variants.insert(0, ref)
+
+    cfg = {"model": args.model, "head": args.head, "dpi": args.dpi,
+           "batch_size": args.batch_size, "batches": args.batches,
+           "drift_pages": _drift_pages(args.drift_pages)}
+    ctx = mp.get_context("spawn")
+    rows = []
+    for variant in variants:
+        head = head_path_for(args.head, variant=variant)
+        if not resolve_head(head).exists():
+            if args.train_missing:
+                _train(cfg, variant, args.train_pdfs)
+            else:
+                print(f"{variant}: no {head}, F1 skipped (--train-missing)")
+        with ctx.Pool(1) as pool:
+            rows.append(pool.apply(_measure, ((cfg, variant),)))
+    base = next(r for r in rows if r["variant"] == ref)
+    _drift(rows, base, args.head)
+
+    print(f"\nCPU {cpu_isa()}, reference {ref}")
+    print(f"{'variant':<14} {'MB':>6} {'enc pg/s':>9} {'speed‑up':>9} {'batch ms':>9} "
+          f"{'min cos':>8} {'max Δp':>7} {'mean F1':>8} {'titles':>7} {'RSS MiB':>8}")
+    for r in rows:
+        f1 = f"{r['mean_f1']:>8.3f} {r['titles']:>3}/{r['docs']:<3}" if "mean_f1" in r \
+             else f"{'–':>8} {'–':>7}"
+        print(f"{r['variant']:<14} {r['mb']:>6.0f} {r['encoder_pages_per_s']:>9.2f} "
+              f"{r['encoder_pages_per_s'] / base['encoder_pages_per_s']:>8.2f}× "
+              f"{r['batch_ms']:>9.0f} {r.get('min_cos', float('nan')):>8.4f} "
+              f"{r.get('max_dp', float('nan')):>7.3f} {f1} {r['peak_rss_mb']:>8.0f}")
+    if args.train_missing and args.train_pdfs.resolve() == (SAMPLE / "pdfs").resolve():
+        print("(heads trained on sample_dataset – F1 is not a held‑out estimate)")
+    if args.json:
+        args.json.write_text(json.dumps({"isa": cpu_isa(), "ref": ref, "rows": rows}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
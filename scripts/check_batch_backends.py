@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+check_batch_backends.py  – smoke check of BatchDriver with every render backend
+
+Runs the crash‑isolated driver (`pdf_outline.batch`) over --pdfs once per
+render backend, with several workers.  Every document must succeed and the
+outlines must be byte‑identical across backends.  Covers workers that start
+their own render pool (``render_backend="process"``), which daemonic worker
+processes cannot do.
+
+Usage:
+    python scripts/check_batch_backends.py
+    python scripts/check_batch_backends.py --model models/donut_base_int8/int8 --workers 2
+"""
+
+from pathlib import Path
+import argparse, sys, tempfile
+
+from pdf_outline.batch import BatchDriver
+from pdf_outline.pipeline import dir_jobs
+from pdf_outline.render import BACKENDS
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def run_backend(args, backend: str, out_dir: Path) -> int:
+    """Outline --pdfs into `out_dir` with `backend`; returns the number of failures."""
+    driver = BatchDriver(dict(model_dir=args.model, head_path=args.head, dpi=args.dpi,
+                              render_backend=backend, render_workers=2),
+                         workers=args.workers, resume=False)
+    bad = 0
+    for r in driver.run(dir_jobs(args.pdfs, out_dir)):
+        if not r.ok:
+            bad += 1
+            print(f"❌  {backend}: {r.pdf.name}: {r.error}")
+    return bad
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    p.add_argument("--pdfs", type=Path, default=ROOT / "sample_dataset/pdfs")
+    p.add_argument("--model", type=Path, default=Path("models/donut_base_int8/int8"))
+    p.add_argument("--head", type=Path, default=Path("models/donut_head.pkl"))
+    p.add_argument("--dpi", type=int, default=120)
+    p.add_argument("--workers", type=int, default=2)
+    args = p.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        outs = {b: Path(tmp) / b for b in BACKENDS}
+        bad = sum(run_backend(args, b, outs[b]) for b in BACKENDS)
+        ref, *others = BACKENDS
+        for fp in sorted(outs[ref].glob("*.json")):
+            for b in others:
+                other = outs[b] / fp.name
+                if not other.exists() or other.read_bytes() != fp.read_bytes():
+                    bad += 1
+                    print(f"❌  {fp.name}: {b} outline differs from {ref}")
+    print(f"✅  BatchDriver ok with {', '.join(BACKENDS)}" if not bad else f"❌  {bad} failures")
+    sys.exit(1 if bad else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+check_cluster_golden.py  – golden check for cluster.assign_levels
+
+1. Golden files: with every page above threshold (prob = 1) the outline of
+   each PDF in sample_dataset/pdfs must be byte‑identical to the JSON in
+   sample_dataset/outputs – for both the dict and the LineTable input.
+2. Differential: random per‑page / per‑line probabilities and thresholds
+   must give exactly the same line dicts (level, text, is_head, prob) as the
+   original multi‑pass implementation kept below as the reference.
+
+Usage:
+    python scripts/check_cluster_golden.py [--rounds 50]
+"""
+
+from pathlib import Path
+import argparse, copy, json, sys
+
+import re
+import numpy as np
+from itertools import groupby
+from collections import Counter
+
+from pdf_outline.cluster import assign_levels
+from pdf_outline.extract_lines import LineTable, extract_lines
+from pdf_outline.pipeline import build_outline
+
+ROOT = Path(__file__).resolve().parents[1] / "sample_dataset"
+
+
+# ======================= reference: original cluster.py ====================
+# ---------- regex helpers (CORRECTED for general use) ---------------------
+_num_re   = re.compile(r"^\s*\d+(\.\d+)*\s")       # numbering
+_allcaps  = re.compile(r"^[A-Z0-9\s\-]+$")          # logo taglines
+_dots_re  = re.compile(r"^[.\u2022·•_—–-]{3,}$")   # ..... or bullet/separator rows
+_num_only = re.compile(r"^[0-9./-]+$")             # pure numeric cell
+
+
+# CORRECTED: These patterns no longer require a trailing dot after the last digit.
+pat_h1 = re.compile(r"^\d+\.\s")
+pat_h2 = re.compile(r"^\d+\.\d+\s")
+pat_h3 = re.compile(r"^\d+\.\d+\.\d+\s")
+
+
+# ---------- table / form detector (STRICTER HEURISTIC) --------------------
+def _looks_like_table(txt: str) -> bool:
+    """
+    Pragmatic filter for table / form fragments.
+    STRICTER VERSION: More aggressive filtering to prioritize removing
+    table/form content, at the risk of removing some valid short headings.
+    """
+    t = txt.strip()
+    if not t: return True
+    if _dots_re.fullmatch(t): return True
+    if _num_only.fullmatch(t): return True
+    if len(t) <= 2: return True
+    words = t.split()
+    if len(words) <= 2 and all(len(w) <= 4 for w in words): return True
+    return False
+
+
+# ---------- utility --------------------------------------------------------
+def _merge_same_font_block(lines):
+    """Merge consecutive heads with identical font & x‑position."""
+    merged = []
+    for _, group in groupby(
+        lines,
+        key=lambda l: (l["font_size"], round(l["bbox"][0] / 2) * 2),
+    ):
+        block = list(group)
+        if len(block) == 1:
+            merged.append(block[0])
+        else:
+            txt = " ".join(b["text"].strip() for b in block)
+            head = block[0].copy()
+            head["text"] = txt
+            merged.append(head)
+    return merged
+
+
+# ---------- main (GENERAL-PURPOSE ROBUST LOGIC) ----------------------------
+def legacy_assign_levels(lines, probs, p_thresh=0.90):
+    # 1. basic mark + strict table/filter pass
+    for L, p in zip(lines, probs):
+        L["prob"]    = float(p)
+        L["level"]   = None
+        if _looks_like_table(L["text"]):
+            L["is_head"] = False
+        else:
+            L["is_head"] = p >= p_thresh
+
+    heads = [L for L in lines if L["is_head"]]
+    if not heads:
+        return lines
+
+    # 2. Demote short running headers repeated on ≥3 pages
+    REPEAT_THRESHOLD = 3
+    counts = Counter(h["text"].strip() for h in heads)
+    for h in heads:
+        key = h["text"].strip()
+        if counts[key] >= REPEAT_THRESHOLD and len(key.split()) <= 5:
+            h["level"]   = None
+            h["is_head"] = False
+
+    heads = [h for h in heads if h["is_head"]]
+
+    # 3. Numbering override: High-confidence patterns first
+    for h in heads:
+        if h["level"] is not None: continue
+        t = h["text"].strip() + " " # Add space to handle no-text headings like "4.1"
+        # The order is important: check for most specific (H3) first.
+        if pat_h3.match(t):
+            h["level"] = "H3"
+        elif pat_h2.match(t):
+            h["level"] = "H2"
+        elif pat_h1.match(t):
+            h["level"] = "H1"
+
+    # 4. Title page processing
+    title_page = min((h["page"] for h in heads), default=0)
+    page_heads = [h for h in heads if h["page"] == title_page and h["level"] is None]
+    if page_heads:
+        page_heads = _merge_same_font_block(page_heads)
+        
+        top_size = max((h["font_size"] for h in page_heads), default=0)
+        title_cands = [h for h in page_heads if h["font_size"] == top_size]
+
+        title_cands = [
+            h for h in title_cands
+            if not (_allcaps.match(h["text"]) and len(h["text"].split()) > 4)
+        ]
+
+        if title_cands:
+            title_text = " ".join(h["text"].strip() for h in title_cands)
+            for h in title_cands:
+                h["level"] = "Title"
+                h["text"]  = title_text
+
+    # 5. Global font ranking as a fallback for remaining pages
+    remain = [h for h in heads if h["level"] is None]
+    if remain:
+        uniq   = sorted({h["font_size"] for h in remain}, reverse=True)[:3]
+        size_map = {s: lvl for s, lvl in zip(uniq, ["H1", "H2", "H3"])}
+
+        for h in remain:
+            if h["level"] is None:
+                h["level"] = size_map.get(h["font_size"], None)
+
+    return lines
+
+
+# ===========================================================================
+
+
+def _dump(outline) -> str:
+    return json.dumps(outline, indent=2, ensure_ascii=False)
+
+
+def check_golden() -> int:
+    bad = 0
+    for pdf in sorted((ROOT / "pdfs").glob("*.pdf")):
+        want  = (ROOT / "outputs" / f"{pdf.stem}.json").read_text()
+        lines = extract_lines(pdf)
+        ones  = np.ones(len(lines))
+        got_dict  = _dump(build_outline(assign_levels(copy.deepcopy(lines), ones, 0.60)))
+        got_table = _dump(build_outline(assign_levels(LineTable.from_records(lines), ones, 0.60)))
+        ok = got_dict == want and got_table == want
+        bad += not ok
+        print(f"{'ok ' if ok else 'BAD'}  golden  {pdf.name}")
+    return bad
+
+
+def check_differential(rounds: int, seed: int) -> int:
+    rng = np.random.default_rng(seed)
+    bad = 0
+    for pdf in sorted((ROOT / "pdfs").glob("*.pdf")):
+        lines  = extract_lines(pdf)
+        npages = max((L["page"] for L in lines), default=-1) + 1
+        page   = np.array([L["page"] for L in lines], dtype=int)
+        n_bad  = 0
+        for r in range(rounds):
+            if r % 2:                             # per‑page probs, like the pipeline
+                probs = rng.random(npages)[page]
+            else:                                 # per‑line probs, like --fast
+                probs = rng.random(len(lines))
+            thresh = float(rng.choice([0.0, 0.3, 0.6, 0.9]))
+
+            want = legacy_assign_levels(copy.deepcopy(lines), probs, thresh)
+            got  = assign_levels(copy.deepcopy(lines), probs, thresh)
+            tab  = assign_levels(LineTable.from_records(lines), probs, thresh)
+            if got != want or _dump(build_outline(tab)) != _dump(build_outline(want)):
+                n_bad += 1
+        bad += n_bad
+        print(f"{'ok ' if not n_bad else 'BAD'}  random  {pdf.name}  "
+              f"({rounds - n_bad}/{rounds} identical)")
+    return bad
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    p.add_argument("--rounds", type=int, default=50)
+    p.add_argument("--seed", type=int, default=0)
+    args = p.parse_args()
+
+    bad = check_golden() + check_differential(args.rounds, args.seed)
+    print("✅  assign_levels matches golden output" if not bad else f"❌  {bad} mismatches")
+    sys.exit(1 if bad else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+convert_head.py  – pickled head weights → versioned, memory‑mapped head file
+
+The `.head` file records the encoder it belongs to (model hash), the
+embedding size and the canvas, so `load_head` can refuse a head trained for
+another encoder.  Stamp it with the encoder the pickle was trained on:
+
+Usage:
+    python scripts/convert_head.py models/donut_head.pkl --model models/donut_base_int8/int8
+    python scripts/convert_head.py head_640x480.pkl --model … --canvas 640x480
+"""
+
+from pathlib import Path
+import argparse, pickle
+
+import numpy as np
+
+from pdf_outline.classify import Head, load_head, parse_canvas, predict, save_head
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    p.add_argument("src", type=Path, help="pickled `train_head` weights")
+    p.add_argument("-o", "--out", type=Path, help="default: <src>.head")
+    p.add_argument("--model", type=Path, help="encoder folder to stamp (omit: unstamped)")
+    p.add_argument("--canvas", type=parse_canvas, metavar="HxW",
+                   help="canvas the head was trained on (default 1280x960)")
+    args = p.parse_args()
+
+    with open(args.src, "rb") as f:
+        weights = np.asarray(pickle.load(f))
+    model_hash = ""
+    if args.model:
+        from pdf_outline.donut_infer import DonutEncoder
+        model_hash = DonutEncoder(args.model, canvas=args.canvas).model_hash
+    head = Head.from_weights(weights, model_hash, args.canvas)
+
+    out = args.out or args.src.with_suffix(".head")
+    save_head(head, out)
+    back = load_head(out, model_hash=model_hash or None)
+    x = np.random.default_rng(0).standard_normal((64, head.dim), dtype=np.float32)
+    ref = 1 / (1 + np.exp(-(x @ weights[:-1] + weights[-1])))    # pickled float64 path
+    err = float(np.abs(predict(x, back).reshape(ref.shape) - ref).max())
+    print(f"✓ {out}  ({head.dim}×{head.n_classes}, encoder {model_hash[:12] or 'unstamped'}, "
+          f"canvas %dx%d, max |Δp| {err:.1e})" % head.canvas)
+
+
+if __name__ == "__main__":
+    main()
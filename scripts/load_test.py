@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+load_test.py  – concurrent submissions against a running outline service
+
+Fires `-n` POST /outline requests, `-c` at a time, cycling through the PDFs
+given, and reports client‑side latency percentiles, throughput, the status
+mix (503 = backpressure, 504 = timeout) and the service's own /metrics.
+
+Usage:
+    python -m pdf_outline.service --port 8080 &
+    python scripts/load_test.py sample_dataset/pdfs -c 16 -n 200
+    python scripts/load_test.py sample_dataset/pdfs --unix /tmp/outline.sock
+"""
+
+from pathlib import Path
+from collections import Counter
+import argparse, asyncio, json, time
+
+import numpy as np
+
+
+async def _request(args, method, path, body=b""):
+    """One HTTP/1.1 request → (status, body bytes)."""
+    if args.unix:
+        reader, writer = await asyncio.open_unix_connection(str(args.unix))
+    else:
+        reader, writer = await asyncio.open_connection(args.host, args.port)
+    head = (f"{method} {path} HTTP/1.1\r\nHost: {args.host}\r\n"
+            f"Content-Type: application/pdf\r\nContent-Length: {len(body)}\r\n"
+            f"Connection: close\r\n\r\n")
+    writer.write(head.encode("latin-1") + body)
+    await writer.drain()
+    raw = await reader.read()
+    writer.close()
+    status_line, _, rest = raw.partition(b"\r\n")
+    return int(status_line.split()[1]), rest.partition(b"\r\n\r\n")[2]
+
+
+async def _run(args, pdfs):
+    sem = asyncio.Semaphore(args.concurrency)
+    lat, status = [], Counter()
+
+    async def one(i):
+        async with sem:
+            t0 = time.perf_counter()
+            try:
+                code, _ = await _request(args, "POST", "/outline", pdfs[i % len(pdfs)])
+            except OSError:
+                code = 0                                    # connection refused/reset
+            status[code] += 1
+            if code == 200:
+                lat.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(args.requests)))
+    wall = time.perf_counter() - t0
+    _, metrics = await _request(args, "GET", "/metrics")
+    return lat, status, wall, json.loads(metrics)
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    p.add_argument("pdf", type=Path, nargs="+", help="PDF files or folders")
+    p.add_argument("-c", "--concurrency", type=int, default=8)
+    p.add_argument("-n", "--requests", type=int, default=100)
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8080)
+    p.add_argument("--unix", type=Path, help="service Unix socket")
+    p.add_argument("--json", type=Path, help="also write the report here")
+    args = p.parse_args()
+
+    files = [f for p_ in args.pdf for f in (sorted(p_.glob("*.pdf")) if p_.is_dir() else [p_])]
+    pdfs = [f.read_bytes() for f in files]
+    lat, status, wall, metrics = asyncio.run(_run(args, pdfs))
+
+    ok = len(lat)
+    p50, p90, p99 = np.percentile(lat, (50, 90, 99)) * 1e3 if lat else (0.0, 0.0, 0.0)
+    print(f"{args.requests} requests, concurrency {args.concurrency}, "
+          f"{len(files)} distinct PDFs, {wall:.1f}s wall")
+    print("status   " + "  ".join(f"{k}×{v}" for k, v in sorted(status.items())))
+    print(f"latency  p50 {p50:.0f} ms  p90 {p90:.0f} ms  p99 {p99:.0f} ms  (200s only)")
+    print(f"thruput  {ok / wall:.2f} PDFs/s")
+    print(f"server   queue peak {metrics['queue_peak']}/{metrics['queue_max']}  "
+          f"latency p50 {metrics['latency_ms']['p50']} ms  p99 {metrics['latency_ms']['p99']} ms  "
+          f"queue wait p99 {metrics['queue_wait_ms']['p99']} ms")
+    if "encoder" in metrics:
+        e = metrics["encoder"]
+        print(f"encoder  {e['pages']} pages in {e['batches']} batches "
+              f"(mean batch {e['mean_batch']:.1f})")
+
+    if args.json:
+        args.json.write_text(json.dumps(
+            {"requests": args.requests, "concurrency": args.concurrency,
+             "wall_s": wall, "status": dict(status), "throughput": ok / wall,
+             "latency_ms": {"p50": p50, "p90": p90, "p99": p99},
+             "server": metrics}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,9 +4,12 @@ outline_demo.py  – low‑RAM streaming outline extractor
 """
 
 from pathlib import Path
-import sys, json, gc, numpy as np
+import sys, json, numpy as np
 
-from pdf_outline import render, extract_lines, donut_infer, classify, cluster
+from pdf_outline import render, donut_infer, classify, cluster
+from pdf_outline.document import PdfDocument
+from pdf_outline.extract_lines import extract_lines
+from pdf_outline.pipeline import build_outline
 
 
 def main(pdf_path):
@@ -14,40 +17,22 @@ def main(pdf_path):
     if not pdf_path.exists():
         sys.exit(f"File not found: {pdf_path}")
 
-    # render all pages first (PyMuPDF is light on RAM)
-    pages = render.render_pdf(pdf_path, dpi=150, max_workers=2)
-    lines = extract_lines.extract_lines(pdf_path)
-
     enc      = donut_infer.DonutEncoder("models/donut_base_int8/int8")
-    weights  = classify.load_head(Path("models/donut_head.pkl"))
-    page_probs = []
-
-    # --- stream page by page to keep memory low ---------------------------
-    for pno, img in enumerate(pages):
-        cls_vec = enc.encode([img])[0][0]           # (1024,)
-        prob    = classify.predict(cls_vec[None, :], weights)[0]
-        page_probs.append(prob)
-        # free immediately
-        del img, cls_vec; gc.collect()
-
-    # expand probs per line
-    probs = []
-    for p in range(len(pages)):
-        n = sum(1 for L in lines if L["page"] == p)
-        probs.extend([page_probs[p]] * n)
-    probs = np.array(probs)
+    head     = classify.load_head(Path("models/donut_head.pkl"), model_hash=enc.model_hash)
 
-    lines = cluster.assign_levels(lines, probs, p_thresh=0.60)
+    with PdfDocument(pdf_path) as doc:
+        lines = extract_lines(doc, columnar=True)
+
+        # --- stream pages through one batch buffer to keep memory low -----
+        pages    = render.iter_pages(doc, dpi=150, max_workers=2, prefetch=2)
+        cls_vecs = np.concatenate(list(enc.encode_stream(pages, batch_size=1)))
+        page_probs = classify.predict(cls_vecs, head)               # (N,)
 
-    title_line = next((L for L in lines if L["level"] == "Title"), None)
-    outline = {
-        "title": title_line["text"] if title_line else "",
-        "outline": [
-            {"level": L["level"], "text": L["text"], "page": L["page"] + 1}
-            for L in lines if L["level"] in ("H1", "H2", "H3")
-        ],
-    }
-    print(json.dumps(outline, indent=2, ensure_ascii=False))
+    # expand probs per line – one gather
+    probs = page_probs[lines.page]
+
+    lines = cluster.assign_levels(lines, probs, p_thresh=0.60)
+    print(json.dumps(build_outline(lines), indent=2, ensure_ascii=False))
 
 
 if __name__ == "__main__":
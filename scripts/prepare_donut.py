@@ -3,10 +3,17 @@ from huggingface_hub import snapshot_download
 from optimum.exporters.onnx import main_export
 from optimum.onnxruntime import ORTQuantizer, AutoQuantizationConfig
 
+from pdf_outline.session import cpu_isa
+
 MODEL = "naver-clova-ix/donut-base"
 OUT   = Path("models/donut_base_int8")
 OUT.mkdir(parents=True, exist_ok=True)
 
+# cpu_isa() → optimum preset; AVX‑VNNI has the same INT8 dot product as
+# AVX512‑VNNI, anything else unknown is treated as AVX2
+OPTIMUM_PRESET = {"avx512_vnni": "avx512_vnni", "avx_vnni": "avx512_vnni",
+                  "avx512": "avx512", "avx2": "avx2", "arm64": "arm64"}
+
 # 1) Download fp32
 snapshot_download(MODEL, local_dir=OUT/"fp32", local_dir_use_symlinks=False)
 
@@ -21,7 +28,11 @@ main_export(
 
 # 3) INT8 quantisation per file
 save_dir = OUT/"int8"; save_dir.mkdir(parents=True, exist_ok=True)
-qcfg = AutoQuantizationConfig.avx512_vnni(is_static=False)
+isa    = cpu_isa()
+preset = OPTIMUM_PRESET.get(isa, "avx2")
+extra  = {"reduce_range": True} if preset in ("avx2", "avx512") else {}   # no VNNI: 7‑bit weights
+qcfg = getattr(AutoQuantizationConfig, preset)(is_static=False, **extra)
+print(f"CPU {isa}: {preset} quantisation preset")
 
 for fp in (OUT/"onnx").glob("*.onnx"):
     print("Quantising", fp.name)
@@ -31,3 +42,4 @@ for fp in (OUT/"onnx").glob("*.onnx"):
     (save_dir/"model_quantized.onnx").rename(save_dir/fp.name)
 
 print("✅  INT8 Donut saved to", save_dir)
+print("   static INT8 / other variants: scripts/quantize_int8.py --src", OUT/"onnx")
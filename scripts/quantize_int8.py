@@ -1,35 +1,232 @@
 #!/usr/bin/env python3
 """
-Quantise Donut ONNX models to dynamic INT8 (CPU) – no internet required.
-Run once; produces ~70 MB encoder and ~15 MB decoder.
+quantize_int8.py  – INT8 encoder variants for this CPU, no internet required
+
+From the fp32 export (`encoder_model.onnx` in --src) writes to --dst:
+
+*  ``int8_dynamic`` – INT8 weights, activation ranges computed per batch at
+   run time (MatMul / Add, no calibration – what this script used to write)
+*  ``int8_static``  – INT8 weights and activations (QDQ), activation ranges
+   calibrated once on page tensors from sample_dataset, so no range pass
+   runs per batch
+*  ``fp32``         – the source itself (hard link), as a baseline
+
+as `encoder_model_<variant>.onnx`, loaded with `DonutEncoder(variant=…)` /
+`--variant`.  The INT8 settings follow the CPU (`session.cpu_isa`): without
+VNNI, x86 sums u8×s8 products in 16 bit, which can saturate, so activations
+are u8 and weights use 7 bits (`reduce_range`); VNNI and ARM use s8×s8 at
+full range.  The settings are stored in the model metadata (`QUANT_INFO`).
+
+Calibration pages are rasterised at the encoder canvas once and kept as
+uint8 .npy files in --calib-cache; later runs (e.g. another --calibrate
+method) reuse them.  Each variant needs its own head
+(`scripts/train_head.py --variant int8_static`); `scripts/bench_variants.py`
+compares speed, memory and accuracy.
+
+Usage:
+    python scripts/quantize_int8.py                               # dynamic + static
+    python scripts/quantize_int8.py --mode static --calibrate percentile
+    python scripts/quantize_int8.py --mode fp32 dynamic static --decoder
 """
 
 from pathlib import Path
-from onnxruntime.quantization import quantize_dynamic, QuantType
+import argparse, importlib.util, json, os, shutil, tempfile, time
+from typing import Dict, Iterator, List
+
+import numpy as np
+import onnx
+from onnxruntime.quantization import (CalibrationDataReader, CalibrationMethod, QuantFormat,
+                                      QuantType, quantize_dynamic, quantize_static)
+from onnxruntime.quantization.shape_inference import quant_pre_process
+
+from pdf_outline.cache import file_sha256
+from pdf_outline.classify import DEFAULT_CANVAS, parse_canvas
+from pdf_outline.document import PdfDocument
+from pdf_outline.donut_infer import ENCODER_MODEL, QUANT_INFO, fit_page, variant_file
+from pdf_outline.render import iter_pages
+from pdf_outline.session import ISAS, cpu_isa
+
+ROOT    = Path(__file__).resolve().parents[1]
+MODES   = ("fp32", "dynamic", "static")
+METHODS = {"minmax":     CalibrationMethod.MinMax,
+           "entropy":    CalibrationMethod.Entropy,
+           "percentile": CalibrationMethod.Percentile}
+
+# ISA → (activation type, weight type, reduce_range) of the INT8 kernels
+INT8_SETTINGS = {
+    "avx512_vnni": (QuantType.QInt8,  QuantType.QInt8, False),
+    "avx_vnni":    (QuantType.QInt8,  QuantType.QInt8, False),
+    "avx512":      (QuantType.QUInt8, QuantType.QInt8, True),
+    "avx2":        (QuantType.QUInt8, QuantType.QInt8, True),
+    "arm64":       (QuantType.QInt8,  QuantType.QInt8, False),
+    "x86":         (QuantType.QUInt8, QuantType.QInt8, True),
+}
+
+
+# ---------- calibration data --------------------------------------------------
+def calibration_pages(pdfs: List[Path], cache: Path, canvas=DEFAULT_CANVAS,
+                      limit: int = 0) -> List[Path]:
+    """
+    Canvas‑fitted uint8 pages of `pdfs` as .npy files in `cache` (rendered on
+    the first call, keyed by PDF content, page and canvas); `limit` > 0 takes
+    that many, spread evenly over all pages.
+    """
+    cache.mkdir(parents=True, exist_ok=True)
+    tag = "%dx%d" % tuple(canvas)
+    files = []
+    for pdf in pdfs:
+        sha = file_sha256(pdf)[:16]
+        with PdfDocument(pdf) as doc:
+            paths = [cache / f"{sha}_p{p}_{tag}.npy" for p in range(len(doc))]
+            todo = [p for p, fp in enumerate(paths) if not fp.exists()]
+            for pno, x in zip(todo, iter_pages(doc, fit=tuple(canvas), pages=todo,
+                                               max_workers=1)):
+                np.save(paths[pno], np.ascontiguousarray(x))
+        files += paths
+    if limit and limit < len(files):
+        files = [files[i] for i in np.linspace(0, len(files) - 1, limit).round().astype(int)]
+    return files
+
+
+class PageReader(CalibrationDataReader):
+    """Feeds cached pages to the calibrator as (batch, 3, H, W) encoder inputs."""
+    def __init__(self, input_name: str, files: List[Path], canvas=DEFAULT_CANVAS,
+                 batch_size: int = 1):
+        self.input_name = input_name
+        self.files      = files
+        self.canvas     = tuple(canvas)
+        self.batch_size = batch_size
+        self._it: Iterator[Dict[str, np.ndarray]] | None = None
+
+    def _batches(self) -> Iterator[Dict[str, np.ndarray]]:
+        for i in range(0, len(self.files), self.batch_size):
+            run = self.files[i:i + self.batch_size]
+            x = np.empty((len(run), 3, *self.canvas), dtype=np.float32)
+            for slot, fp in zip(x, run):
+                fit_page(np.load(fp), slot)
+            yield {self.input_name: x}
 
+    def get_next(self) -> Dict[str, np.ndarray] | None:
+        if self._it is None:
+            self._it = self._batches()
+        return next(self._it, None)
 
-SRC_DIR = Path("models/donut_base_int8/onnx")   # where your FP32 .onnx live
-DST_DIR = Path("models/donut_base_int8/int8")   # output folder
-DST_DIR.mkdir(parents=True, exist_ok=True)
+    def rewind(self) -> None:
+        self._it = None
 
-pairs = [
-    ("encoder_model.onnx",  "encoder_model_quantized.onnx"),
-    ("decoder_model.onnx",  "decoder_model_quantized.onnx"),
-]
 
-for src_name, dst_name in pairs:
-    src = SRC_DIR / src_name
-    dst = DST_DIR / dst_name
+# ---------- quantisation ---------------------------------------------------------
+def _stamp(path: Path, info: dict) -> None:
+    """Record how a variant was made in its metadata (kept by trim_cls)."""
+    model = onnx.load(str(path))
+    onnx.helper.set_model_props(model, {**{p.key: p.value for p in model.metadata_props},
+                                        QUANT_INFO: json.dumps(info)})
+    onnx.save(model, str(path))
+
+
+def link_fp32(src: Path, dst: Path) -> None:
+    dst.unlink(missing_ok=True)
+    try:
+        os.link(src, dst)
+    except OSError:                                # other file system
+        shutil.copy2(src, dst)
+
+
+def quantize_dyn(src: Path, dst: Path, isa: str, ops=("MatMul", "Add"),
+                 per_channel: bool = False) -> dict:
+    _, weight, reduce = INT8_SETTINGS[isa]
+    quantize_dynamic(model_input=str(src), model_output=str(dst),
+                     weight_type=weight, per_channel=per_channel, reduce_range=reduce,
+                     op_types_to_quantize=list(ops))
+    return {"mode": "dynamic", "isa": isa, "weight": weight.name, "reduce_range": reduce,
+            "per_channel": per_channel, "ops": list(ops)}
+
+
+def quantize_stat(src: Path, dst: Path, isa: str, reader: PageReader,
+                  method: str = "minmax", ops=("MatMul", "Conv"), per_channel: bool = True,
+                  preprocess: bool = True) -> dict:
+    act, weight, reduce = INT8_SETTINGS[isa]
+    with tempfile.TemporaryDirectory(dir=dst.parent) as tmp:
+        model = src
+        if preprocess:                             # shapes + fused graph → better ranges
+            model = Path(tmp) / "pre.onnx"
+            # symbolic shapes need sympy (comes with torch); ONNX inference still runs
+            quant_pre_process(str(src), str(model),
+                              skip_symbolic_shape=importlib.util.find_spec("sympy") is None)
+        quantize_static(model_input=str(model), model_output=str(dst),
+                        calibration_data_reader=reader, quant_format=QuantFormat.QDQ,
+                        activation_type=act, weight_type=weight, per_channel=per_channel,
+                        reduce_range=reduce, calibrate_method=METHODS[method],
+                        op_types_to_quantize=list(ops),
+                        extra_options={"CalibMaxIntermediateOutputs": 4})
+    return {"mode": "static", "isa": isa, "activation": act.name, "weight": weight.name,
+            "reduce_range": reduce, "per_channel": per_channel, "ops": list(ops),
+            "calibrate": method, "calib_pages": len(reader.files)}
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    p.add_argument("--src", type=Path, default=Path("models/donut_base_int8/onnx"),
+                   help=f"folder with the fp32 {ENCODER_MODEL}")
+    p.add_argument("--dst", type=Path, default=Path("models/donut_base_int8/int8"),
+                   help="output folder (the pipeline's --model)")
+    p.add_argument("--mode", nargs="+", choices=MODES, default=["dynamic", "static"])
+    p.add_argument("--isa", choices=ISAS, default=cpu_isa(),
+                   help="CPU to quantise for (default: this one, %(default)s)")
+    p.add_argument("--calibrate", choices=METHODS, default="minmax",
+                   help="static: activation range estimate")
+    p.add_argument("--calib-pdfs", type=Path, default=ROOT / "sample_dataset/pdfs")
+    p.add_argument("--calib-cache", type=Path, default=Path("models/calib_cache"),
+                   help="rendered calibration pages (reused across runs)")
+    p.add_argument("--calib-pages", type=int, default=0, help="0 = every page")
+    p.add_argument("--calib-batch", type=int, default=1, help="pages per calibration run")
+    p.add_argument("--canvas", type=parse_canvas, default=DEFAULT_CANVAS, metavar="HxW",
+                   help="encoder input the calibration pages are fitted to")
+    p.add_argument("--no-preprocess", action="store_true",
+                   help="static: skip shape inference + graph optimisation first")
+    p.add_argument("--decoder", action="store_true",
+                   help="also write decoder_model_quantized.onnx (dynamic)")
+    args = p.parse_args()
+
+    src = args.src / ENCODER_MODEL
     if not src.exists():
         raise SystemExit(f"❌  {src} not found – export FP32 first.")
-    print(f"➜  Quantising {src.name}  ➜  {dst.name}")
-    quantize_dynamic(
-        model_input  = str(src),
-        model_output = str(dst),
-        weight_type  = QuantType.QInt8,
-        op_types_to_quantize = ["MatMul", "Add"],   # int8 weights
-    )
-print("\n✅  All done.")
-print("Files:")
-for f in DST_DIR.glob("*quantized.onnx"):
-    print("  ", f.name, f.stat().st_size // (1024*1024), "MB")
+    args.dst.mkdir(parents=True, exist_ok=True)
+    print(f"CPU: {args.isa}  (activations {INT8_SETTINGS[args.isa][0].name}, "
+          f"reduce_range={INT8_SETTINGS[args.isa][2]})")
+
+    for mode in args.mode:
+        variant = "fp32" if mode == "fp32" else f"int8_{mode}"
+        dst = args.dst / variant_file(variant)
+        t0 = time.perf_counter()
+        print(f"➜  {src.name}  ➜  {dst.name}")
+        if mode == "fp32":
+            link_fp32(src, dst)
+            continue
+        if mode == "dynamic":
+            info = quantize_dyn(src, dst, args.isa)
+        else:
+            files = calibration_pages(sorted(args.calib_pdfs.glob("*.pdf")), args.calib_cache,
+                                      args.canvas, args.calib_pages)
+            if not files:
+                raise SystemExit(f"❌  no calibration pages in {args.calib_pdfs}")
+            name = onnx.load(str(src), load_external_data=False).graph.input[0].name
+            reader = PageReader(name, files, args.canvas, args.calib_batch)
+            info = quantize_stat(src, dst, args.isa, reader, args.calibrate,
+                                 preprocess=not args.no_preprocess)
+        _stamp(dst, info)
+        print(f"   {dst.stat().st_size >> 20} MB  ({time.perf_counter() - t0:.0f}s)")
+
+    if args.decoder:
+        dec = args.src / "decoder_model.onnx"
+        if not dec.exists():
+            raise SystemExit(f"❌  {dec} not found – export FP32 first.")
+        print(f"➜  {dec.name}  ➜  decoder_model_quantized.onnx")
+        quantize_dyn(dec, args.dst / "decoder_model_quantized.onnx", args.isa)
+
+    print(f"\n✅  Variants in {args.dst}: scripts/train_head.py --variant <name>, then "
+          f"scripts/bench_variants.py to compare")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+synth_pdfs.py  – deterministic synthetic PDFs with a known outline
+
+Each document gets a Title on page 1, a seeded mix of H1/H2/H3 headings
+(numbered "1.", "1.1", "1.1.1" or plain, depending on the style), body
+paragraphs, a running header / page‑number footer and the occasional
+form‑like row.  The ground‑truth outline is written next to the PDF as
+<name>.json in the `sample_dataset/outputs` schema.
+
+Usage:
+    python scripts/synth_pdfs.py /tmp/synth --pages 1 10 100 2000
+"""
+
+from pathlib import Path
+import argparse, json, random
+
+import fitz                      # PyMuPDF
+
+PAGE_W, PAGE_H = 595, 842        # A4 in points
+MARGIN   = 56
+STYLES   = ("numbered", "plain", "mixed")
+SIZES    = {"Title": 24, "H1": 16, "H2": 13, "H3": 11.5}
+BODY     = 10
+WORDS = ("data model system page layout result method value table report design "
+         "section process analysis control network review budget policy sample "
+         "figure support project quality service training schedule").split()
+
+
+def _words(rng: random.Random, lo: int, hi: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(lo, hi)))
+
+
+def make_pdf(path: Path, pages: int, seed: int = 0,
+             style: str | None = None) -> dict:
+    """Write a `pages`‑page PDF to `path`; return its ground‑truth outline."""
+    rng   = random.Random(f"{seed}:{pages}")
+    style = style or rng.choice(STYLES)
+    title = f"{_words(rng, 1, 2).title()} Report"
+    outline = []
+    num = [0, 0, 0]
+
+    # one TextWriter per page with shared fonts: ~4× faster than insert_text
+    regular, bold = fitz.Font("helv"), fitz.Font("hebo")
+    doc = fitz.open()
+    for pno in range(pages):
+        page = doc.new_page(width=PAGE_W, height=PAGE_H)
+        tw = fitz.TextWriter(page.rect)
+        tw.append((MARGIN, 30), "Synthetic Benchmark Corpus", font=regular, fontsize=8)
+        tw.append((PAGE_W / 2, PAGE_H - 24), str(pno + 1), font=regular, fontsize=8)
+        y = MARGIN + 20
+        if pno == 0:
+            tw.append((MARGIN, y), title, font=bold, fontsize=SIZES["Title"])
+            y += 48
+
+        while y < PAGE_H - MARGIN - 60:
+            r = rng.random()
+            if r < 0.12 or (pno == 0 and not outline):
+                depth = 0 if not num[0] or r < 0.04 else (1 if r < 0.09 else 2)
+                if depth == 2 and not num[1]:               # no H3 before an H2
+                    depth = 1
+                num[depth] += 1
+                num[depth + 1:] = [0] * (2 - depth)
+                level = ("H1", "H2", "H3")[depth]
+                name  = _words(rng, 1, 4).title()
+                numbered = style == "numbered" or (style == "mixed" and rng.random() < 0.5)
+                if numbered:
+                    prefix = ".".join(str(n) for n in num[:depth + 1])
+                    text = f"{prefix}{'.' if depth == 0 else ''} {name}"
+                else:
+                    text = name
+                y += 10
+                tw.append((MARGIN, y), text, font=bold, fontsize=SIZES[level])
+                outline.append({"level": level, "text": text, "page": pno + 1})
+                y += SIZES[level] + 10
+            elif r < 0.16:                                  # form‑like row
+                tw.append((MARGIN, y), f"{rng.randint(1, 99)}/{rng.randint(1, 12)}",
+                          font=regular, fontsize=BODY)
+                tw.append((MARGIN + 120, y), "Yes", font=regular, fontsize=BODY)
+                y += BODY + 6
+            else:                                           # body paragraph
+                n = rng.randint(2, 6)
+                for i in range(n):
+                    tw.append((MARGIN, y), _words(rng, 8, 13) + ("." if i == n - 1 else ""),
+                              font=regular, fontsize=BODY)
+                    y += BODY * 1.3
+                y += 8
+        tw.write_text(page)
+
+    doc.save(path, garbage=3, deflate=True)
+    doc.close()
+    truth = {"title": title, "outline": outline}
+    path.with_suffix(".json").write_text(json.dumps(truth, indent=2, ensure_ascii=False))
+    return truth
+
+
+def ensure_corpus(out_dir: Path, pages: list[int], seed: int = 0) -> list[Path]:
+    """
+    synth_<pages>p_s<seed>.pdf for every size – content depends on (pages,
+    seed) only, so existing files are reused.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    pdfs = []
+    for n in pages:
+        pdf = out_dir / f"synth_{n}p_s{seed}.pdf"
+        if not (pdf.exists() and pdf.with_suffix(".json").exists()):
+            make_pdf(pdf, n, seed=seed)
+        pdfs.append(pdf)
+    return pdfs
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    p.add_argument("out_dir", type=Path)
+    p.add_argument("--pages", type=int, nargs="+", default=[1, 10, 100, 500, 2000])
+    p.add_argument("--seed", type=int, default=0)
+    args = p.parse_args()
+    for pdf in ensure_corpus(args.out_dir, args.pages, args.seed):
+        print(f"{pdf}  ({pdf.stat().st_size / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,41 +1,221 @@
 # scripts/train_head.py
+"""
+Train the page‑level heading head on weakly labelled PDFs – streaming.
+
+    python scripts/train_head.py --pdfs corpus/ --workers 4 --cache cache/
+    python scripts/train_head.py --pdfs corpus/ --canvas 640x480   # → donut_head_640x480.head
+    python scripts/train_head.py --pdfs corpus/ --variant int8_static  # → donut_head_int8_static.head
+    python scripts/train_head.py --pdfs corpus/ --loss logistic --epochs 5
+
+Every PDF is embedded by a pool of encoder processes (batched
+`encode_pages`, one ONNX session each, cores split between them) and its
+pages go straight into the trainer – nothing is held per page:
+
+*  `--loss ridge` (default) accumulates XᵀX / Xᵀy (`RidgeAccumulator`) and
+   solves once at the end – memory O(dim²) for any number of pages
+*  `--loss logistic` spills the embeddings to a float32 file and runs
+   minibatch logistic regression over memory‑mapped chunks
+
+With `--cache` page embeddings are shared with the pipeline's embedding
+cache (same key: PDF hash, page, DPI/canvas, encoder hash), so re‑training
+– or training on pages the pipeline has already seen – skips the encoder.
+
+Weak label per page: 1 if the font heuristic (`assign_levels`) puts a Title
+or H1 on it.  A head only fits embeddings of the encoder canvas and graph it
+was trained on, so a reduced `--canvas` or a quantised `--variant` writes its
+own file next to the default one (`classify.head_path_for`) – the pipeline
+picks it up with the same flag.
+"""
 from pathlib import Path
-import glob
-import random
-import gc
+import argparse, multiprocessing as mp, os, random, tempfile, time
+from typing import Iterator, List, Sequence, Tuple
+
 import numpy as np
 
-from pdf_outline import render, extract_lines, donut_infer, classify, cluster
+from pdf_outline import classify, cluster
+from pdf_outline.cache import EmbeddingCache, file_sha256
+from pdf_outline.document import PdfDocument
+from pdf_outline.extract_lines import page_lines
+from pdf_outline.pipeline import render_key
+from pdf_outline.render import iter_pages
+from pdf_outline.session import SessionProfile
+
+_ENC = None                                      # per worker process
+
+
+def page_labels(doc: PdfDocument) -> np.ndarray:
+    """Weak label per page: 1 if the font heuristic finds a Title / H1 on it."""
+    y = np.zeros(len(doc), dtype=np.float32)
+    for pno in range(len(doc)):
+        lines = page_lines(doc, pno)
+        cluster.assign_levels(lines, np.ones(len(lines)))
+        y[pno] = any(L["level"] in ("Title", "H1") for L in lines)
+    return y
+
+
+def _init_worker(model: Path, canvas, threads: int, variant: str | None = None) -> None:
+    global _ENC
+    from pdf_outline.donut_infer import DonutEncoder
+    _ENC = DonutEncoder(model, canvas=canvas, variant=variant,
+                        profile=SessionProfile(intra_op_threads=threads, allow_spinning=False))
+
+
+def _model_info(_=None) -> Tuple[str, int]:
+    """(encoder hash, CLS width) – the width follows the variant / graph."""
+    return _ENC.model_hash, _ENC.dim
+
+
+def _embed_doc(job) -> Tuple[Path, np.ndarray, List[int], np.ndarray]:
+    """(pdf, labels of all pages, encoded pages, their CLS vectors)."""
+    pdf, todo, dpi, batch_size = job
+    with PdfDocument(pdf) as doc:
+        y = page_labels(doc)
+        todo = list(range(len(doc))) if todo is None else todo
+        X = (_ENC.encode_pages(iter_pages(doc, dpi=dpi, max_workers=1, pages=todo),
+                               batch_size=batch_size)
+             if todo else np.empty((0, _ENC.dim), np.float32))
+    return pdf, y, todo, X
+
+
+def iter_embeddings(pdfs: Sequence[Path], model: Path, canvas=None, dpi: int = 120,
+                    batch_size: int = 8, workers: int = 2,
+                    cache: EmbeddingCache | None = None, variant: str | None = None
+                    ) -> Iterator[Tuple[np.ndarray, np.ndarray, str]]:
+    """
+    Yield (CLS vectors (n, dim), labels (n,), model hash) per PDF, in
+    completion order.  Cached pages are not re‑encoded; new ones are added.
+    Pages planned as hits but evicted by the time their PDF comes back
+    (a corpus larger than the cache) are encoded then.
+    """
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    ctx = mp.get_context("spawn")
+    with ctx.Pool(workers, _init_worker, (model, canvas, threads, variant)) as pool:
+        mh, dim = pool.apply(_model_info)
+        if cache is not None and cache.dim != dim:
+            raise ValueError(f"embedding cache holds {cache.dim}‑d vectors, "
+                             f"the encoder gives {dim}‑d")
+        rk = render_key(dpi, canvas or classify.DEFAULT_CANVAS)
+        keys = {}
+        jobs = []
+        for pdf in pdfs:                         # cache lookups stay in this process
+            todo = None
+            if cache is not None:
+                with PdfDocument(pdf) as doc:
+                    n = len(doc)
+                sha = file_sha256(pdf)
+                keys[pdf] = [cache.key(sha, p, rk, mh) for p in range(n)]
+                todo = [p for p, k in enumerate(keys[pdf]) if k not in cache]
+            jobs.append((pdf, todo, dpi, batch_size))
+
+        for pdf, y, todo, X in pool.imap_unordered(_embed_doc, jobs):
+            if cache is not None:
+                vecs, hit = cache.get_many(keys[pdf])
+                if todo:
+                    vecs[todo] = X
+                    hit[todo] = True
+                    cache.put_many([keys[pdf][p] for p in todo], X)
+                lost = np.flatnonzero(~hit).tolist()
+                if lost:                         # evicted since planned as hits
+                    *_, X_lost = pool.apply(_embed_doc, ((pdf, lost, dpi, batch_size),))
+                    if len(X_lost) != len(lost):
+                        raise RuntimeError(f"{pdf}: {len(lost) - len(X_lost)} pages "
+                                           f"without an embedding")
+                    vecs[lost] = X_lost
+                    cache.put_many([keys[pdf][p] for p in lost], X_lost)
+                cache.flush()
+                X = vecs
+            yield X, y, mh
+
+
+def train(pdfs: Sequence[Path], model: Path, out: Path, canvas=None, dpi: int = 120,
+          batch_size: int = 8, workers: int = 2, cache: EmbeddingCache | None = None,
+          loss: str = "ridge", ridge: float = 1e-3, epochs: int = 5, lr: float = 0.1,
+          chunk: int = 2048, seed: int = 0, variant: str | None = None) -> Path:
+    """Embed `pdfs`, fit the head, save it stamped with encoder hash + canvas."""
+    canvas = tuple(canvas or classify.DEFAULT_CANVAS)
+    acc: classify.RidgeAccumulator | None = None  # sized by the first PDF's vectors
+    spill = tempfile.TemporaryFile() if loss == "logistic" else None
+    labels: List[np.ndarray] = []
+    mh, n_docs, t0 = "", 0, time.perf_counter()
+    for X, y, mh in iter_embeddings(pdfs, model, canvas, dpi, batch_size, workers, cache,
+                                    variant):
+        if acc is None:
+            dim = X.shape[1]
+            acc = classify.RidgeAccumulator(dim)
+        acc.update(X, y)
+        if spill is not None:
+            spill.write(np.ascontiguousarray(X, dtype=np.float32).tobytes())
+            labels.append(y)
+        n_docs += 1
+        if n_docs % 50 == 0:
+            print(f"  {n_docs}/{len(pdfs)} PDFs, {acc.n} pages, "
+                  f"{acc.n / (time.perf_counter() - t0):.1f} pages/s")
+    if acc is None or not acc.n:
+        raise SystemExit("❌  no pages to train on")
+    print(f"Training samples: {acc.n} pages from {n_docs} PDFs, canvas %dx%d "
+          f"({time.perf_counter() - t0:.0f}s)" % canvas)
 
-# --- choose a handful of bootstrap PDFs -----------------------------------
-PDFS = glob.glob("pdfs/*.pdf")[:6]          # adjust folder / count as needed
-random.shuffle(PDFS)
+    if spill is None:
+        weights = acc.solve(ridge)
+    else:
+        spill.flush()
+        X = np.memmap(spill, dtype=np.float32, mode="r", shape=(acc.n, dim))
+        y = np.concatenate(labels)
+        rng = random.Random(seed)
+        starts = list(range(0, acc.n, chunk))
 
-enc = donut_infer.DonutEncoder("models/donut_base_int8/int8")
+        def chunks():
+            rng.shuffle(starts)
+            for i in starts:
+                yield np.asarray(X[i:i + chunk], dtype=np.float64), y[i:i + chunk]
 
-X, y = [], []
-for pdf in PDFS:
-    imgs  = render.render_pdf(pdf, dpi=150, max_workers=2)
-    lines = extract_lines.extract_lines(pdf)
+        weights = classify.train_logistic(chunks, epochs=epochs, lr=lr)
+        spill.close()
 
-    for page_idx, img in enumerate(imgs):
-        cls_vec = enc.encode([img])[0][0]         # CLS token (1024,)
-        page_lines = [L for L in lines if L["page"] == page_idx]
+    out = classify.head_path_for(out, canvas, variant)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    classify.save_head(weights, out, model_hash=mh, canvas=canvas)
+    return out
 
-        # weak label = 1 if page has a Title/H1 per font heuristic
-        cluster.assign_levels(page_lines, np.ones(len(page_lines)))
-        label = 1 if any(L["level"] in ("Title", "H1") for L in page_lines) else 0
 
-        X.append(cls_vec)
-        y.append(label)
+def main():
+    p = argparse.ArgumentParser(description="Train the heading head (streaming).")
+    p.add_argument("--pdfs", type=Path, nargs="+", default=[Path("pdfs")],
+                   help="PDF files or folders (searched recursively)")
+    p.add_argument("--limit", type=int, default=0, help="random sample of N PDFs (0 = all)")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--model", type=Path, default=Path("models/donut_base_int8/int8"))
+    p.add_argument("--canvas", type=classify.parse_canvas, metavar="HxW",
+                   help="encoder input size the head is for (default 1280x960)")
+    p.add_argument("--variant", metavar="NAME",
+                   help="encoder variant in --model the head is for, e.g. int8_static")
+    p.add_argument("--dpi", type=int, default=120, help="render DPI (match the pipeline)")
+    p.add_argument("--batch-size", type=int, default=8, help="pages per ONNX run")
+    p.add_argument("--workers", type=int, default=2, help="encoder processes")
+    p.add_argument("--cache", type=Path, metavar="DIR", help="page embedding cache to reuse / fill")
+    p.add_argument("--cache-mb", type=int, default=512)
+    p.add_argument("--loss", choices=("ridge", "logistic"), default="ridge")
+    p.add_argument("--ridge", type=float, default=1e-3, help="ridge λ")
+    p.add_argument("--epochs", type=int, default=5, help="logistic: passes over the data")
+    p.add_argument("--lr", type=float, default=0.1, help="logistic: step size")
+    p.add_argument("-o", "--out", type=Path, default=Path("models/donut_head.head"),
+                   help="head file; a variant / non‑default canvas adds its suffix")
+    args = p.parse_args()
 
-    del imgs, lines; gc.collect()
+    pdfs = sorted({f for src in args.pdfs
+                   for f in ([src] if src.is_file() else src.rglob("*.pdf"))})
+    if args.limit:
+        pdfs = random.Random(args.seed).sample(pdfs, min(args.limit, len(pdfs)))
+    cache = EmbeddingCache(args.cache, max_bytes=args.cache_mb << 20) if args.cache else None
+    try:
+        out = train(pdfs, args.model, args.out, args.canvas, args.dpi, args.batch_size,
+                    args.workers, cache, args.loss, args.ridge, args.epochs, args.lr,
+                    seed=args.seed, variant=args.variant)
+    finally:
+        if cache is not None:
+            cache.close()
+    print(f"✅  Saved head weights to {out}")
 
-X = np.vstack(X)
-y = np.array(y)
-print("Training samples:", X.shape[0])
 
-weights = classify.train_head(X, y)
-Path("models").mkdir(exist_ok=True)
-classify.save_head(weights, Path("models/donut_head.pkl"))
-print("✅  Saved head weights to models/donut_head.pkl")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+trim_cls.py  – cut the Donut encoder graph down to its CLS output
+
+The exported encoder returns `last_hidden_state` (B, seq, 1024) – about
+1200 tokens × 4 KiB per page at 1280×960 – of which the pipeline keeps only
+row 0.  This adds a `Gather(index 0, axis 1)` after that output, makes the
+resulting (B, 1024) tensor the graph's only output (nodes that fed nothing
+else, e.g. a pooler, are dropped) and writes `encoder_model_cls.onnx` next
+to the source (`encoder_model_<variant>_cls.onnx` with `--variant`).
+`DonutEncoder` picks the trimmed file up automatically.
+
+The source model's sha256 is stored in the metadata, so caches and heads
+keyed on the encoder hash stay valid.
+
+Usage:
+    python scripts/trim_cls.py models/donut_base_int8/int8
+    python scripts/trim_cls.py models/donut_base_int8/int8 --variant int8_static
+"""
+
+from pathlib import Path
+import argparse
+
+import numpy as np
+import onnx
+from onnx import TensorProto, helper, numpy_helper
+
+from pdf_outline.cache import file_sha256
+from pdf_outline.donut_infer import ENCODER_MODEL, SOURCE_HASH, variant_file
+
+
+def _prune(graph: onnx.GraphProto) -> int:
+    """Drop nodes whose outputs are not needed for the graph outputs."""
+    needed = {o.name for o in graph.output}
+    keep = []
+    for node in reversed(graph.node):
+        if any(o in needed for o in node.output):
+            keep.append(node)
+            needed.update(node.input)
+    dropped = len(graph.node) - len(keep)
+    del graph.node[:]
+    graph.node.extend(reversed(keep))
+    inits = [i for i in graph.initializer if i.name in needed]
+    del graph.initializer[:]
+    graph.initializer.extend(inits)
+    return dropped
+
+
+def trim(src: Path, dst: Path, output: str | None = None) -> None:
+    model = onnx.load(str(src))
+    g = model.graph
+    hidden = next((o for o in g.output if o.name == output), g.output[0]) if output else g.output[0]
+    dims = hidden.type.tensor_type.shape.dim
+    if len(dims) != 3:
+        raise SystemExit(f"❌  {hidden.name} has rank {len(dims)}, expected (B, seq, hidden)")
+
+    g.initializer.append(numpy_helper.from_array(np.array(0, dtype=np.int64), "cls_index"))
+    g.node.append(helper.make_node("Gather", [hidden.name, "cls_index"], ["cls"],
+                                   axis=1, name="cls_gather"))
+    cls = helper.make_tensor_value_info(
+        "cls", TensorProto.FLOAT,
+        [dims[0].dim_param or dims[0].dim_value, dims[2].dim_param or dims[2].dim_value])
+    del g.output[:]
+    g.output.append(cls)
+    dropped = _prune(g)
+
+    src_hash = next((p.value for p in model.metadata_props if p.key == SOURCE_HASH), None)
+    helper.set_model_props(model, {**{p.key: p.value for p in model.metadata_props},
+                                   SOURCE_HASH: src_hash or file_sha256(src)})
+    onnx.checker.check_model(model)
+    onnx.save(model, str(dst))
+    print(f"✓ {dst}  (output {hidden.name} → cls, {dropped} unused nodes dropped)")
+
+
+def check(src: Path, dst: Path, batch: int = 2) -> float:
+    """Max |Δ| between the trimmed output and row 0 of the original."""
+    import onnxruntime as ort
+    a = ort.InferenceSession(str(src), providers=["CPUExecutionProvider"])
+    b = ort.InferenceSession(str(dst), providers=["CPUExecutionProvider"])
+    x = np.random.default_rng(0).random((batch, 3, 1280, 960), dtype=np.float32)
+    ref = a.run(None, {a.get_inputs()[0].name: x})[0][:, 0, :]
+    out = b.run(None, {b.get_inputs()[0].name: x})[0]
+    return float(np.abs(ref - out).max())
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    p.add_argument("model_dir", type=Path, help=f"folder with {ENCODER_MODEL}")
+    p.add_argument("--output", help="hidden‑state output name (default: first output)")
+    p.add_argument("--variant", metavar="NAME",
+                   help="trim encoder_model_<NAME>.onnx instead, e.g. int8_static")
+    p.add_argument("--no-check", action="store_true", help="skip the equality check")
+    args = p.parse_args()
+
+    src = args.model_dir / variant_file(args.variant)
+    dst = args.model_dir / variant_file(args.variant, cls=True)
+    if not src.exists():
+        raise SystemExit(f"❌  {src} not found")
+    trim(src, dst, args.output)
+    if not args.no_check:
+        err = check(src, dst)
+        print(f"{'✅' if err == 0 else '❌'}  max |Δ| vs original CLS row: {err:g}")
+        if err:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()